@@ -0,0 +1,296 @@
+package main
+
+import (
+	"bytes"
+	"encoding/json"
+	"fmt"
+	"io"
+	"net/http"
+	"net/url"
+	"strings"
+	"sync"
+	"sync/atomic"
+	"time"
+)
+
+// -------------------------------------------------------
+//  Cache autorizzazione camere (invalidata dagli eventi)
+// -------------------------------------------------------
+const (
+	// TTL di sicurezza: anche senza eventi una voce viene riletta dopo questo intervallo
+	cameraCacheTTL = 60 * time.Second
+	// Intervallo di polling degli eventi blockchain su FireFly
+	cameraEventsInterval = 500 * time.Millisecond
+	// Eventi letti per ogni richiesta
+	cameraEventsPageSize = 100
+)
+
+// Eventi del contratto che cambiano registrazione/autorizzazione di una camera
+var cameraEventNames = []string{"CameraRegistered", "CameraAuthorized", "CameraRevoked"}
+
+// Client HTTP condiviso (keep-alive) per listener ed eventi
+var cameraEventsClient = &http.Client{Timeout: 30 * time.Second}
+
+type cameraAuthEntry struct {
+	authorized bool
+	wallet     string
+	expires    time.Time
+}
+
+// cameraAuthCache tiene in memoria (authorized, walletAddress) per camera:
+// - lookup con RLock, senza chiamate a FireFly finché la voce è valida
+// - CameraRevoked porta subito la voce a "non autorizzata"
+// - CameraRegistered/CameraAuthorized eliminano la voce (riletta al prossimo uso)
+// - il TTL copre eventi persi o FireFly non raggiungibile
+type cameraAuthCache struct {
+	mu       sync.RWMutex
+	entries  map[string]cameraAuthEntry
+	versions map[string]uint64 // incrementata ad ogni evento: scarta risposte getCameraInfo superate
+	ttl      time.Duration
+	fetch    func(camID string) (bool, string, error)
+
+	listeners    map[string]bool // ID dei listener FireFly creati per la cache
+	lastSequence int64           // ultimo evento FireFly elaborato
+
+	hits          atomic.Uint64
+	misses        atomic.Uint64
+	invalidations atomic.Uint64
+}
+
+// newCameraAuthCache crea la cache; fetch è la query on-chain (getCameraAuthorization).
+func newCameraAuthCache(ttl time.Duration, fetch func(camID string) (bool, string, error)) *cameraAuthCache {
+	return &cameraAuthCache{
+		entries:   make(map[string]cameraAuthEntry),
+		versions:  make(map[string]uint64),
+		ttl:       ttl,
+		fetch:     fetch,
+		listeners: make(map[string]bool),
+	}
+}
+
+// normalizeCameraID porta il camera ID nel formato "0x" + hex minuscolo.
+func normalizeCameraID(camID string) string {
+	return "0x" + strings.ToLower(strings.TrimPrefix(strings.TrimPrefix(camID, "0x"), "0X"))
+}
+
+// Get ritorna (authorized, walletAddress) dalla cache o, se assente/scaduta, da FireFly.
+// Gli errori di FireFly non vengono messi in cache.
+func (c *cameraAuthCache) Get(camID string) (bool, string, error) {
+	key := normalizeCameraID(camID)
+
+	c.mu.RLock()
+	entry, ok := c.entries[key]
+	version := c.versions[key]
+	c.mu.RUnlock()
+	if ok && time.Now().Before(entry.expires) {
+		c.hits.Add(1)
+		return entry.authorized, entry.wallet, nil
+	}
+	c.misses.Add(1)
+
+	authorized, wallet, err := c.fetch(camID)
+	if err != nil {
+		return false, "", err
+	}
+
+	c.mu.Lock()
+	// Se nel frattempo è arrivato un evento per la camera la risposta potrebbe essere vecchia:
+	// la si usa per questa foto ma non la si salva
+	if c.versions[key] == version {
+		c.entries[key] = cameraAuthEntry{authorized: authorized, wallet: wallet, expires: time.Now().Add(c.ttl)}
+	}
+	c.mu.Unlock()
+	return authorized, wallet, nil
+}
+
+// revoke segna subito la camera come non autorizzata (evento CameraRevoked).
+func (c *cameraAuthCache) revoke(camID, wallet string) {
+	key := normalizeCameraID(camID)
+	c.mu.Lock()
+	c.versions[key]++
+	c.entries[key] = cameraAuthEntry{authorized: false, wallet: wallet, expires: time.Now().Add(c.ttl)}
+	c.mu.Unlock()
+	c.invalidations.Add(1)
+}
+
+// invalidate elimina la voce della camera (evento CameraRegistered/CameraAuthorized).
+func (c *cameraAuthCache) invalidate(camID string) {
+	key := normalizeCameraID(camID)
+	c.mu.Lock()
+	c.versions[key]++
+	delete(c.entries, key)
+	c.mu.Unlock()
+	c.invalidations.Add(1)
+}
+
+// clear svuota la cache (all'avvio del listener, prima di seguire gli eventi).
+func (c *cameraAuthCache) clear() {
+	c.mu.Lock()
+	for key := range c.entries {
+		c.versions[key]++
+	}
+	c.entries = make(map[string]cameraAuthEntry)
+	c.mu.Unlock()
+}
+
+// Stats ritorna hit, miss e invalidazioni da evento.
+func (c *cameraAuthCache) Stats() (uint64, uint64, uint64) {
+	return c.hits.Load(), c.misses.Load(), c.invalidations.Load()
+}
+
+// fireflyGet esegue una GET su FireFly e decodifica il JSON in out.
+func fireflyGet(u string, out any) error {
+	resp, err := cameraEventsClient.Get(u)
+	if err != nil {
+		return err
+	}
+	defer resp.Body.Close()
+
+	respBody, _ := io.ReadAll(resp.Body)
+	if resp.StatusCode < 200 || resp.StatusCode >= 300 {
+		return fmt.Errorf("firefly http %d: %s", resp.StatusCode, string(respBody))
+	}
+	return json.Unmarshal(respBody, out)
+}
+
+type fireflyListener struct {
+	ID   string `json:"id"`
+	Name string `json:"name"`
+}
+
+// ensureListeners crea (se mancano) i listener FireFly per gli eventi camera del contratto.
+// Senza listener FireFly non registra gli eventi blockchain.
+func (c *cameraAuthCache) ensureListeners() error {
+	for _, name := range cameraEventNames {
+		u := fmt.Sprintf("%s/namespaces/%s/apis/%s/listeners/%s", fireflyAPI, namespace, apiName, name)
+
+		var existing []fireflyListener
+		if err := fireflyGet(u, &existing); err != nil {
+			return err
+		}
+		if len(existing) == 0 {
+			body, _ := json.Marshal(map[string]any{"name": "camera-cache-" + name})
+			resp, err := cameraEventsClient.Post(u, "application/json", bytes.NewReader(body))
+			if err != nil {
+				return err
+			}
+			respBody, _ := io.ReadAll(resp.Body)
+			resp.Body.Close()
+			if resp.StatusCode < 200 || resp.StatusCode >= 300 {
+				return fmt.Errorf("create listener %s: firefly http %d: %s", name, resp.StatusCode, string(respBody))
+			}
+			var created fireflyListener
+			if err := json.Unmarshal(respBody, &created); err != nil {
+				return err
+			}
+			existing = append(existing, created)
+		}
+		for _, l := range existing {
+			c.listeners[l.ID] = true
+		}
+	}
+	return nil
+}
+
+type fireflyEvent struct {
+	Sequence        int64 `json:"sequence"`
+	BlockchainEvent *struct {
+		Name     string         `json:"name"`
+		Listener string         `json:"listener"`
+		Output   map[string]any `json:"output"`
+	} `json:"blockchainEvent"`
+}
+
+// eventsURL costruisce la query degli eventi blockchain con sequence > after.
+func eventsURL(after int64, sort string, limit int) string {
+	q := url.Values{}
+	q.Set("type", "blockchain_event_received")
+	q.Set("fetchreferences", "true")
+	q.Set("sort", sort)
+	q.Set("limit", fmt.Sprint(limit))
+	if after >= 0 {
+		q.Set("sequence", fmt.Sprintf(">%d", after))
+	}
+	return fmt.Sprintf("%s/namespaces/%s/events?%s", fireflyAPI, namespace, q.Encode())
+}
+
+// pollEvents applica gli eventi camera arrivati dopo lastSequence.
+// Ritorna il numero di eventi camera applicati.
+func (c *cameraAuthCache) pollEvents() (int, error) {
+	applied := 0
+	for {
+		var events []fireflyEvent
+		if err := fireflyGet(eventsURL(c.lastSequence, "sequence", cameraEventsPageSize), &events); err != nil {
+			return applied, err
+		}
+		for _, ev := range events {
+			if ev.Sequence > c.lastSequence {
+				c.lastSequence = ev.Sequence
+			}
+			be := ev.BlockchainEvent
+			if be == nil || !c.listeners[be.Listener] {
+				continue
+			}
+			camID, _ := be.Output["cameraId"].(string)
+			if camID == "" {
+				continue
+			}
+			switch be.Name {
+			case "CameraRevoked":
+				wallet, _ := be.Output["walletAddress"].(string)
+				c.revoke(camID, wallet)
+			case "CameraRegistered", "CameraAuthorized":
+				c.invalidate(camID)
+			default:
+				continue
+			}
+			applied++
+		}
+		if len(events) < cameraEventsPageSize {
+			return applied, nil
+		}
+	}
+}
+
+// watchEvents crea i listener e segue gli eventi finché stop non viene chiuso.
+// Gli eventi restano su FireFly: dopo un errore si riprende da lastSequence senza perderne.
+// Finché i listener non sono pronti la cache si affida solo al TTL.
+func (c *cameraAuthCache) watchEvents(stop <-chan struct{}) {
+	ready := false
+	failing := false
+	for {
+		wait := cameraEventsInterval
+		if !ready {
+			// Riparte dall'ultimo evento presente (la cache è ancora vuota)
+			var latest []fireflyEvent
+			err := c.ensureListeners()
+			if err == nil {
+				err = fireflyGet(eventsURL(-1, "-sequence", 1), &latest)
+			}
+			if err != nil {
+				fmt.Println("⚠️  cache camere: eventi FireFly non disponibili, solo TTL:", err)
+				wait = 10 * time.Second
+			} else {
+				if len(latest) > 0 {
+					c.lastSequence = latest[0].Sequence
+				}
+				c.clear()
+				ready = true
+				fmt.Println("✅ Cache camere in ascolto di CameraRegistered/CameraAuthorized/CameraRevoked")
+			}
+		} else if _, err := c.pollEvents(); err != nil {
+			if !failing {
+				fmt.Println("⚠️  cache camere: lettura eventi fallita:", err)
+			}
+			failing = true
+		} else {
+			failing = false
+		}
+
+		select {
+		case <-stop:
+			return
+		case <-time.After(wait):
+		}
+	}
+}
@@ -0,0 +1,165 @@
+package main
+
+import (
+	"encoding/json"
+	"net/http"
+	"net/http/httptest"
+	"strings"
+	"sync/atomic"
+	"testing"
+	"time"
+)
+
+const testCamID = "0xABCDEF"
+
+// countingFetch simula getCameraAuthorization e conta le query a FireFly.
+func countingFetch(authorized bool, wallet string) (func(string) (bool, string, error), *atomic.Int64) {
+	var calls atomic.Int64
+	return func(string) (bool, string, error) {
+		calls.Add(1)
+		return authorized, wallet, nil
+	}, &calls
+}
+
+func TestCameraAuthCacheHitAfterFirstLookup(t *testing.T) {
+	fetch, calls := countingFetch(true, "0xwallet")
+	c := newCameraAuthCache(time.Minute, fetch)
+
+	for i := 0; i < 3; i++ {
+		authorized, wallet, err := c.Get(testCamID)
+		if err != nil || !authorized || wallet != "0xwallet" {
+			t.Fatalf("Get = (%v, %q, %v)", authorized, wallet, err)
+		}
+	}
+	// Stesso camera ID in forma diversa: stessa voce
+	c.Get("abcdef")
+
+	if calls.Load() != 1 {
+		t.Fatalf("fetch chiamata %d volte, attesa 1", calls.Load())
+	}
+	if hits, misses, _ := c.Stats(); hits != 3 || misses != 1 {
+		t.Fatalf("hits=%d misses=%d", hits, misses)
+	}
+}
+
+func TestCameraAuthCacheRevokeTakesEffectWithoutFetch(t *testing.T) {
+	fetch, calls := countingFetch(true, "0xwallet")
+	c := newCameraAuthCache(time.Minute, fetch)
+	c.Get(testCamID)
+
+	c.revoke(testCamID, "0xwallet")
+
+	authorized, _, _ := c.Get(testCamID)
+	if authorized {
+		t.Fatal("camera revocata ancora autorizzata")
+	}
+	if calls.Load() != 1 {
+		t.Fatalf("fetch chiamata %d volte dopo la revoca", calls.Load())
+	}
+}
+
+func TestCameraAuthCacheInvalidateAndTTLRefetch(t *testing.T) {
+	fetch, calls := countingFetch(true, "0xwallet")
+	c := newCameraAuthCache(time.Minute, fetch)
+	c.Get(testCamID)
+
+	c.invalidate(testCamID)
+	c.Get(testCamID)
+	if calls.Load() != 2 {
+		t.Fatalf("dopo invalidate fetch chiamata %d volte, attese 2", calls.Load())
+	}
+
+	short := newCameraAuthCache(10*time.Millisecond, fetch)
+	short.Get(testCamID)
+	time.Sleep(20 * time.Millisecond)
+	short.Get(testCamID)
+	if calls.Load() != 4 {
+		t.Fatalf("dopo il TTL fetch chiamata %d volte, attese 4", calls.Load())
+	}
+}
+
+func TestCameraAuthCacheDropsResponseOvertakenByEvent(t *testing.T) {
+	var c *cameraAuthCache
+	var calls atomic.Int64
+	c = newCameraAuthCache(time.Minute, func(camID string) (bool, string, error) {
+		if calls.Add(1) == 1 {
+			// La revoca arriva mentre la query è in corso: la risposta è superata
+			c.revoke(camID, "0xwallet")
+		}
+		return true, "0xwallet", nil
+	})
+
+	if authorized, _, _ := c.Get(testCamID); !authorized {
+		t.Fatal("la foto in corso usa la risposta di FireFly")
+	}
+	if authorized, _, _ := c.Get(testCamID); authorized {
+		t.Fatal("la risposta superata dalla revoca è stata salvata in cache")
+	}
+}
+
+// roundTripFunc instrada le richieste del client eventi verso un handler locale.
+type roundTripFunc func(*http.Request) (*http.Response, error)
+
+func (f roundTripFunc) RoundTrip(r *http.Request) (*http.Response, error) { return f(r) }
+
+func serveEvents(t *testing.T, events []map[string]any) {
+	t.Helper()
+	handler := http.HandlerFunc(func(w http.ResponseWriter, r *http.Request) {
+		if !strings.HasSuffix(r.URL.Path, "/events") {
+			http.NotFound(w, r)
+			return
+		}
+		json.NewEncoder(w).Encode(events)
+	})
+	previous := cameraEventsClient.Transport
+	cameraEventsClient.Transport = roundTripFunc(func(r *http.Request) (*http.Response, error) {
+		rec := httptest.NewRecorder()
+		handler.ServeHTTP(rec, r)
+		return rec.Result(), nil
+	})
+	t.Cleanup(func() { cameraEventsClient.Transport = previous })
+}
+
+func cameraEvent(seq int64, name, listener, camID string) map[string]any {
+	return map[string]any{
+		"sequence": seq,
+		"blockchainEvent": map[string]any{
+			"name":     name,
+			"listener": listener,
+			"output":   map[string]any{"cameraId": camID, "walletAddress": "0xwallet"},
+		},
+	}
+}
+
+func TestPollEventsAppliesOnlyOwnListeners(t *testing.T) {
+	other := "0x" + strings.Repeat("22", 32)
+	serveEvents(t, []map[string]any{
+		cameraEvent(5, "CameraRevoked", "l1", testCamID),
+		cameraEvent(6, "CameraAuthorized", "l1", other),
+		cameraEvent(7, "CameraRevoked", "altro", other),
+		{"sequence": 8},
+	})
+
+	fetch, calls := countingFetch(true, "0xwallet")
+	c := newCameraAuthCache(time.Minute, fetch)
+	c.listeners["l1"] = true
+	c.Get(testCamID)
+	c.Get(other)
+
+	applied, err := c.pollEvents()
+	if err != nil {
+		t.Fatal(err)
+	}
+	if applied != 2 || c.lastSequence != 8 {
+		t.Fatalf("applied=%d lastSequence=%d", applied, c.lastSequence)
+	}
+	if authorized, _, _ := c.Get(testCamID); authorized {
+		t.Fatal("CameraRevoked non applicato")
+	}
+	if authorized, _, _ := c.Get(other); !authorized || calls.Load() != 3 {
+		t.Fatalf("CameraAuthorized deve rileggere la camera (fetch=%d)", calls.Load())
+	}
+	if _, _, invalidations := c.Stats(); invalidations != 2 {
+		t.Fatalf("invalidations=%d", invalidations)
+	}
+}
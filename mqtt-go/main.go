@@ -751,6 +751,12 @@ func main() {
 	}
 	fmt.Println("✅ Connesso al broker MQTT")
 
+	// Cache autorizzazione camere: evita getCameraInfo ad ogni foto,
+	// invalidata dagli eventi CameraRegistered/CameraAuthorized/CameraRevoked
+	cameraAuth := newCameraAuthCache(cameraCacheTTL, getCameraAuthorization)
+	stopEvents := make(chan struct{})
+	go cameraAuth.watchEvents(stopEvents)
+
 	// Callback chiamata ogni volta che arriva un messaggio su camera1/alerts
 	cb := func(_ mqtt.Client, msg mqtt.Message) {
 		fmt.Printf("📥 Messaggio su [%s]\n", msg.Topic())
@@ -785,8 +791,8 @@ func main() {
 			return
 		}
 
-		// Verifica autorizzazione camera on-chain
-		authorized, walletAddr, err := getCameraAuthorization(camID)
+		// Verifica autorizzazione camera on-chain (dalla cache se già nota)
+		authorized, walletAddr, err := cameraAuth.Get(camID)
 		if err != nil {
 			fmt.Printf("❌ verifica autorizzazione fallita (%s): %v\n", camID, err)
 			return
@@ -1001,6 +1007,9 @@ func main() {
 
 	// Cleanup
 	fmt.Println("⏹️ Chiusura...")
+	close(stopEvents)
+	hits, misses, invalidations := cameraAuth.Stats()
+	fmt.Printf("ℹ️  cache camere: hit=%d miss=%d invalidazioni=%d\n", hits, misses, invalidations)
 	client.Disconnect(250)
 
 	if ser != nil {
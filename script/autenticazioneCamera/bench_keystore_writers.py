@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Stress test delle scritture concorrenti sul keystore (save_private_key)
+Avvia N processi che salvano ciascuno M chiavi nello stesso keystore,
+poi verifica che nessuna chiave sia andata persa e misura il throughput
+(chiavi/s) per ogni modalità: file JSON, journal, SQLite.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from multiprocessing import Barrier, Process
+
+import get_camera_wallet
+from key_journal import open_journal, read_keystore
+from keystore import open_keystore
+
+
+def fake_wallet():
+    """Wallet di prova senza derivazione della chiave (NON usare in produzione)"""
+    return {
+        "address": "0x" + os.urandom(20).hex(),
+        "privateKey": "0x" + os.urandom(32).hex(),
+        "mnemonic": ""
+    }
+
+
+def writer(key_file, journal, writer_id, count, compact_every, barrier):
+    """
+    Processo writer: salva `count` chiavi una alla volta, come save_private_key
+
+    In modalità journal compatta ogni `compact_every` chiavi, così le
+    compattazioni si sovrappongono alle append degli altri processi.
+    """
+    get_camera_wallet.CONFIG["PRIVATE_KEY_FILE"] = key_file
+    get_camera_wallet.CONFIG["KEY_JOURNAL"] = journal
+    barrier.wait()
+    for i in range(count):
+        camera_id = "0x%08x%056x" % (writer_id, i)
+        get_camera_wallet._store_entries([(camera_id, get_camera_wallet._make_entry(fake_wallet()))])
+        if journal and compact_every and (i + 1) % compact_every == 0:
+            open_journal(key_file).compact()
+    if journal:
+        open_journal(key_file).flush()
+
+
+def run_mode(mode, writers, per_writer, compact_every, tmp):
+    """Esegue lo stress test in una modalità; ritorna (chiavi trovate, secondi)"""
+    key_file = os.path.join(tmp, f"keys_{mode}" + (".db" if mode == "sqlite" else ".json"))
+    journal = mode == "journal"
+
+    barrier = Barrier(writers + 1)
+    processes = [
+        Process(target=writer, args=(key_file, journal, w, per_writer, compact_every, barrier))
+        for w in range(writers)
+    ]
+    for p in processes:
+        p.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for p in processes:
+        p.join()
+    elapsed = time.perf_counter() - start
+
+    failed = [p.exitcode for p in processes if p.exitcode != 0]
+    if failed:
+        raise RuntimeError(f"{len(failed)} writer terminati con errore in modalità {mode}")
+
+    if mode == "sqlite":
+        found = len(open_keystore(key_file))
+    else:
+        found = len(read_keystore(key_file))
+    return found, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress test writer concorrenti sul keystore")
+    parser.add_argument("--writers", "-n", type=int, default=8, help="Processi writer concorrenti")
+    parser.add_argument("--keys", type=int, default=200, help="Chiavi salvate da ogni writer")
+    parser.add_argument("--compact-every", type=int, default=50, help="Compattazione del journal ogni N chiavi (0 = mai)")
+    parser.add_argument("--modes", default="json,journal,sqlite", help="Modalità da provare")
+    parser.add_argument("--output", default=None, help="Salva i risultati in JSON")
+    args = parser.parse_args()
+
+    expected = args.writers * args.keys
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+
+    print("📊 Stress test scritture concorrenti sul keystore")
+    print("=" * 80)
+    print(f"Writer: {args.writers}   Chiavi per writer: {args.keys}   Attese: {expected}\n")
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in modes:
+            found, elapsed = run_mode(mode, args.writers, args.keys, args.compact_every, tmp)
+            rate = found / elapsed if elapsed > 0 else 0.0
+            status = "✅" if found == expected else "❌"
+            print(f"{status} {mode:<8} {found:>7}/{expected} chiavi   {elapsed:8.2f}s   {rate:10.1f} chiavi/s")
+            results.append({
+                "mode": mode,
+                "expected": expected,
+                "found": found,
+                "seconds": elapsed,
+                "keys_per_s": rate
+            })
+
+    print("=" * 80)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"writers": args.writers, "keys": args.keys, "results": results}, f, indent=2)
+        print(f"💾 Risultati salvati in: {args.output}")
+
+    return 0 if all(r["found"] == r["expected"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark del calcolo SHA-256 delle foto (sign_photo.hash_photo_file)
+Misura tempo e picco di memoria (RSS) al crescere della dimensione del file,
+confrontando la lettura completa (f.read) con la lettura a blocchi e mmap.
+Ogni misura gira in un processo separato, così il picco RSS non si somma.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+# Modalità confrontate: lettura completa (vecchio main), a blocchi, mmap a finestre
+MODES = ["read", "stream", "mmap"]
+
+# Codice eseguito nel processo figlio: stampa digest, tempo e picco RSS in KB
+CHILD_CODE = """
+import hashlib, json, resource, sys, time
+sys.path.insert(0, {script_dir!r})
+from sign_photo import hash_photo_file
+
+path, mode, block_size = sys.argv[1], sys.argv[2], int(sys.argv[3])
+start = time.perf_counter()
+if mode == "read":
+    with open(path, "rb") as f:
+        digest = "0x" + hashlib.sha256(f.read()).hexdigest()
+else:
+    digest = hash_photo_file(path, block_size, use_mmap=(mode == "mmap"))
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "digest": digest,
+    "seconds": elapsed,
+    "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+}}))
+"""
+
+
+def make_photo(path, size_mb):
+    """Crea un file di prova di size_mb MB con contenuto pseudo-casuale"""
+    chunk = os.urandom(1024 * 1024)
+    with open(path, "wb") as f:
+        for _ in range(size_mb):
+            f.write(chunk)
+
+
+def reference_digest(path):
+    """Digest di riferimento sull'intero file (equivalente a sha256.Sum256 in Go)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return "0x" + digest.hexdigest()
+
+
+def run_child(path, mode, block_size):
+    """Esegue una misura in un processo Python separato"""
+    code = CHILD_CODE.format(script_dir=os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-c", code, path, mode, str(block_size)],
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hash foto (RSS e throughput)")
+    parser.add_argument("--sizes", default="1,16,64,256", help="Dimensioni file in MB, separate da virgola")
+    parser.add_argument("--block-size", type=int, default=1024 * 1024, help="Blocco di lettura in byte")
+    parser.add_argument("--output", default=None, help="Salva i risultati in JSON")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    results = []
+
+    print("📊 Benchmark hash foto")
+    print("=" * 80)
+    print(f"{'MB':>6} {'modalità':>8} {'secondi':>10} {'MB/s':>10} {'RSS max (MB)':>14}  digest")
+    print("-" * 80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size_mb in sizes:
+            path = os.path.join(tmp, f"photo_{size_mb}mb.bin")
+            make_photo(path, size_mb)
+            expected = reference_digest(path)
+
+            for mode in MODES:
+                m = run_child(path, mode, args.block_size)
+                ok = m["digest"] == expected
+                throughput = size_mb / m["seconds"] if m["seconds"] > 0 else float("inf")
+                print(f"{size_mb:>6} {mode:>8} {m['seconds']:>10.3f} {throughput:>10.1f} "
+                      f"{m['max_rss_kb'] / 1024:>14.1f}  {'✅' if ok else '❌'}")
+                results.append({
+                    "size_mb": size_mb,
+                    "mode": mode,
+                    "block_size": args.block_size,
+                    "seconds": m["seconds"],
+                    "mb_per_sec": throughput,
+                    "max_rss_kb": m["max_rss_kb"],
+                    "digest_ok": ok
+                })
+
+            os.remove(path)
+
+    print("=" * 80)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Risultati salvati in: {args.output}")
+
+    if not all(r["digest_ok"] for r in results):
+        print("❌ Digest diverso dal riferimento!")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
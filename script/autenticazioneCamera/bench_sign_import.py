@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark del tempo di avvio della firma foto
+Confronta l'import del vecchio percorso (web3 + eth_account) con signing_core
+e verifica che le firme siano identiche byte per byte.
+Ogni import è misurato in un processo Python nuovo (cold start).
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Codice importato a freddo per ciascun percorso
+IMPORT_TARGETS = {
+    "web3 + eth_account (legacy)": (
+        "from eth_account import Account\n"
+        "from eth_account.messages import encode_defunct\n"
+        "from web3 import Web3"
+    ),
+    "signing_core": "from signing_core import PhotoSigner",
+    "sign_photo": "import sign_photo",
+}
+
+# Chiave e dati di prova (NON usare in produzione)
+TEST_KEY = "0x4c0883a69102937d6231471b5dbb6204fe5129617082792ae468d01a3f362318"
+TEST_PHOTO_HASH = "0x" + "ab" * 32
+TEST_METADATA = "camera=cam-esp32-01;topic=camera1/alerts;file=foto_1.jpg;size=48213"
+
+
+def measure_import(code, runs):
+    """Misura il tempo di import (secondi) in `runs` processi separati"""
+    child = (
+        "import sys, time\n"
+        f"sys.path.insert(0, {SCRIPT_DIR!r})\n"
+        "start = time.perf_counter()\n"
+        f"exec({code!r})\n"
+        "print(time.perf_counter() - start)"
+    )
+    timings = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-c", child], capture_output=True, text=True)
+        if result.returncode != 0:
+            return None
+        timings.append(float(result.stdout.strip()))
+    return timings
+
+
+def legacy_sign(private_key, photo_hash, location, metadata, nonce):
+    """Firma con il vecchio percorso web3 (solo per confronto)"""
+    from eth_account import Account
+    from eth_account.messages import encode_defunct
+    from web3 import Web3
+
+    message_hash = Web3.solidity_keccak(
+        ['bytes32', 'string', 'string', 'uint256'],
+        [photo_hash, location, metadata, nonce]
+    )
+    signed = Account.from_key(private_key).sign_message(encode_defunct(hexstr=message_hash.hex()))
+    return bytes(signed.signature)
+
+
+def check_identical(samples):
+    """Confronta signing_core con il percorso web3 su più nonce/metadati"""
+    sys.path.insert(0, SCRIPT_DIR)
+    from signing_core import PhotoSigner
+
+    signer = PhotoSigner(TEST_KEY)
+    for nonce in range(samples):
+        metadata = TEST_METADATA * (1 + nonce % 5)
+        fast = signer.sign(TEST_PHOTO_HASH, "Building A - Entrance", metadata, nonce)
+        legacy = legacy_sign(TEST_KEY, TEST_PHOTO_HASH, "Building A - Entrance", metadata, nonce)
+        if bytes.fromhex(fast['signature']) != legacy:
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark import/cold-start della firma")
+    parser.add_argument("--runs", type=int, default=5, help="Processi per ogni misura")
+    parser.add_argument("--samples", type=int, default=20, help="Firme confrontate con il percorso web3")
+    parser.add_argument("--output", default=None, help="Salva i risultati in JSON")
+    args = parser.parse_args()
+
+    print("📊 Benchmark import firma foto")
+    print("=" * 80)
+
+    results = {"imports": {}, "identical": None}
+
+    for name, code in IMPORT_TARGETS.items():
+        timings = measure_import(code, args.runs)
+        if timings is None:
+            print(f"{name:<32} ⚠️  import non disponibile")
+            continue
+        median = statistics.median(timings)
+        results["imports"][name] = {"median_s": median, "min_s": min(timings), "runs": timings}
+        print(f"{name:<32} mediana {median * 1000:8.1f} ms   min {min(timings) * 1000:8.1f} ms")
+
+    try:
+        results["identical"] = check_identical(args.samples)
+        print(f"\n🔑 Firme identiche al percorso web3: {'✅' if results['identical'] else '❌'}")
+    except ImportError:
+        print("\n⚠️  web3 non installato: confronto firme saltato")
+
+    print("=" * 80)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Risultati salvati in: {args.output}")
+
+    return 1 if results["identical"] is False else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Suite di benchmark del percorso di firma (sign_photo.py)
+Misura le tre fasi del percorso caldo:
+- hash SHA-256 della foto, per varie dimensioni
+- packing abi.encodePacked + keccak, per varie lunghezze dei metadati
+  (i metadati del receiver Go sono ~300 byte)
+- firma ECDSA secp256k1 (con prefisso EIP-191)
+Ogni fase è misurata a freddo (processo nuovo: import + prima chiamata)
+e a caldo (mediana di molte chiamate nello stesso processo).
+I risultati sono salvati in JSON e possono essere confrontati con una
+baseline per intercettare regressioni prima del deploy sui gateway.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Chiave e dati di prova (NON usare in produzione)
+TEST_KEY = "0x4c0883a69102937d6231471b5dbb6204fe5129617082792ae468d01a3f362318"
+TEST_PHOTO_HASH = "0x" + "ab" * 32
+TEST_LOCATION = "Building A - Entrance"
+
+# Codice eseguito a freddo per ciascuna fase (argv[1] = parametro della fase)
+COLD_CODE = {
+    "hash": (
+        "from sign_photo import hash_photo_file\n"
+        "hash_photo_file(sys.argv[1])"
+    ),
+    "pack": (
+        "from signing_core import photo_message_hash\n"
+        f"photo_message_hash({TEST_PHOTO_HASH!r}, {TEST_LOCATION!r}, 'm' * int(sys.argv[1]), 0)"
+    ),
+    "sign": (
+        "from signing_core import PhotoSigner\n"
+        f"PhotoSigner({TEST_KEY!r}).sign({TEST_PHOTO_HASH!r}, {TEST_LOCATION!r}, 'm' * int(sys.argv[1]), 0)"
+    ),
+}
+
+
+def measure_cold(stage, param, runs):
+    """Tempo (s) di import + prima chiamata in processi nuovi; ritorna la mediana"""
+    child = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        f"sys.path.insert(0, {SCRIPT_DIR!r})\n"
+        f"{COLD_CODE[stage]}\n"
+        "print(time.perf_counter() - start)"
+    )
+    timings = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", child, str(param)],
+            capture_output=True, text=True, check=True
+        )
+        timings.append(float(result.stdout.strip()))
+    return statistics.median(timings)
+
+
+def measure_warm(func, iterations, warmup=10):
+    """Mediana (s) di una chiamata ripetuta nello stesso processo"""
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def run_suite(photo_sizes_kb, metadata_lengths, iterations, cold_runs):
+    """Esegue tutte le fasi e ritorna la lista dei risultati"""
+    sys.path.insert(0, SCRIPT_DIR)
+    from sign_photo import hash_photo_file
+    from signing_core import PhotoSigner, photo_message_hash
+
+    results = []
+
+    def record(stage, param, unit, cold, warm):
+        results.append({
+            "stage": stage,
+            "param": param,
+            "unit": unit,
+            "cold_s": cold,
+            "warm_s": warm
+        })
+        cold_txt = f"{cold * 1000:10.2f} ms" if cold is not None else f"{'-':>13}"
+        print(f"{stage:<6} {param:>8} {unit:<4} cold {cold_txt}   warm {warm * 1e6:12.1f} us")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size_kb in photo_sizes_kb:
+            path = os.path.join(tmp, f"photo_{size_kb}kb.bin")
+            with open(path, "wb") as f:
+                f.write(os.urandom(size_kb * 1024))
+            cold = measure_cold("hash", path, cold_runs) if cold_runs else None
+            warm = measure_warm(lambda: hash_photo_file(path), iterations)
+            record("hash", size_kb, "KB", cold, warm)
+
+    for length in metadata_lengths:
+        metadata = "m" * length
+        cold = measure_cold("pack", length, cold_runs) if cold_runs else None
+        warm = measure_warm(
+            lambda: photo_message_hash(TEST_PHOTO_HASH, TEST_LOCATION, metadata, 0),
+            iterations
+        )
+        record("pack", length, "B", cold, warm)
+
+    signer = PhotoSigner(TEST_KEY)
+    for length in metadata_lengths:
+        metadata = "m" * length
+        cold = measure_cold("sign", length, cold_runs) if cold_runs else None
+        warm = measure_warm(
+            lambda: signer.sign(TEST_PHOTO_HASH, TEST_LOCATION, metadata, 0),
+            iterations
+        )
+        record("sign", length, "B", cold, warm)
+
+    return results
+
+
+def compare(results, baseline_file, tolerance):
+    """Confronta i tempi a caldo con una baseline; ritorna le regressioni"""
+    with open(baseline_file, "r") as f:
+        baseline = json.load(f)
+    previous = {(r["stage"], r["param"]): r for r in baseline["results"]}
+
+    regressions = []
+    for r in results:
+        old = previous.get((r["stage"], r["param"]))
+        if old and old["warm_s"] > 0 and r["warm_s"] > old["warm_s"] * (1 + tolerance):
+            regressions.append((r, old))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del percorso di firma foto")
+    parser.add_argument("--photo-sizes", default="64,1024,8192", help="Dimensioni foto in KB")
+    parser.add_argument("--metadata-lengths", default="0,64,300,1024", help="Lunghezze metadati in byte")
+    parser.add_argument("--iterations", type=int, default=200, help="Ripetizioni per le misure a caldo")
+    parser.add_argument("--cold-runs", type=int, default=3, help="Processi per le misure a freddo (0 = salta)")
+    parser.add_argument("--output", default="bench_sign_path.json", help="File JSON dei risultati")
+    parser.add_argument("--baseline", default=None, help="JSON di un'esecuzione precedente da confrontare")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Peggioramento ammesso rispetto alla baseline")
+    args = parser.parse_args()
+
+    photo_sizes = [int(s) for s in args.photo_sizes.split(",") if s.strip()]
+    metadata_lengths = [int(s) for s in args.metadata_lengths.split(",") if s.strip()]
+
+    print("📊 Benchmark percorso di firma")
+    print("=" * 80)
+
+    results = run_suite(photo_sizes, metadata_lengths, args.iterations, args.cold_runs)
+
+    print("=" * 80)
+
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "iterations": args.iterations,
+        "cold_runs": args.cold_runs,
+        "results": results
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Risultati salvati in: {args.output}")
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ Regressioni rispetto a {args.baseline}:")
+            for r, old in regressions:
+                print(f"   {r['stage']} {r['param']}{r['unit']}: "
+                      f"{old['warm_s'] * 1e6:.1f} us → {r['warm_s'] * 1e6:.1f} us")
+            return 1
+        print(f"\n✅ Nessuna regressione oltre il {args.tolerance:.0%} rispetto a {args.baseline}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark della cache delle chiavi derivate (signing_core.SignerCache)
+Firma N foto distribuite su K camere con la cache attiva e disattiva
+e confronta il throughput (firme/s) e i contatori hit/miss.
+"""
+
+import argparse
+import json
+import os
+import time
+
+from sign_photo import sign_photo
+from signing_core import signer_cache
+
+
+def make_cameras(count):
+    """Genera camere di prova con chiavi casuali (NON usare in produzione)"""
+    return [("0x" + os.urandom(32).hex(), "0x" + os.urandom(32).hex()) for _ in range(count)]
+
+
+def run(cameras, photos, metadata, use_cache):
+    """Firma `photos` foto a rotazione sulle camere; ritorna i secondi impiegati"""
+    photo_hash = "0x" + "ab" * 32
+    start = time.perf_counter()
+    for i in range(photos):
+        camera_id, private_key = cameras[i % len(cameras)]
+        sign_photo(
+            private_key, photo_hash, "Building A - Entrance", metadata, i,
+            camera_id=camera_id if use_cache else None
+        )
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cache chiavi derivate")
+    parser.add_argument("--photos", type=int, default=5000, help="Firme per ogni misura")
+    parser.add_argument("--cameras", type=int, default=50, help="Camere a rotazione")
+    parser.add_argument("--cache-size", type=int, default=1024, help="Capacità della cache LRU")
+    parser.add_argument("--metadata-bytes", type=int, default=300, help="Lunghezza metadati")
+    parser.add_argument("--output", default=None, help="Salva i risultati in JSON")
+    args = parser.parse_args()
+
+    cameras = make_cameras(args.cameras)
+    metadata = "m" * args.metadata_bytes
+    signer_cache.maxsize = args.cache_size
+
+    print("📊 Benchmark cache chiavi derivate")
+    print("=" * 80)
+    print(f"Foto: {args.photos}   Camere: {args.cameras}   Cache: {args.cache_size}\n")
+
+    results = {}
+    for label, use_cache in (("senza cache", False), ("con cache", True)):
+        signer_cache.clear()
+        elapsed = run(cameras, args.photos, metadata, use_cache)
+        rate = args.photos / elapsed
+        stats = signer_cache.stats()
+        results[label] = {"seconds": elapsed, "signatures_per_sec": rate, "cache": stats}
+        print(f"{label:<12} {elapsed:8.3f}s  {rate:10.1f} firme/s  "
+              f"hit={stats['hits']} miss={stats['misses']}")
+
+    speedup = results["con cache"]["signatures_per_sec"] / results["senza cache"]["signatures_per_sec"]
+    print(f"\n⚡ Speedup: {speedup:.2f}x")
+    print("=" * 80)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Risultati salvati in: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Audit dell'autorizzazione della flotta via getCameraInfo (asyncio)
+Invece di una chiamata get_camera_info() alla volta, le richieste partono
+in parallelo con un limite di concorrenza: i risultati vengono scritti
+(JSONL) man mano che arrivano e alla fine si riportano i percentili della
+latenza per richiesta.
+
+URL, timeout per endpoint, retry e backoff sono quelli di firefly_client.
+
+Uso:
+    python camera_audit.py camera_ids.txt --concurrency 64 --output audit.jsonl
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import sys
+import time
+
+import aiohttp
+
+import firefly_client
+from firefly_client import RETRY_STATUS, backoff_delay
+
+# ⚙️ Configurazione
+CONFIG = {
+    "CONCURRENCY": 64  # richieste getCameraInfo contemporanee
+}
+
+
+def percentile(sorted_values, pct):
+    """Percentile (nearest rank) di una lista già ordinata"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def latency_summary(latencies):
+    """Statistiche della latenza (ms): min, media, p50, p90, p95, p99, max"""
+    values = sorted(latencies)
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "min": values[0],
+        "mean": sum(values) / len(values),
+        "p50": percentile(values, 50),
+        "p90": percentile(values, 90),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": values[-1]
+    }
+
+
+async def _fetch_one(session, url, camera_id, timeout):
+    """
+    getCameraInfo di una camera, con i retry di firefly_client
+
+    Returns:
+        dict: camera_id, registered (True/False/None), authorized, info, error,
+              latency_ms (inclusi i retry), attempts
+    """
+    result = {"camera_id": camera_id, "registered": None, "authorized": None,
+              "info": None, "error": None}
+    retries = firefly_client.CONFIG["RETRIES"]
+    start = time.perf_counter()
+    attempt = 0
+    while True:
+        try:
+            async with session.post(url, json={"input": {"_cameraId": camera_id}}, timeout=timeout) as response:
+                text = await response.text()
+                if response.status < 400:
+                    data = json.loads(text)
+                    info = data.get("output") if isinstance(data, dict) else None
+                    if not isinstance(info, dict):
+                        # Risposta senza CameraInfo: errore non transitorio, la camera resta nel report
+                        raise ValueError(f"Risposta API non valida: 'output' mancante o non un oggetto: {text[:200]}")
+                    result.update(
+                        registered=int(info.get("registeredAt") or 0) > 0,
+                        authorized=bool(info.get("isAuthorized")),
+                        info=info
+                    )
+                    break
+                # getCameraInfo fa revert per le camere non registrate
+                if "non esistente" in text:
+                    result.update(registered=False, authorized=False)
+                    break
+                error = f"HTTP {response.status}: {text[:200]}"
+                transient = response.status in RETRY_STATUS
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, TypeError) as e:
+            # ValueError/TypeError: JSON non valido o campi di tipo inatteso (es. registeredAt)
+            error = f"{type(e).__name__}: {e}"
+            transient = not isinstance(e, (ValueError, TypeError))
+
+        if not transient or attempt >= retries:
+            result["error"] = error
+            break
+        await asyncio.sleep(backoff_delay(attempt))
+        attempt += 1
+
+    result["latency_ms"] = (time.perf_counter() - start) * 1000
+    result["attempts"] = attempt + 1
+    return result
+
+
+async def fetch_camera_infos(camera_ids, concurrency=CONFIG["CONCURRENCY"], base_url=None):
+    """
+    Interroga getCameraInfo per tutte le camere, al massimo `concurrency` alla volta
+
+    Generatore asincrono: ogni risultato (vedi _fetch_one) viene restituito
+    appena completato, quindi in ordine di arrivo e non di input. Gli ID
+    sono letti dall'iterabile solo quando un worker è libero.
+
+    Raises:
+        ValueError: concurrency minore di 1 (nessun worker: nessuna camera verificata)
+    """
+    if concurrency < 1:
+        raise ValueError(f"La concorrenza deve essere almeno 1 (indicata: {concurrency})")
+
+    client_url = (base_url or firefly_client.CONFIG["API_BASE_URL"]).rstrip('/')
+    url = (f"{client_url}/api/v1/namespaces/{firefly_client.CONFIG['NAMESPACE']}"
+           f"/apis/{firefly_client.CONFIG['API_NAME']}/query/getCameraInfo")
+    read_timeout = firefly_client.CONFIG["TIMEOUTS"]["getCameraInfo"]
+    timeout = aiohttp.ClientTimeout(sock_connect=firefly_client.CONFIG["CONNECT_TIMEOUT"],
+                                    sock_read=read_timeout)
+    headers = {"accept": "application/json", "Request-Timeout": f"{read_timeout}s"}
+
+    ids = iter(camera_ids)
+    results = asyncio.Queue()
+    done = object()
+
+    async def worker(session):
+        try:
+            for camera_id in ids:
+                try:
+                    result = await _fetch_one(session, url, camera_id, timeout)
+                except Exception as e:
+                    # Un errore inatteso non deve far sparire la camera dal report
+                    result = {"camera_id": camera_id, "registered": None, "authorized": None, "info": None,
+                              "error": f"{type(e).__name__}: {e}", "latency_ms": 0.0, "attempts": 1}
+                await results.put(result)
+        finally:
+            await results.put(done)
+
+    # Connessioni keep-alive: una per worker
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector, headers=headers) as session:
+        workers = [asyncio.create_task(worker(session)) for _ in range(concurrency)]
+        try:
+            running = len(workers)
+            while running:
+                item = await results.get()
+                if item is done:
+                    running -= 1
+                else:
+                    yield item
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+
+async def audit_fleet(camera_ids, out, concurrency=CONFIG["CONCURRENCY"], base_url=None, progress_every=1000):
+    """
+    Esegue l'audit scrivendo un record JSONL per camera su `out` appena disponibile
+
+    Returns:
+        dict: Conteggi (registrate, autorizzate, non registrate, errori) e latenze
+    """
+    counts = {"total": 0, "registered": 0, "authorized": 0, "notRegistered": 0, "errors": 0}
+    latencies = []
+    start = time.perf_counter()
+
+    async for result in fetch_camera_infos(camera_ids, concurrency=concurrency, base_url=base_url):
+        out.write(json.dumps(result) + "\n")
+        latencies.append(result["latency_ms"])
+        counts["total"] += 1
+        if result["error"] is not None:
+            counts["errors"] += 1
+        elif result["registered"]:
+            counts["registered"] += 1
+            counts["authorized"] += result["authorized"]
+        else:
+            counts["notRegistered"] += 1
+        if progress_every and counts["total"] % progress_every == 0:
+            out.flush()
+            print(f"   ... {counts['total']} camere verificate", file=sys.stderr)
+
+    elapsed = time.perf_counter() - start
+    return {
+        **counts,
+        "seconds": elapsed,
+        "rate": counts["total"] / elapsed if elapsed > 0 else 0.0,
+        "latencyMs": latency_summary(latencies)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Audit autorizzazione flotta via getCameraInfo')
+    parser.add_argument('ids_file', help='File con un Camera ID per riga ("-" = stdin)')
+    parser.add_argument('--concurrency', '-c', type=int, default=CONFIG["CONCURRENCY"], help='Richieste contemporanee')
+    parser.add_argument('--output', '-o', default='-', help='Output JSONL dei risultati ("-" = stdout)')
+    parser.add_argument('--api', default=firefly_client.CONFIG["API_BASE_URL"], help='URL base di FireFly')
+    args = parser.parse_args()
+
+    if args.concurrency < 1:
+        print(f"❌ --concurrency deve essere almeno 1 (indicato: {args.concurrency})", file=sys.stderr)
+        return 1
+
+    try:
+        source = sys.stdin if args.ids_file == '-' else open(args.ids_file, 'r')
+    except FileNotFoundError:
+        print(f"❌ File {args.ids_file} non trovato", file=sys.stderr)
+        return 1
+    camera_ids = (line.strip() for line in source if line.strip())
+
+    print("🔎 Audit flotta - getCameraInfo", file=sys.stderr)
+    print("=" * 80, file=sys.stderr)
+    print(f"📡 API: {args.api}   Concorrenza: {args.concurrency}", file=sys.stderr)
+
+    out = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        summary = asyncio.run(audit_fleet(camera_ids, out, concurrency=args.concurrency, base_url=args.api))
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if source is not sys.stdin:
+            source.close()
+
+    lat = summary["latencyMs"]
+    print("=" * 80, file=sys.stderr)
+    print(f"✅ {summary['total']} camere in {summary['seconds']:.2f}s ({summary['rate']:.1f}/s)", file=sys.stderr)
+    print(f"   Registrate: {summary['registered']}   Autorizzate: {summary['authorized']}   "
+          f"Non registrate: {summary['notRegistered']}   Errori: {summary['errors']}", file=sys.stderr)
+    if lat["count"]:
+        print(f"⏱️  Latenza ms  p50 {lat['p50']:.1f}  p90 {lat['p90']:.1f}  p95 {lat['p95']:.1f}  "
+              f"p99 {lat['p99']:.1f}  max {lat['max']:.1f}", file=sys.stderr)
+    if args.output != '-':
+        print(f"💾 Risultati in: {args.output}", file=sys.stderr)
+
+    return 0 if summary["errors"] == 0 else 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
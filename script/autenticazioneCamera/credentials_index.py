@@ -0,0 +1,295 @@
+"""
+Indice persistente del file camera_keys.json
+Evita di rileggere e scorrere tutto il file JSON a ogni ricerca:
+le camere sono indicizzate per camera_id normalizzato (senza 0x, minuscolo)
+e per address in un file SQLite accanto al keystore (camera_keys.json.idx).
+L'indice viene ricostruito solo quando il keystore cambia (mtime/size/inode
+dello snapshot e del journal di key_journal).
+
+L'indice non contiene le chiavi: per ogni camera registra solo camera_id,
+address e la posizione in byte della sua entry nello snapshot o nel journal.
+La ricerca legge quella sola entry dal keystore.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+
+from key_journal import journal_path
+
+# Suffisso del file indice accanto al keystore JSON
+INDEX_SUFFIX = ".idx"
+
+# Formato dell'indice: un indice di versione diversa viene ricostruito
+# (le versioni precedenti contenevano le entry complete, chiavi incluse)
+INDEX_VERSION = "2"
+
+# Origine di un'entry: snapshot JSON o riga del journal
+SOURCE_SNAPSHOT = "snapshot"
+SOURCE_JOURNAL = "journal"
+
+# Connessioni aperte per processo: path indice -> (fingerprint, connessione)
+_connections = {}
+_lock = threading.Lock()
+
+_decoder = json.JSONDecoder()
+_whitespace = re.compile(r'[ \t\n\r]*')
+
+
+def _normalize_camera_id(camera_id):
+    """Normalizza un camera ID per il confronto (senza 0x, minuscolo)"""
+    return camera_id.replace('0x', '').lower()
+
+
+def _fingerprint(json_file):
+    """Impronta del keystore: cambia quando lo snapshot o il journal vengono modificati"""
+    parts = []
+    for path in (json_file, journal_path(json_file)):
+        try:
+            st = os.stat(path)
+            parts.append(f"{st.st_mtime_ns}:{st.st_size}:{st.st_ino}")
+        except FileNotFoundError:
+            parts.append("-")
+    if parts == ["-", "-"]:
+        raise FileNotFoundError(json_file)
+    return "|".join(parts)
+
+
+def _read_bytes(path):
+    """Contenuto del file (None se non esiste)"""
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _snapshot_entries(data):
+    """
+    Entry dello snapshot JSON con la loro posizione nel file
+
+    Il testo è decodificato come latin-1 (un carattere per byte), quindi le
+    posizioni restituite da raw_decode sono offset in byte; i valori sono
+    poi decodificati dai byte originali (UTF-8).
+
+    Yields:
+        tuple: (camera_id, entry, offset, lunghezza) in ordine di file
+    """
+    text = data.decode('latin-1')
+
+    def skip(pos):
+        return _whitespace.match(text, pos).end()
+
+    def expect(pos, char):
+        if text[pos:pos + 1] != char:
+            raise json.JSONDecodeError(f"Atteso '{char}'", text, pos)
+        return skip(pos + 1)
+
+    pos = expect(skip(0), '{')
+    if text[pos:pos + 1] == '}':
+        return
+    while True:
+        _, key_end = _decoder.raw_decode(text, pos)
+        camera_id = json.loads(data[pos:key_end])
+        pos = expect(skip(key_end), ':')
+        _, value_end = _decoder.raw_decode(text, pos)
+        yield camera_id, json.loads(data[pos:value_end]), pos, value_end - pos
+        pos = skip(value_end)
+        if text[pos:pos + 1] == '}':
+            return
+        pos = expect(pos, ',')
+
+
+def _journal_entries(data):
+    """
+    Righe valide del journal con la loro posizione (righe troncate ignorate)
+
+    Yields:
+        tuple: (camera_id, entry, offset, lunghezza) in ordine di file
+    """
+    offset = 0
+    for line in data.splitlines(keepends=True):
+        try:
+            record = json.loads(line)
+            yield record["camera_id"], record["entry"], offset, len(line)
+        except json.JSONDecodeError:
+            pass
+        offset += len(line)
+
+
+def _read_locations(json_file):
+    """
+    Posizione dell'entry di ogni camera, come read_keystore (il journal prevale)
+
+    Returns:
+        tuple: (fingerprint, dict camera_id -> (address, origine, offset, lunghezza))
+    """
+    while True:
+        fingerprint = _fingerprint(json_file)
+        snapshot = _read_bytes(json_file)
+        journal = _read_bytes(journal_path(json_file))
+        # Keystore cambiato durante la lettura: le posizioni non sarebbero valide
+        if _fingerprint(json_file) != fingerprint:
+            continue
+
+        locations = {}
+        if snapshot is not None:
+            for camera_id, entry, offset, length in _snapshot_entries(snapshot):
+                locations[camera_id] = (entry['address'], SOURCE_SNAPSHOT, offset, length)
+        for camera_id, entry, offset, length in _journal_entries(journal or b""):
+            locations[camera_id] = (entry['address'], SOURCE_JOURNAL, offset, length)
+        return fingerprint, locations
+
+
+def build_index(json_file, index_file=None):
+    """
+    Ricostruisce l'indice leggendo il keystore JSON una sola volta
+
+    L'indice viene scritto in un file temporaneo e poi rinominato,
+    così i lettori concorrenti vedono sempre un indice completo.
+
+    Returns:
+        tuple: (path del file indice, fingerprint del keystore indicizzato)
+    """
+    index_file = index_file or json_file + INDEX_SUFFIX
+    fingerprint, locations = _read_locations(json_file)
+
+    tmp_file = f"{index_file}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_file):
+        os.remove(tmp_file)
+
+    # Camera ID e address non sono segreti, ma l'indice resta comunque privato
+    os.close(os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600))
+    conn = sqlite3.connect(tmp_file)
+    try:
+        conn.executescript("""
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE cameras (
+                position INTEGER PRIMARY KEY,
+                camera_key TEXT NOT NULL UNIQUE,
+                address TEXT NOT NULL,
+                camera_id TEXT NOT NULL,
+                source TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL
+            );
+            CREATE INDEX idx_cameras_address ON cameras(address);
+        """)
+        conn.executemany(
+            "INSERT OR IGNORE INTO cameras (camera_key, address, camera_id, source, offset, length) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                (_normalize_camera_id(key), address.lower(), key, source, offset, length)
+                for key, (address, source, offset, length) in locations.items()
+            )
+        )
+        conn.executemany(
+            "INSERT INTO meta (key, value) VALUES (?, ?)",
+            (('fingerprint', fingerprint), ('version', INDEX_VERSION))
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    os.replace(tmp_file, index_file)
+
+    return index_file, fingerprint
+
+
+def _open_index(json_file):
+    """
+    Ritorna l'indice aggiornato, ricostruendolo se il keystore è cambiato
+
+    Returns:
+        tuple: (fingerprint del keystore indicizzato, connessione)
+    """
+    index_file = json_file + INDEX_SUFFIX
+    fingerprint = _fingerprint(json_file)
+
+    with _lock:
+        cached = _connections.get(index_file)
+        if cached is not None and cached[0] == fingerprint:
+            return cached
+        if cached is not None:
+            cached[1].close()
+            del _connections[index_file]
+
+        conn = None
+        if os.path.exists(index_file):
+            try:
+                os.chmod(index_file, 0o600)  # indice creato da versioni precedenti con permessi più larghi
+            except OSError:
+                pass  # Potrebbe fallire su Windows
+            conn = sqlite3.connect(index_file, check_same_thread=False)
+            meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+            if meta.get('fingerprint') != fingerprint or meta.get('version') != INDEX_VERSION:
+                conn.close()
+                conn = None
+
+        if conn is None:
+            # Un indice di versione precedente (con le chiavi) viene sostituito
+            _, fingerprint = build_index(json_file, index_file)
+            conn = sqlite3.connect(index_file, check_same_thread=False)
+
+        _connections[index_file] = (fingerprint, conn)
+        return fingerprint, conn
+
+
+def _read_entry(json_file, source, offset, length):
+    """Legge dal keystore la sola entry indicata dall'indice"""
+    path = json_file if source == SOURCE_SNAPSHOT else journal_path(json_file)
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = f.read(length)
+    value = json.loads(data)
+    return value if source == SOURCE_SNAPSHOT else value["entry"]
+
+
+def lookup(json_file, camera_id=None, address=None):
+    """
+    Cerca una camera nell'indice e legge la sua entry dal keystore
+
+    Args:
+        json_file: Path al keystore JSON
+        camera_id: ID della camera (con o senza 0x)
+        address: Address della camera (alternativo a camera_id)
+        Se entrambi assenti ritorna la prima camera del file.
+
+    Returns:
+        tuple: (chiave originale, entry JSON) oppure None se non trovata
+    """
+    while True:
+        fingerprint, conn = _open_index(json_file)
+
+        with _lock:
+            if camera_id:
+                row = conn.execute(
+                    "SELECT camera_id, source, offset, length FROM cameras WHERE camera_key = ?",
+                    (_normalize_camera_id(camera_id),)
+                ).fetchone()
+            elif address:
+                row = conn.execute(
+                    "SELECT camera_id, source, offset, length FROM cameras "
+                    "WHERE address = ? ORDER BY position LIMIT 1",
+                    (address.lower(),)
+                ).fetchone()
+            else:
+                row = conn.execute(
+                    "SELECT camera_id, source, offset, length FROM cameras ORDER BY position LIMIT 1"
+                ).fetchone()
+
+        try:
+            if row is None:
+                found = None
+            else:
+                found = row[0], _read_entry(json_file, *row[1:])
+        except (OSError, ValueError, KeyError, TypeError):
+            if _fingerprint(json_file) == fingerprint:
+                raise
+            continue  # Keystore riscritto durante la lettura: indice da ricostruire
+
+        # Posizioni valide solo se il keystore non è cambiato nel frattempo
+        if _fingerprint(json_file) == fingerprint:
+            return found
@@ -0,0 +1,318 @@
+"""
+Client HTTP condiviso per l'API FireFly del contratto secCamv3
+Tutti gli script Python passano da qui invece di aprire una connessione
+nuova con requests.post ad ogni chiamata:
+- pool di connessioni keep-alive (dimensione configurabile)
+- retry con backoff esponenziale e jitter sugli errori transitori
+- timeout distinti per endpoint (query brevi, invoke lunghi come nel receiver Go)
+
+Endpoint coperti (gli stessi usati dagli script e dal gateway Go):
+    query:  getCameraInfo, getNonce, verifyPhoto
+    invoke: recordPhotoWithSignature, recordPhoto, registerAndAuthorizeCamera
+    eventi: listener del contratto ed eventi blockchain del namespace
+
+Esempio:
+    client = get_client()
+    nonce = client.get_nonce(relay_address)
+    client.record_photo_with_signature(photo_hash, location, metadata, signature)
+"""
+
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+# ⚙️ Configurazione
+CONFIG = {
+    "API_BASE_URL": os.environ.get("FIREFLY_API_URL", "http://127.0.0.1:5000"),
+    "NAMESPACE": "default",
+    "API_NAME": "secCamv3",
+    "POOL_SIZE": 32,          # connessioni keep-alive massime per host
+    "RETRIES": 3,             # tentativi aggiuntivi sugli errori transitori
+    "BACKOFF_BASE": 0.25,     # secondi, raddoppia ad ogni tentativo
+    "BACKOFF_MAX": 5.0,       # attesa massima tra due tentativi
+    "CONNECT_TIMEOUT": 5,
+    # Timeout di lettura per endpoint (secondi); "query"/"invoke" valgono per gli altri metodi
+    "TIMEOUTS": {
+        "query": 30,
+        "invoke": 120,
+        "getCameraInfo": 30,
+        "getNonce": 30,
+        "verifyPhoto": 30,
+        "recordPhotoWithSignature": 120,
+        "recordPhoto": 120,
+        "registerAndAuthorizeCamera": 120
+    }
+}
+
+# Status HTTP per cui ripetere la richiesta (FireFly sovraccarico o non pronto)
+RETRY_STATUS = {429, 502, 503, 504}
+
+
+class FireFlyError(requests.exceptions.HTTPError):
+    """Risposta di errore di FireFly (revert del contratto o errore HTTP non transitorio)"""
+
+    @property
+    def status_code(self):
+        return self.response.status_code if self.response is not None else None
+
+    @property
+    def is_revert(self):
+        """True se FireFly riporta un revert del contratto (es. "Telecamera non esistente")"""
+        return self.response is not None and "revert" in self.response.text.lower()
+
+
+def _never_sent(error):
+    """True se la richiesta non ha raggiunto FireFly (connessione rifiutata o non stabilita)"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+def backoff_delay(attempt, base=None, maximum=None):
+    """
+    Attesa prima del tentativo `attempt` (full jitter: uniforme tra 0 e base * 2^attempt)
+
+    Usata anche dai client asincroni (camera_audit) per ripetere le richieste
+    con la stessa politica; base e maximum di default da CONFIG.
+    """
+    base = CONFIG["BACKOFF_BASE"] if base is None else base
+    maximum = CONFIG["BACKOFF_MAX"] if maximum is None else maximum
+    return random.uniform(0, min(maximum, base * (2 ** attempt)))
+
+
+class FireFlyClient:
+    """
+    Client FireFly con connessioni riusate tra le chiamate (thread-safe)
+
+    Le query sono idempotenti e vengono ripetute su qualunque errore
+    transitorio (connessione, timeout, 429/502/503/504). Le invoke vengono
+    ripetute solo se la richiesta non può essere arrivata a FireFly
+    (connessione rifiutata, 429/503): un timeout di lettura potrebbe
+    nascondere una transazione già inviata.
+    """
+
+    def __init__(self, base_url=None, namespace=None, api_name=None, pool_size=None,
+                 retries=None, timeouts=None):
+        base_url = (base_url or CONFIG["API_BASE_URL"]).rstrip('/')
+        namespace = namespace or CONFIG["NAMESPACE"]
+        api_name = api_name or CONFIG["API_NAME"]
+        self.base_url = base_url
+        self.namespace = namespace
+        self.api_url = f"{base_url}/api/v1/namespaces/{namespace}/apis/{api_name}"
+        self.pool_size = pool_size or CONFIG["POOL_SIZE"]
+        self.retries = CONFIG["RETRIES"] if retries is None else retries
+        self.timeouts = dict(CONFIG["TIMEOUTS"], **(timeouts or {}))
+
+        self.calls = 0
+        self.retried = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+        self.session = requests.Session()
+        # pool_block: oltre pool_size richieste concorrenti si attende una connessione libera
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, pool_block=True)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"accept": "application/json", "Content-Type": "application/json"})
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _timeout(self, kind, method):
+        read_timeout = self.timeouts.get(method, self.timeouts[kind])
+        return CONFIG["CONNECT_TIMEOUT"], read_timeout
+
+    def _count(self, field):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def _request(self, http_method, url, label, timeout, idempotent, json_body=None, params=None):
+        """
+        Richiesta a FireFly con retry sugli errori transitori
+
+        Raises:
+            FireFlyError: Risposta di errore (revert o HTTP non transitorio)
+            requests.exceptions.RequestException: Errore di rete dopo tutti i tentativi
+        """
+        # Header letto da FireFly per il proprio timeout verso il nodo
+        headers = {"Request-Timeout": f"{int(timeout[1])}s"}
+
+        attempt = 0
+        while True:
+            self._count("calls")
+            try:
+                response = self.session.request(http_method, url, json=json_body, params=params,
+                                                headers=headers, timeout=timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                # Le invoke si ripetono solo se la connessione non è mai stata stabilita
+                if not (idempotent or _never_sent(e)) or attempt >= self.retries:
+                    self._count("failures")
+                    raise
+            else:
+                if response.ok:
+                    return response.json()
+                transient = response.status_code in RETRY_STATUS and (
+                    idempotent or response.status_code in (429, 503)
+                )
+                if not transient or attempt >= self.retries:
+                    self._count("failures")
+                    raise FireFlyError(
+                        f"HTTP {response.status_code} da {label}: {response.text[:200]}",
+                        response=response
+                    )
+                response.close()
+
+            time.sleep(backoff_delay(attempt))
+            attempt += 1
+            self._count("retried")
+
+    def _post(self, kind, method, inputs, params=None):
+        """POST su /query o /invoke (solo le query sono considerate idempotenti)"""
+        return self._request("POST", f"{self.api_url}/{kind}/{method}", f"{kind}/{method}",
+                             self._timeout(kind, method), kind == "query",
+                             json_body={"input": inputs}, params=params)
+
+    def query(self, method, **inputs):
+        """Chiamata view del contratto; ritorna la risposta JSON di FireFly"""
+        return self._post("query", method, inputs)
+
+    def invoke(self, method, confirm=True, **inputs):
+        """Transazione sul contratto; con confirm=True FireFly attende la conferma"""
+        return self._post("invoke", method, inputs, params={"confirm": "true"} if confirm else None)
+
+    # --- Query ---
+
+    def get_camera_info(self, camera_id):
+        """
+        CameraInfo della camera (dict "output" di FireFly)
+
+        Raises:
+            FireFlyError: Camera non registrata (revert "Telecamera non esistente") o errore HTTP
+            ValueError: Risposta senza "output"
+        """
+        data = self.query("getCameraInfo", _cameraId=camera_id)
+        if "output" not in data:
+            raise ValueError("Risposta API non valida: 'output' mancante")
+        return data["output"]
+
+    def get_nonce(self, address):
+        """Nonce corrente dell'address (come getRelayNonce nel receiver Go)"""
+        output = self.query("getNonce", _cameraAddress=address).get("output")
+        if isinstance(output, dict):
+            for key in ("0", "_0", "nonce"):
+                if key in output:
+                    output = output[key]
+                    break
+            else:
+                raise ValueError(f"Nonce non trovato nella risposta: {output}")
+        if output is None:
+            raise ValueError("Risposta API non valida: 'output' mancante")
+        return int(output)
+
+    def verify_photo(self, photo_hash):
+        """
+        Esito di verifyPhoto: (exists, dettagli)
+
+        FireFly può restituire "exists" al primo livello o dentro "output".
+        """
+        data = self.query("verifyPhoto", _photoHash=photo_hash)
+        output = data.get("output")
+        details = output if isinstance(output, dict) else data
+        exists = data.get("exists", details.get("exists", False))
+        return bool(exists), details
+
+    # --- Invoke ---
+
+    def record_photo_with_signature(self, photo_hash, location, metadata, signature, confirm=True):
+        """Registra una foto firmata dalla camera (inviata dal relay)"""
+        return self.invoke("recordPhotoWithSignature", confirm=confirm, _photoHash=photo_hash,
+                           _location=location, _metadata=metadata, _signature=signature)
+
+    def record_photo(self, photo_hash, location, metadata, confirm=True):
+        """Registra una foto inviata direttamente dal wallet della camera"""
+        return self.invoke("recordPhoto", confirm=confirm, _photoHash=photo_hash,
+                           _location=location, _metadata=metadata)
+
+    def register_and_authorize_camera(self, mac_address, efuse_id, wallet_address, location, model,
+                                      confirm=True):
+        """Registra e autorizza una nuova camera"""
+        return self.invoke("registerAndAuthorizeCamera", confirm=confirm, _macAddress=mac_address,
+                           _eFuseId=efuse_id, _walletAddress=wallet_address,
+                           _location=location, _model=model)
+
+    # --- Listener ed eventi blockchain ---
+
+    def listeners(self, event):
+        """Listener FireFly esistenti per un evento del contratto"""
+        return self._request("GET", f"{self.api_url}/listeners/{event}", f"listeners/{event}",
+                             self._timeout("query", "listeners"), True)
+
+    def ensure_listener(self, event, name=None):
+        """ID del listener per l'evento, creandolo se manca (senza listener FireFly non registra l'evento)"""
+        existing = self.listeners(event)
+        if existing:
+            return existing[0]["id"]
+        created = self._request("POST", f"{self.api_url}/listeners/{event}", f"listeners/{event}",
+                                self._timeout("invoke", "listeners"), False,
+                                json_body={"name": name or event})
+        return created["id"]
+
+    def events(self, after=None, limit=100, descending=False):
+        """
+        Eventi blockchain del namespace (con il blockchainEvent incluso)
+
+        Args:
+            after: Solo eventi con sequence maggiore (None = tutti)
+            limit: Numero massimo di eventi
+            descending: Dal più recente (per leggere l'ultima sequence)
+        """
+        params = {
+            "type": "blockchain_event_received",
+            "fetchreferences": "true",
+            "sort": "-sequence" if descending else "sequence",
+            "limit": str(limit)
+        }
+        if after is not None:
+            params["sequence"] = f">{after}"
+        return self._request("GET", f"{self.base_url}/api/v1/namespaces/{self.namespace}/events", "events",
+                             self._timeout("query", "events"), True, params=params)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'requests': self.calls,
+                'retried': self.retried,
+                'failures': self.failures,
+                'pool_size': self.pool_size
+            }
+
+
+# Client condivisi per processo: (base_url, namespace, api_name) -> FireFlyClient
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(base_url=None, namespace=None, api_name=None):
+    """Ritorna il client condiviso per l'API indicata (creato alla prima chiamata)"""
+    key = (
+        (base_url or CONFIG["API_BASE_URL"]).rstrip('/'),
+        namespace or CONFIG["NAMESPACE"],
+        api_name or CONFIG["API_NAME"]
+    )
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = FireFlyClient(*key)
+        return client
@@ -0,0 +1,581 @@
+#!/usr/bin/env python3
+"""
+Server FireFly locale che replica il contratto SecurityCamera V3 (secCamv3)
+Serve per i benchmark e i test della pipeline senza uno stack FireFly:
+espone le stesse route usate da firefly_client, camera_audit e dal receiver
+Go, con uno stato in memoria che applica le regole del contratto:
+- hash duplicati ("Foto gia registrata"), hash zero ("Hash non valido")
+- nonce del relay (msg.sender) incrementato ad ogni foto registrata
+- firmatario recuperato dalla firma con il nonce corrente del relay e
+  confrontato con le camere registrate e autorizzate
+- registrazione/autorizzazione/revoca solo dall'owner
+
+Route (prefisso /api/v1/namespaces/<ns>/apis/secCamv3):
+    query:  getCameraInfo, getCameraInfoByAddress, getNonce, verifyPhoto, getTotalPhotos
+    invoke: recordPhotoWithSignature, registerCamera, authorizeCamera,
+            registerAndAuthorizeCamera, revokeCamera, setPaused
+    listeners/<evento> (GET/POST) e /api/v1/namespaces/<ns>/events per la
+    cache del receiver Go (CameraRegistered, CameraAuthorized, CameraRevoked, PhotoRecorded)
+
+I require falliti rispondono HTTP 500 con il motivo del revert nel testo,
+come FireFly; input non codificabili secondo l'ABI (tipi errati, null,
+hex non valido) HTTP 400 senza toccare lo stato. Latenza ed errori
+transitori (503) sono configurabili.
+
+Uso:
+    python firefly_local.py --keys camera_keys.json --query-latency 20 --invoke-latency 200 --error-rate 0.01
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from eth_hash.auto import keccak
+
+from sign_photo import load_all_credentials
+from signing_core import ZERO_ADDRESS, recover_signer
+
+# ⚙️ Configurazione
+CONFIG = {
+    "HOST": "127.0.0.1",
+    "PORT": 5000,
+    "NAMESPACE": "default",
+    "API_NAME": "secCamv3",
+    # Relay (msg.sender delle invoke senza "key") e owner del contratto, come nel receiver Go
+    "RELAY_ADDRESS": "0xbaecd1f353293981312b558d663e41299f3baa34",
+    "QUERY_LATENCY_MS": 0,
+    "INVOKE_LATENCY_MS": 0,
+    "JITTER": 0.2,       # variazione relativa della latenza (+/-)
+    "ERROR_RATE": 0.0    # frazione di richieste rifiutate con 503 (prima di toccare lo stato)
+}
+
+MAX_PHOTOS_PER_CAMERA = 1000000
+
+ZERO_HASH = "0x" + "00" * 32
+
+
+class ContractRevert(Exception):
+    """require fallito: il messaggio è il motivo del revert del contratto"""
+
+
+class InvalidInput(ContractRevert):
+    """Input non codificabile secondo l'ABI: FireFly rifiuta la richiesta (HTTP 400) senza inviarla"""
+
+
+def _hex(value, name, size=None):
+    """Normalizza un valore bytes/bytesN in "0x" + hex minuscolo"""
+    raw = value[2:] if isinstance(value, str) and value.startswith(('0x', '0X')) else value
+    try:
+        data = bytes.fromhex(raw)
+    except (TypeError, ValueError):
+        data = None
+    if data is None or (size is not None and len(data) != size):
+        raise InvalidInput(f"Valore bytes{size or ''} non valido per {name}: {value!r}")
+    return "0x" + raw.lower()
+
+
+def _bytes32(value, name):
+    """Normalizza un bytes32 in "0x" + 64 hex minuscoli"""
+    return _hex(value, name, 32)
+
+
+def _address(value, name="address"):
+    """Normalizza un address in "0x" + 40 hex minuscoli (come li restituisce FireFly)"""
+    raw = value[2:] if isinstance(value, str) and value.startswith(('0x', '0X')) else value
+    try:
+        if len(bytes.fromhex(raw)) != 20:
+            raise ValueError
+    except (TypeError, ValueError):
+        raise InvalidInput(f"Address non valido per {name}: {value!r}")
+    return "0x" + raw.lower()
+
+
+def _string(value, name):
+    """Parametro string dell'ABI (assente = stringa vuota)"""
+    if value is None:
+        return ""
+    if not isinstance(value, str):
+        raise InvalidInput(f"Valore string non valido per {name}: {value!r}")
+    return value
+
+
+def _bool(value, name):
+    """Parametro bool dell'ABI"""
+    if not isinstance(value, bool):
+        raise InvalidInput(f"Valore bool non valido per {name}: {value!r}")
+    return value
+
+
+def generate_camera_id(mac_address, efuse_id):
+    """keccak256(abi.encodePacked(mac, eFuse)) come generateCameraId del contratto"""
+    return "0x" + keccak(mac_address.encode('utf-8') + efuse_id.encode('utf-8')).hex()
+
+
+class ContractState:
+    """
+    Stato in memoria del contratto SecurityCamera V3
+
+    I metodi replicano le funzioni Solidity omonime; un require fallito
+    solleva ContractRevert senza modificare lo stato.
+    """
+
+    def __init__(self, owner=CONFIG["RELAY_ADDRESS"]):
+        self.owner = _address(owner, "owner")
+        self.paused = False
+        self.cameras = {}            # cameraId -> CameraInfo
+        self.address_to_camera = {}  # wallet -> cameraId
+        self.nonces = {}             # address -> nonce
+        self.photo_records = []
+        self.hash_to_index = {}
+        self.listeners = {}          # nome evento -> listener
+        self.events = []
+        self._lock = threading.Lock()
+
+    # --- Eventi (solo per gli eventi con un listener, come FireFly) ---
+
+    def _emit(self, name, output):
+        listener = self.listeners.get(name)
+        if listener is None:
+            return
+        event_id = str(uuid.uuid4())
+        now = datetime.now(timezone.utc).isoformat()
+        self.events.append({
+            "id": str(uuid.uuid4()),
+            "sequence": len(self.events) + 1,
+            "type": "blockchain_event_received",
+            "namespace": CONFIG["NAMESPACE"],
+            "reference": event_id,
+            "created": now,
+            "blockchainEvent": {
+                "id": event_id,
+                "name": name,
+                "listener": listener["id"],
+                "namespace": CONFIG["NAMESPACE"],
+                "output": output,
+                "timestamp": now
+            }
+        })
+
+    def add_listener(self, name, body):
+        with self._lock:
+            listener = self.listeners.get(name)
+            if listener is None:
+                listener = self.listeners[name] = {
+                    "id": str(uuid.uuid4()),
+                    "name": body.get("name") or name,
+                    "namespace": CONFIG["NAMESPACE"],
+                    "event": {"name": name},
+                    "created": datetime.now(timezone.utc).isoformat()
+                }
+            return listener
+
+    def get_listeners(self, name):
+        with self._lock:
+            return [self.listeners[name]] if name in self.listeners else []
+
+    def query_events(self, after=None, descending=False, limit=100, event_type=None):
+        with self._lock:
+            events = [
+                e for e in self.events
+                if (after is None or e["sequence"] > after) and (event_type is None or e["type"] == event_type)
+            ]
+        if descending:
+            events.reverse()
+        return events[:limit]
+
+    # --- Funzioni del contratto ---
+
+    def _only_owner(self, sender):
+        if sender != self.owner:
+            raise ContractRevert("Solo il proprietario")
+
+    def register_camera(self, sender, mac_address, efuse_id, wallet_address, location, model, camera_id=None):
+        """registerCamera; camera_id esplicito solo per il caricamento da keystore (senza MAC/eFuse)"""
+        self._only_owner(sender)
+        wallet = _address(wallet_address, "_walletAddress")
+        if wallet == ZERO_ADDRESS:
+            raise ContractRevert("Indirizzo non valido")
+        if camera_id is None:
+            if not mac_address:
+                raise ContractRevert("MAC address richiesto")
+            if not efuse_id:
+                raise ContractRevert("eFuse ID richiesto")
+            camera_id = generate_camera_id(mac_address, efuse_id)
+        if camera_id in self.cameras:
+            raise ContractRevert("Telecamera gia registrata")
+        if wallet in self.address_to_camera:
+            raise ContractRevert("Wallet gia in uso")
+
+        self.cameras[camera_id] = {
+            "cameraId": camera_id,
+            "macAddress": mac_address,
+            "eFuseId": efuse_id,
+            "walletAddress": wallet,
+            "isAuthorized": False,
+            "registeredAt": int(time.time()),
+            "photoCount": 0,
+            "location": location,
+            "model": model
+        }
+        self.address_to_camera[wallet] = camera_id
+        self._emit("CameraRegistered", {
+            "cameraId": camera_id, "walletAddress": wallet,
+            "macAddress": mac_address, "eFuseId": efuse_id
+        })
+        return camera_id
+
+    def authorize_camera(self, sender, camera_id):
+        self._only_owner(sender)
+        camera = self.cameras.get(camera_id)
+        if camera is None:
+            raise ContractRevert("Telecamera non registrata")
+        if camera["isAuthorized"]:
+            raise ContractRevert("Gia autorizzata")
+        camera["isAuthorized"] = True
+        self._emit("CameraAuthorized", {"cameraId": camera_id, "walletAddress": camera["walletAddress"]})
+
+    def register_and_authorize_camera(self, sender, mac_address, efuse_id, wallet_address, location, model):
+        camera_id = self.register_camera(sender, mac_address, efuse_id, wallet_address, location, model)
+        self.authorize_camera(sender, camera_id)
+        return camera_id
+
+    def revoke_camera(self, sender, camera_id):
+        self._only_owner(sender)
+        camera = self.cameras.get(camera_id)
+        if camera is None or not camera["isAuthorized"]:
+            raise ContractRevert("Non autorizzata")
+        camera["isAuthorized"] = False
+        self._emit("CameraRevoked", {"cameraId": camera_id, "walletAddress": camera["walletAddress"]})
+
+    def set_paused(self, sender, paused):
+        self._only_owner(sender)
+        self.paused = bool(paused)
+
+    def record_photo_with_signature(self, sender, photo_hash, location, metadata, signature):
+        if self.paused:
+            raise ContractRevert("Contratto in pausa")
+        if photo_hash == ZERO_HASH:
+            raise ContractRevert("Hash non valido")
+        if photo_hash in self.hash_to_index:
+            raise ContractRevert("Foto gia registrata")
+
+        try:
+            camera_address = recover_signer(photo_hash, location, metadata, self.nonces.get(sender, 0), signature)
+        except ValueError as e:
+            # Lunghezza firma / valore v non validi (require di recoverAddress)
+            raise ContractRevert(str(e))
+        camera_address = camera_address.lower()
+
+        camera_id = self.address_to_camera.get(camera_address)
+        if camera_id is None:
+            raise ContractRevert("Telecamera non registrata")
+        camera = self.cameras[camera_id]
+        if not camera["isAuthorized"]:
+            raise ContractRevert("Telecamera non autorizzata")
+        if camera["photoCount"] >= MAX_PHOTOS_PER_CAMERA:
+            raise ContractRevert("Limite raggiunto")
+
+        self.nonces[sender] = self.nonces.get(sender, 0) + 1
+        record_id = len(self.photo_records)
+        timestamp = int(time.time())
+        self.photo_records.append({
+            "photoHash": photo_hash,
+            "timestamp": timestamp,
+            "cameraId": camera_id,
+            "cameraAddress": camera_address,
+            "relayAddress": sender,
+            "location": location,
+            "metadata": metadata
+        })
+        self.hash_to_index[photo_hash] = record_id
+        camera["photoCount"] += 1
+        self._emit("PhotoRecorded", {
+            "photoHash": photo_hash, "timestamp": str(timestamp), "cameraId": camera_id,
+            "cameraAddress": camera_address, "relayAddress": sender,
+            "location": location, "recordId": str(record_id)
+        })
+        return record_id
+
+    def get_camera_info(self, camera_id):
+        camera = self.cameras.get(camera_id)
+        if camera is None:
+            raise ContractRevert("Telecamera non esistente")
+        return camera
+
+    def get_camera_info_by_address(self, address):
+        camera_id = self.address_to_camera.get(address)
+        if camera_id is None:
+            raise ContractRevert("Nessuna telecamera associata")
+        return self.cameras[camera_id]
+
+    def verify_photo(self, photo_hash):
+        index = self.hash_to_index.get(photo_hash)
+        if index is None:
+            return {
+                "exists": False, "timestamp": 0, "cameraId": ZERO_HASH,
+                "cameraAddress": ZERO_ADDRESS, "relayAddress": ZERO_ADDRESS,
+                "cameraModel": "", "location": "", "metadata": ""
+            }
+        record = self.photo_records[index]
+        return {
+            "exists": True,
+            "timestamp": record["timestamp"],
+            "cameraId": record["cameraId"],
+            "cameraAddress": record["cameraAddress"],
+            "relayAddress": record["relayAddress"],
+            "cameraModel": self.cameras[record["cameraId"]]["model"],
+            "location": record["location"],
+            "metadata": record["metadata"]
+        }
+
+    # --- Dispatch delle route FireFly ---
+
+    def query(self, method, inputs):
+        """Esegue una query; ritorna la risposta JSON di FireFly"""
+        with self._lock:
+            if method == "getCameraInfo":
+                return {"output": _abi_json(self.get_camera_info(_bytes32(inputs.get("_cameraId"), "_cameraId")))}
+            if method == "getCameraInfoByAddress":
+                return {"output": _abi_json(self.get_camera_info_by_address(_address(inputs.get("_walletAddress"))))}
+            if method == "getNonce":
+                return {"output": str(self.nonces.get(_address(inputs.get("_cameraAddress")), 0))}
+            if method == "verifyPhoto":
+                # Più valori di ritorno con nome: FireFly li restituisce al primo livello
+                return _abi_json(self.verify_photo(_bytes32(inputs.get("_photoHash"), "_photoHash")))
+            if method == "getTotalPhotos":
+                return {"output": str(len(self.photo_records))}
+        raise KeyError(method)
+
+    def invoke(self, method, inputs, sender):
+        """Esegue una transazione; ritorna il valore di ritorno della funzione"""
+        sender = _address(sender, "key")
+        with self._lock:
+            if method == "recordPhotoWithSignature":
+                return self.record_photo_with_signature(
+                    sender, _bytes32(inputs.get("_photoHash"), "_photoHash"),
+                    _string(inputs.get("_location"), "_location"), _string(inputs.get("_metadata"), "_metadata"),
+                    _hex(inputs.get("_signature"), "_signature")
+                )
+            if method in ("registerCamera", "registerAndAuthorizeCamera"):
+                register = self.register_camera if method == "registerCamera" else self.register_and_authorize_camera
+                return register(
+                    sender, _string(inputs.get("_macAddress"), "_macAddress"),
+                    _string(inputs.get("_eFuseId"), "_eFuseId"), _address(inputs.get("_walletAddress"), "_walletAddress"),
+                    _string(inputs.get("_location"), "_location"), _string(inputs.get("_model"), "_model")
+                )
+            if method == "authorizeCamera":
+                return self.authorize_camera(sender, _bytes32(inputs.get("_cameraId"), "_cameraId"))
+            if method == "revokeCamera":
+                return self.revoke_camera(sender, _bytes32(inputs.get("_cameraId"), "_cameraId"))
+            if method == "setPaused":
+                return self.set_paused(sender, _bool(inputs.get("_paused"), "_paused"))
+        raise KeyError(method)
+
+    def load_keystore(self, key_file):
+        """Registra e autorizza tutte le camere del keystore (senza MAC/eFuse)"""
+        credentials = load_all_credentials(key_file)
+        with self._lock:
+            for camera_id, entry in credentials.items():
+                camera_id = _bytes32(camera_id, "camera_id")
+                if camera_id in self.cameras:
+                    continue
+                self.register_camera(self.owner, "", "", entry["address"], "", "", camera_id=camera_id)
+                self.authorize_camera(self.owner, camera_id)
+        return len(credentials)
+
+
+def _abi_json(values):
+    """uint256 come stringa decimale, come li serializza FireFly"""
+    return {
+        key: str(value) if isinstance(value, int) and not isinstance(value, bool) else value
+        for key, value in values.items()
+    }
+
+
+class FireFlyRequestHandler(BaseHTTPRequestHandler):
+    """Route FireFly; lo stato e le statistiche sono sul server"""
+
+    protocol_version = "HTTP/1.1"  # keep-alive, come FireFly
+    # Header e body sono scritti separatamente: senza TCP_NODELAY ogni risposta
+    # attenderebbe l'ACK ritardato del client (~40ms)
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _delay(self, latency_ms):
+        if latency_ms > 0:
+            jitter = CONFIG["JITTER"]
+            time.sleep(latency_ms * random.uniform(1 - jitter, 1 + jitter) / 1000)
+
+    def _inject_error(self):
+        """Errore transitorio simulato: ritorna True se la richiesta è stata rifiutata"""
+        if CONFIG["ERROR_RATE"] > 0 and random.random() < CONFIG["ERROR_RATE"]:
+            self.server.count("errors")
+            self._send(503, {"error": "FF10438: Service unavailable (errore simulato)"})
+            return True
+        return False
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        state = self.server.state
+        ns = re.escape(CONFIG["NAMESPACE"])
+
+        match = re.fullmatch(rf"/api/v1/namespaces/{ns}/apis/{re.escape(CONFIG['API_NAME'])}/listeners/(\w+)", url.path)
+        if match:
+            return self._send(200, state.get_listeners(match.group(1)))
+
+        if re.fullmatch(rf"/api/v1/namespaces/{ns}/events", url.path):
+            params = parse_qs(url.query)
+            sort = params.get("sort", ["-sequence"])[0]
+            try:
+                after = params.get("sequence", [None])[0]
+                after = int(after.lstrip(">")) if after else None
+                limit = int(params.get("limit", ["100"])[0])
+            except ValueError:
+                return self._send(400, {"error": "FF10105: Filtro sequence/limit non valido"})
+            return self._send(200, state.query_events(
+                after=after,
+                descending=sort.startswith("-"),
+                limit=limit,
+                event_type=params.get("type", [None])[0]
+            ))
+
+        self._send(404, {"error": f"FF10109: Route non trovata: {url.path}"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return self._send(400, {"error": "FF10107: JSON non valido"})
+        if not isinstance(body, dict):
+            return self._send(400, {"error": "FF10107: Il body deve essere un oggetto JSON"})
+
+        prefix = rf"/api/v1/namespaces/{re.escape(CONFIG['NAMESPACE'])}/apis/{re.escape(CONFIG['API_NAME'])}"
+        state = self.server.state
+
+        match = re.fullmatch(rf"{prefix}/listeners/(\w+)", url.path)
+        if match:
+            return self._send(200, state.add_listener(match.group(1), body))
+
+        match = re.fullmatch(rf"{prefix}/(query|invoke)/(\w+)", url.path)
+        if not match:
+            return self._send(404, {"error": f"FF10109: Route non trovata: {url.path}"})
+        kind, method = match.groups()
+        inputs = body.get("input") or {}
+        if not isinstance(inputs, dict):
+            return self._send(400, {"error": "FF10107: \"input\" deve essere un oggetto JSON"})
+
+        self._delay(CONFIG["QUERY_LATENCY_MS"] if kind == "query" else CONFIG["INVOKE_LATENCY_MS"])
+        if self._inject_error():
+            return
+        self.server.count(f"{kind}/{method}")
+
+        try:
+            if kind == "query":
+                return self._send(200, state.query(method, inputs))
+            output = state.invoke(method, inputs, body.get("key") or CONFIG["RELAY_ADDRESS"])
+        except KeyError:
+            return self._send(404, {"error": f"FF10111: Metodo {method} non trovato nell'API {CONFIG['API_NAME']}"})
+        except InvalidInput as e:
+            self.server.count("invalid")
+            return self._send(400, {"error": f"FF22030: Input non valido per {method}: {e}"})
+        except ContractRevert as e:
+            self.server.count("reverts")
+            return self._send(500, {"error": f"FF10111: Error from ethereum connector: execution reverted: {e}"})
+
+        confirm = parse_qs(url.query).get("confirm", ["false"])[0].lower() == "true"
+        self._send(200 if confirm else 202, {
+            "id": str(uuid.uuid4()),
+            "namespace": CONFIG["NAMESPACE"],
+            "tx": str(uuid.uuid4()),
+            "type": "blockchain_invoke",
+            "status": "Succeeded" if confirm else "Pending",
+            "created": datetime.now(timezone.utc).isoformat(),
+            "output": {"output": output if not isinstance(output, int) else str(output)}
+        })
+
+
+class FireFlyLocalServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Backlog di default (5) troppo piccolo per i client con molte connessioni in parallelo
+    request_queue_size = 1024
+
+    def __init__(self, address, state=None):
+        super().__init__(address, FireFlyRequestHandler)
+        self.state = state or ContractState()
+        self.counters = {}
+        self._counter_lock = threading.Lock()
+
+    def count(self, name):
+        with self._counter_lock:
+            self.counters[name] = self.counters.get(name, 0) + 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Server FireFly locale per benchmark offline (contratto secCamv3)')
+    parser.add_argument('--host', default=CONFIG["HOST"])
+    parser.add_argument('--port', type=int, default=CONFIG["PORT"])
+    parser.add_argument('--keys', default=None, help='Keystore da registrare e autorizzare all\'avvio')
+    parser.add_argument('--relay', default=CONFIG["RELAY_ADDRESS"], help='Relay (msg.sender) e owner del contratto')
+    parser.add_argument('--query-latency', type=float, default=CONFIG["QUERY_LATENCY_MS"], help='Latenza query (ms)')
+    parser.add_argument('--invoke-latency', type=float, default=CONFIG["INVOKE_LATENCY_MS"], help='Latenza invoke con conferma (ms)')
+    parser.add_argument('--jitter', type=float, default=CONFIG["JITTER"], help='Variazione relativa della latenza')
+    parser.add_argument('--error-rate', type=float, default=CONFIG["ERROR_RATE"], help='Frazione di richieste con 503')
+    args = parser.parse_args()
+
+    CONFIG.update({
+        "RELAY_ADDRESS": args.relay,
+        "QUERY_LATENCY_MS": args.query_latency,
+        "INVOKE_LATENCY_MS": args.invoke_latency,
+        "JITTER": args.jitter,
+        "ERROR_RATE": args.error_rate
+    })
+
+    state = ContractState(owner=args.relay)
+    if args.keys:
+        try:
+            loaded = state.load_keystore(args.keys)
+        except FileNotFoundError:
+            print(f"❌ File {args.keys} non trovato")
+            return 1
+        print(f"📹 Camere registrate e autorizzate dal keystore: {loaded}")
+
+    server = FireFlyLocalServer((args.host, args.port), state)
+    print("🧪 FireFly locale (secCamv3)")
+    print("=" * 80)
+    print(f"📡 http://{args.host}:{args.port}/api/v1/namespaces/{CONFIG['NAMESPACE']}/apis/{CONFIG['API_NAME']}")
+    print(f"   Relay/owner: {state.owner}")
+    print(f"   Latenza query {args.query_latency}ms, invoke {args.invoke_latency}ms (±{args.jitter:.0%})   "
+          f"Errori simulati: {args.error_rate:.1%}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print("\n⏹️ Chiusura...")
+        print(json.dumps(server.counters, indent=2, sort_keys=True))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,569 @@
+#!/usr/bin/env python3
+"""
+Snapshot colonnare della flotta (CameraInfo) per dashboard e statistiche
+Invece di interrogare una camera alla volta, l'export legge getCameraInfo
+per tutte le camere (in parallelo, come camera_audit) e salva i campi in
+colonne contigue: le statistiche di flotta (foto per camera, camere
+autorizzate, camere per location) diventano operazioni locali sui vettori.
+
+Il contratto non permette di elencare le camere: i Camera ID vengono dal
+keystore (--keys), da un elenco (--ids) e dagli eventi CameraRegistered.
+L'aggiornamento incrementale rilegge solo le camere citate dagli eventi
+CameraRegistered, CameraAuthorized, CameraRevoked e PhotoRecorded arrivati
+dopo lo snapshot precedente (listener creati dall'export) e le camere nuove.
+
+Formato (.fleet, little endian):
+- magic "CAMFLEET" + lunghezza (uint32) dell'header JSON
+- header JSON: righe, colonne (nome, dtype numpy, offset), tabella stringhe,
+  ultima sequence degli eventi, listener usati e camere da rileggere
+  (getCameraInfo fallita: riprovate a ogni refresh finché non vengono lette)
+- colonne contigue allineate a 8 byte, ordinate per camera_id:
+    camera_id |S32, wallet |S20, authorized |u1, registered_at <u8, photo_count <u8,
+    location / model / mac_address / efuse_id <u4 (indice nella tabella stringhe)
+- tabella stringhe: offset <u4 (n + 1) + blob UTF-8 delle stringhe distinte
+
+Con numpy installato FleetSnapshot.column ritorna array numpy letti
+direttamente dal file mappato, senza copie.
+
+Uso:
+    python fleet_snapshot.py export fleet.fleet --keys camera_keys.json
+    python fleet_snapshot.py refresh fleet.fleet --keys camera_keys.json
+    python fleet_snapshot.py stats fleet.fleet
+"""
+
+import argparse
+import asyncio
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from datetime import datetime
+
+import camera_audit
+from firefly_client import get_client
+
+# ⚙️ Configurazione
+CONFIG = {
+    "CONCURRENCY": camera_audit.CONFIG["CONCURRENCY"],
+    "EVENTS_PAGE": 500  # eventi letti per richiesta durante il refresh
+}
+
+MAGIC = b"CAMFLEET"
+
+# magic, lunghezza header JSON
+PREAMBLE = struct.Struct("<8sI")
+
+# Colonne: nome -> dtype numpy (la dimensione è quella del dtype)
+COLUMNS = [
+    ("camera_id", "|S32"),
+    ("wallet", "|S20"),
+    ("authorized", "|u1"),
+    ("registered_at", "<u8"),
+    ("photo_count", "<u8"),
+    ("location", "<u4"),
+    ("model", "<u4"),
+    ("mac_address", "<u4"),
+    ("efuse_id", "<u4"),
+]
+
+# Colonne stringa -> campo CameraInfo
+STRING_COLUMNS = {
+    "location": "location",
+    "model": "model",
+    "mac_address": "macAddress",
+    "efuse_id": "eFuseId",
+}
+
+# Typecode di array per i dtype numerici
+ARRAY_CODES = {"|u1": "B", "<u4": "I", "<u8": "Q"}
+
+# Eventi che cambiano i campi di CameraInfo
+CAMERA_EVENTS = ("CameraRegistered", "CameraAuthorized", "CameraRevoked", "PhotoRecorded")
+
+ZERO_ADDRESS = "0x" + "00" * 20
+
+
+def _dtype_size(dtype):
+    """Byte per elemento di un dtype numpy ("|S32" -> 32, "<u8" -> 8)"""
+    return int(dtype[2:])
+
+
+def _align(offset, alignment=8):
+    return (offset + alignment - 1) // alignment * alignment
+
+
+def _camera_key(camera_id):
+    """Camera ID nel formato dello snapshot: "0x" + 64 hex minuscoli"""
+    raw = camera_id[2:] if camera_id.startswith(('0x', '0X')) else camera_id
+    if len(bytes.fromhex(raw)) != 32:
+        raise ValueError(f"Camera ID non valido (servono 32 byte hex): {camera_id}")
+    return "0x" + raw.lower()
+
+
+def _numeric_bytes(values, dtype):
+    column = array(ARRAY_CODES[dtype], values)
+    if column.itemsize != _dtype_size(dtype):
+        raise RuntimeError(f"array '{column.typecode}' di {column.itemsize} byte, attesi {_dtype_size(dtype)}")
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column.tobytes()
+
+
+def build_fleet_snapshot(rows, path, last_sequence=None, listeners=None, pending=()):
+    """
+    Scrive lo snapshot colonnare (in modo atomico)
+
+    Args:
+        rows: dict camera_id -> CameraInfo (come l'output di getCameraInfo;
+              registeredAt 0 per le camere non registrate)
+        path: File .fleet da creare
+        last_sequence: Ultimo evento FireFly già riflesso nei dati
+        listeners: dict evento -> ID listener FireFly usati per il refresh
+        pending: Camera ID non letti (errore), da rileggere al prossimo refresh
+
+    Returns:
+        int: Numero di camere nello snapshot
+    """
+    ordered = sorted((_camera_key(camera_id), info) for camera_id, info in rows.items())
+
+    strings = {"": 0}
+    encoded = {name: [] for name in STRING_COLUMNS}
+    for _, info in ordered:
+        for name, field in STRING_COLUMNS.items():
+            value = info.get(field) or ""
+            encoded[name].append(strings.setdefault(value, len(strings)))
+
+    data = {
+        "camera_id": b"".join(bytes.fromhex(camera_id[2:]) for camera_id, _ in ordered),
+        "wallet": b"".join(bytes.fromhex((info.get("walletAddress") or ZERO_ADDRESS)[2:]) for _, info in ordered),
+        "authorized": _numeric_bytes([bool(info.get("isAuthorized")) for _, info in ordered], "|u1"),
+        "registered_at": _numeric_bytes([int(info.get("registeredAt") or 0) for _, info in ordered], "<u8"),
+        "photo_count": _numeric_bytes([int(info.get("photoCount") or 0) for _, info in ordered], "<u8"),
+    }
+    for name in STRING_COLUMNS:
+        data[name] = _numeric_bytes(encoded[name], "<u4")
+
+    blobs = [value.encode('utf-8') for value in strings]
+    offsets = [0]
+    for blob in blobs:
+        offsets.append(offsets[-1] + len(blob))
+    string_offsets = _numeric_bytes(offsets, "<u4")
+    string_blob = b"".join(blobs)
+
+    # L'header contiene gli offset, che dipendono dalla sua lunghezza: si riserva spazio fisso
+    header = {
+        "version": 1,
+        "rows": len(ordered),
+        "columns": [],
+        "strings": {"count": len(blobs)},
+        "lastSequence": last_sequence,
+        "listeners": listeners or {},
+        "pending": sorted({_camera_key(camera_id) for camera_id in pending}),
+        "createdAt": datetime.now().isoformat()
+    }
+    reserved = _align(PREAMBLE.size + len(json.dumps(header)) + 128 * (len(COLUMNS) + 2))
+
+    layout = []
+    offset = reserved
+    for name, dtype in COLUMNS:
+        header["columns"].append({"name": name, "dtype": dtype, "offset": offset})
+        layout.append((offset, data[name]))
+        offset = _align(offset + len(data[name]))
+    header["strings"].update(offsetsAt=offset, blobAt=_align(offset + len(string_offsets)))
+    layout.append((offset, string_offsets))
+    layout.append((header["strings"]["blobAt"], string_blob))
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    if PREAMBLE.size + len(header_bytes) > reserved:
+        raise RuntimeError("Header dello snapshot più lungo dello spazio riservato")
+
+    tmp_file = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_file, 'wb') as f:
+        f.write(PREAMBLE.pack(MAGIC, len(header_bytes)))
+        f.write(header_bytes)
+        for position, chunk in layout:
+            f.write(b"\0" * (position - f.tell()))
+            f.write(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, path)
+
+    return len(ordered)
+
+
+class FleetSnapshot:
+    """
+    Snapshot colonnare mappato in memoria (sola lettura)
+
+    column() ritorna un array numpy se numpy è installato, altrimenti una
+    memoryview tipizzata (numeriche) o una lista di bytes (camera_id, wallet).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, header_length = PREAMBLE.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Snapshot di flotta non valido: {path}")
+        self.header = json.loads(self._mm[PREAMBLE.size:PREAMBLE.size + header_length])
+        self.columns = {column["name"]: column for column in self.header["columns"]}
+        self._strings = None
+
+    def close(self):
+        self._mm.close()
+
+    def __len__(self):
+        return self.header["rows"]
+
+    @property
+    def last_sequence(self):
+        return self.header.get("lastSequence")
+
+    @property
+    def listeners(self):
+        return self.header.get("listeners") or {}
+
+    @property
+    def pending(self):
+        """Camere la cui lettura è fallita: non sono nelle righe (o la riga è vecchia)"""
+        return self.header.get("pending") or []
+
+    def _raw(self, name):
+        column = self.columns[name]
+        size = _dtype_size(column["dtype"])
+        return memoryview(self._mm)[column["offset"]:column["offset"] + size * len(self)]
+
+    def column(self, name):
+        """Colonna come vettore (numpy se disponibile)"""
+        column = self.columns[name]
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        if numpy is not None:
+            return numpy.frombuffer(self._mm, dtype=column["dtype"], count=len(self), offset=column["offset"])
+
+        raw = self._raw(name)
+        if column["dtype"][1] == "S":
+            size = _dtype_size(column["dtype"])
+            return [bytes(raw[i * size:(i + 1) * size]) for i in range(len(self))]
+        if sys.byteorder == "big":
+            values = array(ARRAY_CODES[column["dtype"]], raw.tobytes())
+            values.byteswap()
+            return values
+        return raw.cast(ARRAY_CODES[column["dtype"]])
+
+    def string_table(self):
+        """Stringhe distinte (indicizzate dalle colonne location, model, mac_address, efuse_id)"""
+        if self._strings is None:
+            strings = self.header["strings"]
+            count = strings["count"]
+            raw = bytes(self._mm[strings["offsetsAt"]:strings["offsetsAt"] + 4 * (count + 1)])
+            offsets = array("I", raw)
+            if sys.byteorder == "big":
+                offsets.byteswap()
+            blob_at = strings["blobAt"]
+            self._strings = [
+                self._mm[blob_at + offsets[i]:blob_at + offsets[i + 1]].decode('utf-8')
+                for i in range(count)
+            ]
+        return self._strings
+
+    def strings(self, name):
+        """Valori di una colonna stringa, riga per riga"""
+        table = self.string_table()
+        return [table[index] for index in self.column(name)]
+
+    def rows(self):
+        """Tutte le camere come dict camera_id -> CameraInfo (per riscrivere lo snapshot)"""
+        camera_ids = [bytes(v) for v in self.column("camera_id")]
+        wallets = [bytes(v) for v in self.column("wallet")]
+        authorized = self.column("authorized")
+        registered_at = self.column("registered_at")
+        photo_count = self.column("photo_count")
+        strings = {name: self.strings(name) for name in STRING_COLUMNS}
+
+        rows = {}
+        for i in range(len(self)):
+            # numpy toglie gli zeri finali dai bytes |S: si ricompone la lunghezza fissa
+            camera_id = "0x" + camera_ids[i].ljust(32, b"\0").hex()
+            rows[camera_id] = {
+                "cameraId": camera_id,
+                "walletAddress": "0x" + wallets[i].ljust(20, b"\0").hex(),
+                "isAuthorized": bool(authorized[i]),
+                "registeredAt": int(registered_at[i]),
+                "photoCount": int(photo_count[i]),
+                **{field: strings[name][i] for name, field in STRING_COLUMNS.items()}
+            }
+        return rows
+
+
+def fleet_stats(snapshot, top=5):
+    """
+    Statistiche di flotta calcolate sulle colonne
+
+    Returns:
+        dict: camere, registrate, autorizzate, foto (totale, media, max) e
+              le location con più camere e più foto
+    """
+    registered_at = snapshot.column("registered_at")
+    authorized = snapshot.column("authorized")
+    photo_count = snapshot.column("photo_count")
+    location = snapshot.column("location")
+    table = snapshot.string_table()
+
+    try:
+        import numpy
+    except ImportError:
+        numpy = None
+
+    if numpy is not None:
+        registered = int(numpy.count_nonzero(registered_at))
+        authorized_count = int(authorized.sum())
+        photos = int(photo_count.sum())
+        photos_max = int(photo_count.max()) if len(snapshot) else 0
+        cameras_per_location = numpy.bincount(location, minlength=len(table))
+        photos_per_location = numpy.bincount(location, weights=photo_count, minlength=len(table))
+    else:
+        registered = sum(1 for value in registered_at if value)
+        authorized_count = sum(authorized)
+        photos = sum(photo_count)
+        photos_max = max(photo_count) if len(snapshot) else 0
+        cameras_per_location = [0] * len(table)
+        photos_per_location = [0] * len(table)
+        for index, count in zip(location, photo_count):
+            cameras_per_location[index] += 1
+            photos_per_location[index] += count
+
+    by_cameras = sorted(range(len(table)), key=lambda i: -cameras_per_location[i])
+    by_photos = sorted(range(len(table)), key=lambda i: -photos_per_location[i])
+    return {
+        "cameras": len(snapshot),
+        "registered": registered,
+        "authorized": authorized_count,
+        "photos": photos,
+        "photosMean": photos / registered if registered else 0.0,
+        "photosMax": photos_max,
+        "topLocationsByCameras": [
+            (table[i], int(cameras_per_location[i])) for i in by_cameras[:top] if cameras_per_location[i]
+        ],
+        "topLocationsByPhotos": [
+            (table[i], int(photos_per_location[i])) for i in by_photos[:top] if photos_per_location[i]
+        ],
+        "pending": len(snapshot.pending),
+        "lastSequence": snapshot.last_sequence,
+        "createdAt": snapshot.header.get("createdAt")
+    }
+
+
+def _fetch_rows(camera_ids, client, concurrency):
+    """
+    getCameraInfo in parallelo per le camere indicate
+
+    Returns:
+        tuple: (dict camera_id -> CameraInfo, dict camera_id -> errore)
+    """
+    async def collect():
+        rows, errors = {}, {}
+        async for result in camera_audit.fetch_camera_infos(camera_ids, concurrency=concurrency,
+                                                            base_url=client.base_url):
+            camera_id = _camera_key(result["camera_id"])
+            if result["error"] is not None:
+                errors[camera_id] = result["error"]
+            elif result["registered"]:
+                rows[camera_id] = result["info"]
+            else:
+                # Nel keystore ma non (ancora) registrata: riga con registeredAt 0
+                rows[camera_id] = {"cameraId": camera_id}
+        return rows, errors
+
+    return asyncio.run(collect())
+
+
+def _camera_events(client, after, listener_ids):
+    """
+    Camere citate dagli eventi dei listener successivi alla sequence `after`
+
+    Returns:
+        tuple: (set camera_id, ultima sequence letta)
+    """
+    changed = set()
+    last = after
+    while True:
+        events = client.events(after=last, limit=CONFIG["EVENTS_PAGE"])
+        for event in events:
+            last = max(last, event["sequence"])
+            blockchain_event = event.get("blockchainEvent") or {}
+            if blockchain_event.get("listener") not in listener_ids:
+                continue
+            camera_id = (blockchain_event.get("output") or {}).get("cameraId")
+            if camera_id:
+                changed.add(_camera_key(camera_id))
+        if len(events) < CONFIG["EVENTS_PAGE"]:
+            return changed, last
+
+
+def _latest_sequence(client):
+    events = client.events(limit=1, descending=True)
+    return events[0]["sequence"] if events else 0
+
+
+def export_fleet(path, camera_ids, client=None, concurrency=CONFIG["CONCURRENCY"]):
+    """
+    Snapshot completo: crea i listener degli eventi camera e legge tutte le camere
+
+    Returns:
+        dict: Riepilogo (camere, errori, secondi)
+    """
+    client = client or get_client()
+    start = time.perf_counter()
+
+    listeners = {event: client.ensure_listener(event, f"fleet-snapshot-{event}") for event in CAMERA_EVENTS}
+    # Sequence letta prima delle query: gli eventi durante l'export verranno riletti al refresh
+    last_sequence = _latest_sequence(client)
+
+    ids = {_camera_key(camera_id) for camera_id in camera_ids}
+    registered, _ = _camera_events(client, 0, {listeners["CameraRegistered"]})
+    ids |= registered
+
+    rows, errors = _fetch_rows(ids, client, concurrency)
+    # Le camere non lette restano nell'header e vengono rilette a ogni refresh
+    build_fleet_snapshot(rows, path, last_sequence, listeners, pending=errors)
+    return {"cameras": len(rows), "fetched": len(ids), "errors": errors,
+            "seconds": time.perf_counter() - start}
+
+
+def refresh_fleet(path, camera_ids=(), client=None, concurrency=CONFIG["CONCURRENCY"]):
+    """
+    Aggiornamento incrementale: rilegge solo le camere cambiate dopo lo snapshot
+
+    Oltre alle camere citate dagli eventi vengono rilette quelle rimaste in
+    sospeso (errore all'export o a un refresh precedente). Se lo snapshot
+    non ha una sequence valida o i listener sono cambiati si rileggono tutte
+    le camere.
+
+    Returns:
+        dict: Riepilogo (camere, rilette, errori, secondi, full)
+    """
+    client = client or get_client()
+    start = time.perf_counter()
+
+    snapshot = FleetSnapshot(path)
+    rows = snapshot.rows()
+    listeners = snapshot.listeners
+    after = snapshot.last_sequence
+    pending = set(snapshot.pending)
+    snapshot.close()
+
+    full = after is None or set(listeners) != set(CAMERA_EVENTS)
+    if full:
+        listeners = {event: client.ensure_listener(event, f"fleet-snapshot-{event}") for event in CAMERA_EVENTS}
+        last_sequence = _latest_sequence(client)
+        changed = set(rows)
+    else:
+        changed, last_sequence = _camera_events(client, after, set(listeners.values()))
+
+    changed |= pending
+    changed |= {_camera_key(camera_id) for camera_id in camera_ids} - set(rows)
+
+    fetched, errors = _fetch_rows(changed, client, concurrency)
+    rows.update(fetched)
+    # Le camere non rilette passano in sospeso: la sequence può avanzare senza perderle
+    build_fleet_snapshot(rows, path, last_sequence, listeners, pending=errors)
+    return {"cameras": len(rows), "fetched": len(changed), "errors": errors,
+            "seconds": time.perf_counter() - start, "full": full}
+
+
+def _read_camera_ids(args):
+    camera_ids = []
+    if args.keys:
+        # Import locale: il keystore serve solo per elencare le camere
+        from sign_photo import load_all_credentials
+        camera_ids.extend(load_all_credentials(args.keys))
+    if args.ids:
+        with open(args.ids, 'r') as f:
+            camera_ids.extend(line.strip() for line in f if line.strip())
+    return camera_ids
+
+
+def _print_stats(stats):
+    print(f"📹 Camere: {stats['cameras']}   Registrate: {stats['registered']}   Autorizzate: {stats['authorized']}")
+    print(f"📸 Foto: {stats['photos']}   Media per camera: {stats['photosMean']:.1f}   Max: {stats['photosMax']}")
+    if stats["pending"]:
+        print(f"⚠️  Camere non lette (riprovate al prossimo refresh): {stats['pending']}")
+    if stats["topLocationsByCameras"]:
+        print("📍 Location con più camere:")
+        for location, count in stats["topLocationsByCameras"]:
+            print(f"   {location or '(vuota)':<30} {count}")
+    if stats["topLocationsByPhotos"]:
+        print("📍 Location con più foto:")
+        for location, count in stats["topLocationsByPhotos"]:
+            print(f"   {location or '(vuota)':<30} {count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Snapshot colonnare della flotta (CameraInfo)')
+    parser.add_argument('--api', default=None, help='URL base di FireFly')
+    parser.add_argument('--concurrency', '-c', type=int, default=CONFIG["CONCURRENCY"], help='Query getCameraInfo contemporanee')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    for command, help_text in (('export', 'Snapshot completo'), ('refresh', 'Rilegge solo le camere cambiate')):
+        p = sub.add_parser(command, help=help_text)
+        p.add_argument('snapshot_file', help='File .fleet')
+        p.add_argument('--keys', default=None, help='Keystore da cui prendere i Camera ID')
+        p.add_argument('--ids', default=None, help='File con un Camera ID per riga')
+
+    p_stats = sub.add_parser('stats', help='Statistiche di flotta dallo snapshot')
+    p_stats.add_argument('snapshot_file', help='File .fleet')
+    p_stats.add_argument('--json', action='store_true', help='Output JSON')
+    args = parser.parse_args()
+
+    if args.command == 'stats':
+        try:
+            snapshot = FleetSnapshot(args.snapshot_file)
+        except FileNotFoundError:
+            print(f"❌ File {args.snapshot_file} non trovato")
+            return 1
+        stats = fleet_stats(snapshot)
+        if args.json:
+            print(json.dumps(stats, indent=2))
+        else:
+            _print_stats(stats)
+        return 0
+
+    try:
+        camera_ids = _read_camera_ids(args)
+    except FileNotFoundError as e:
+        print(f"❌ File {e.filename} non trovato")
+        return 1
+
+    client = get_client(args.api)
+    print(f"🗂️  Snapshot flotta - {args.command}")
+    print("=" * 80)
+
+    if args.command == 'export':
+        summary = export_fleet(args.snapshot_file, camera_ids, client, args.concurrency)
+    else:
+        if not os.path.exists(args.snapshot_file):
+            print(f"❌ File {args.snapshot_file} non trovato (eseguire prima export)")
+            return 1
+        summary = refresh_fleet(args.snapshot_file, camera_ids, client, args.concurrency)
+        if summary["full"]:
+            print("⚠️  Nessuna sequence di eventi valida: rilette tutte le camere")
+
+    print(f"✅ {summary['cameras']} camere nello snapshot, {summary['fetched']} rilette in {summary['seconds']:.2f}s")
+    if summary["errors"]:
+        print(f"❌ Camere non lette: {len(summary['errors'])} (verranno riprovate al prossimo refresh)")
+        for camera_id, error in list(summary["errors"].items())[:5]:
+            print(f"   {camera_id}: {error}")
+    print(f"💾 Snapshot salvato in: {args.snapshot_file}")
+    return 0 if not summary["errors"] else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,65 +3,64 @@ Script per ottenere il wallet associato a un Camera ID tramite API REST
 e salvare/gestire la private key
 """
 
+import argparse
+import csv
 import json
 import os
+import sys
+import time
 import requests
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
 from eth_account import Account
+import firefly_client
+from firefly_client import FireFlyClient, FireFlyError, get_client
+import hd_wallet
+from hd_wallet import get_deriver, hd_reference, reserve_hd_indexes
+from key_crypto import encrypt_private_key, is_encrypted, is_key_reference, resolve_private_key
+from key_journal import _write_snapshot, journal_path, keystore_lock, open_journal, read_keystore
+from key_shards import is_sharded_keystore, open_manifest, split_keystore
+from key_snapshot import KeySnapshot, build_snapshot, is_snapshot_keystore, open_snapshot
+from keystore import is_sqlite_keystore, open_keystore
 
 # ⚙️ Configurazione
 CONFIG = {
-    "API_BASE_URL": "http://127.0.0.1:5000",
+    "API_BASE_URL": firefly_client.CONFIG["API_BASE_URL"],  # FIREFLY_API_URL o http://127.0.0.1:5000
     "NAMESPACE": "default",
     "API_NAME": "secCamv3",
-    "TIMEOUT": 120,  # 2 minuti
-    "PRIVATE_KEY_FILE": "./camera_keys.json"
+    # .db/.sqlite => keystore SQLite, .snap => snapshot in sola lettura, .shards.json => manifest di shard
+    "PRIVATE_KEY_FILE": "./camera_keys.json",
+    "KEY_JOURNAL": False,  # True => nuove chiavi accodate al journal invece di riscrivere il JSON
+    "ENCRYPT_KEYS": False,  # True => private key salvate cifrate (enc:v1, come il receiver Go)
+    "HD_WALLETS": False  # True => wallet derivati dal seed di flotta (hd_wallet.py), salvati come "hd:<indice>"
 }
 
 
+def _canonical_camera_id(camera_id: str) -> str:
+    """Camera ID nel formato del keystore: "0x" + hex minuscolo (come normalizeCameraID nel receiver)"""
+    raw = camera_id[2:] if camera_id.startswith(('0x', '0X')) else camera_id
+    return '0x' + raw.lower()
+
+
+def _firefly_client(pool_size: int = None) -> FireFlyClient:
+    """Client FireFly per l'API in CONFIG (condiviso; nuovo se serve un pool dedicato)"""
+    if pool_size is None:
+        return get_client(CONFIG["API_BASE_URL"], CONFIG["NAMESPACE"], CONFIG["API_NAME"])
+    return FireFlyClient(CONFIG["API_BASE_URL"], CONFIG["NAMESPACE"], CONFIG["API_NAME"], pool_size=pool_size)
+
+
 def get_camera_info(camera_id:  str) -> dict:
     """
     Ottiene info camera dall'API REST FireFly
     """
-    # Costruisci URL
-    url = f"{CONFIG['API_BASE_URL']}/api/v1/namespaces/{CONFIG['NAMESPACE']}/apis/{CONFIG['API_NAME']}/query/getCameraInfo"
-
-    # Headers
-    headers = {
-        "accept": "application/json",
-        "Request-Timeout": "2m0s",
-        "Content-Type": "application/json"
-    }
-
-    # Body
-    payload = {
-        "input": {
-            "_cameraId": camera_id
-        }
-    }
+    client = _firefly_client()
 
     print(f"🔍 Recupero info per Camera ID: {camera_id}")
-    print(f"📡 API URL: {url}\n")
+    print(f"📡 API URL: {client.api_url}/query/getCameraInfo\n")
 
     try:
-        # Esegui POST request
-        response = requests.post(
-            url,
-            headers=headers,
-            json=payload,
-            timeout=CONFIG["TIMEOUT"]
-        )
-
-        # Verifica status code
-        response.raise_for_status()
-
-        # Parse risposta
-        data = response.json()
-
-        if "output" not in data:
-            raise ValueError("Risposta API non valida:  'output' mancante")
-
-        camera_info = data["output"]
+        camera_info = client.get_camera_info(camera_id)
 
         print("✅ Camera Info ricevuta:")
         print(json.dumps(camera_info, indent=2))
@@ -70,7 +69,7 @@ def get_camera_info(camera_id:  str) -> dict:
         return camera_info
 
     except requests.exceptions.Timeout:
-        print("❌ Errore: Timeout della richiesta (>2 minuti)")
+        print("❌ Errore: Timeout della richiesta")
         raise
     except requests.exceptions.ConnectionError:
         print(f"❌ Errore: Impossibile connettersi a {CONFIG['API_BASE_URL']}")
@@ -104,54 +103,270 @@ def generate_camera_wallet() -> dict:
     }
 
 
+def _make_entry(wallet_data: dict) -> dict:
+    """Entry del keystore per un wallet (cifrata se CONFIG["ENCRYPT_KEYS"])"""
+    entry = {
+        "address": wallet_data["address"],
+        "privateKey": wallet_data["privateKey"],
+        "mnemonic": wallet_data. get("mnemonic", ""),
+        "createdAt": datetime.now().isoformat()
+    }
+
+    # Cifra la chiave (e il mnemonic) nel formato enc:v1 letto anche dal receiver Go
+    if CONFIG["ENCRYPT_KEYS"]:
+        private_key = entry["privateKey"]
+        if not is_key_reference(private_key):
+            if not private_key.startswith('0x'):
+                private_key = '0x' + private_key
+            entry["privateKey"] = encrypt_private_key(private_key)
+        if entry["mnemonic"] and not is_encrypted(entry["mnemonic"]):
+            entry["mnemonic"] = encrypt_private_key(entry["mnemonic"])
+
+    return entry
+
+
+def _store_entries(entries: list, key_file: str = None):
+    """
+    Scrive più entry (camera_id, entry) nel keystore con un'unica operazione
+    """
+    key_file = key_file or CONFIG["PRIVATE_KEY_FILE"]
+
+    # Keystore a shard: ogni entry va nello shard del suo prefisso
+    if is_sharded_keystore(key_file):
+        manifest = open_manifest(key_file)
+        by_shard = {}
+        for camera_id, entry in entries:
+            by_shard.setdefault(manifest.route(camera_id), []).append((camera_id, entry))
+        for shard_file, shard_entries in by_shard.items():
+            _store_entries(shard_entries, shard_file)
+        return
+
+    if is_snapshot_keystore(key_file):
+        raise ValueError("Lo snapshot .snap è in sola lettura: salva nel keystore e ricrea lo snapshot")
+
+    # Keystore SQLite: inserimento indicizzato, senza riscrivere tutto
+    if is_sqlite_keystore(key_file):
+        open_keystore(key_file).put_many(entries)
+    elif CONFIG["KEY_JOURNAL"]:
+        # Modalità journal: append di una riga, compattazione in background
+        journal = open_journal(key_file)
+        for camera_id, entry in entries:
+            journal.append(camera_id, entry)
+    else:
+        # Lock esclusivo: un altro processo non può riscrivere il file tra lettura e scrittura
+        with keystore_lock(key_file):
+            keys = {}
+
+            # Leggi file esistente se presente (incluse eventuali righe del journal)
+            if os.path.exists(key_file) or os.path.exists(journal_path(key_file)):
+                keys = read_keystore(key_file)
+
+            # Aggiungi nuove chiavi
+            keys.update(entries)
+
+            # Salva in modo atomico (file temporaneo + rename) con permessi restrittivi
+            _write_snapshot(key_file, keys)
+
+            # Le righe del journal sono ora nel file: il journal riparte vuoto
+            if os.path.exists(journal_path(key_file)):
+                os.truncate(journal_path(key_file), 0)
+
+
+def generate_hd_wallets(count: int):
+    """
+    Deriva nuovi wallet dal seed di flotta, su un blocco di indici riservato
+
+    Il seed viene calcolato una sola volta; ogni wallet è una derivazione
+    figlia economica e nel keystore resta solo il riferimento "hd:<indice>".
+    Il blocco è riservato sul contatore del seed (reserve_hd_indexes), quindi
+    processi concorrenti non derivano mai la stessa chiave.
+
+    Yields:
+        dict: Wallet come generate_camera_wallet(), con privateKey = "hd:<indice>"
+    """
+    deriver = get_deriver()
+    # Tutti gli shard: gli indici HD sono unici nell'intera flotta
+    first = reserve_hd_indexes(count, (entry["privateKey"] for entry in _read_all_keys(all_shards=True).values()))
+    for index in range(first, first + count):
+        yield {
+            "address": deriver.address(index),
+            "privateKey": hd_reference(index),
+            "mnemonic": ""
+        }
+
+
 def save_private_key(camera_id: str, wallet_data: dict):
     """
     Salva private key in file sicuro
     ⚠️ ATTENZIONE:  Proteggi questo file!  Non committarlo su Git!
     """
-    keys = {}
+    _store_entries([(camera_id, _make_entry(wallet_data))])
 
-    # Leggi file esistente se presente
-    if os.path.exists(CONFIG["PRIVATE_KEY_FILE"]):
-        with open(CONFIG["PRIVATE_KEY_FILE"], 'r') as f:
-            keys = json.load(f)
+    print(f"✅ Private key salvata in: {CONFIG['PRIVATE_KEY_FILE']}")
+    print("⚠️ IMPORTANTE:  Proteggi questo file e NON committarlo su Git!\n")
 
-    # Aggiungi nuova chiave
-    keys[camera_id] = {
-        "address": wallet_data["address"],
-        "privateKey": wallet_data["privateKey"],
-        "mnemonic": wallet_data. get("mnemonic", ""),
-        "createdAt": datetime.now().isoformat()
-    }
 
-    # Salva con permessi restrittivi
-    with open(CONFIG["PRIVATE_KEY_FILE"], 'w') as f:
-        json.dump(keys, f, indent=2)
+def _read_all_keys(key_file: str = None, all_shards: bool = False) -> dict:
+    """
+    Tutte le entry del keystore (vuoto se non esiste ancora)
 
-    # Imposta permessi file (solo owner può leggere/scrivere)
+    Con un manifest di shard legge solo gli shard del gateway locale,
+    oppure tutti se all_shards=True.
+    """
+    key_file = key_file or CONFIG["PRIVATE_KEY_FILE"]
+    if is_sharded_keystore(key_file):
+        manifest = open_manifest(key_file)
+        shard_files = sorted(manifest.shards.values()) if all_shards else manifest.local_shards()
+        keys = {}
+        for shard_file in shard_files:
+            keys.update(_read_all_keys(shard_file))
+        return keys
+    if is_sqlite_keystore(key_file) or is_snapshot_keystore(key_file):
+        if not os.path.exists(key_file):
+            return {}
+        if is_snapshot_keystore(key_file):
+            with KeySnapshot(key_file) as snapshot:
+                return dict(snapshot.items())
+        return dict(open_keystore(key_file).items())
     try:
-        os.chmod(CONFIG["PRIVATE_KEY_FILE"], 0o600)
-    except:
-        pass  # Potrebbe fallire su Windows
+        return read_keystore(key_file)
+    except FileNotFoundError:
+        return {}
+
+
+def _generate_wallet_chunk(count: int) -> list:
+    """Genera un blocco di wallet nel processo worker"""
+    return [generate_camera_wallet() for _ in range(count)]
 
-    print(f"✅ Private key salvata in: {CONFIG['PRIVATE_KEY_FILE']}")
-    print("⚠️ IMPORTANTE:  Proteggi questo file e NON committarlo su Git!\n")
 
+def generate_camera_wallets(count: int, workers: int = None, chunk_size: int = 16):
+    """
+    Genera più wallet in parallelo su un pool di processi
+
+    La derivazione del seed dal mnemonic (PBKDF2, 2048 round) è la parte
+    costosa di generate_camera_wallet: i blocchi sono distribuiti sui core
+    e restituiti man mano, con un numero limitato di blocchi in volo.
+
+    Args:
+        count: Numero di wallet da generare
+        workers: Numero di processi (default: tutti i core)
+        chunk_size: Wallet per blocco inviato a un worker
 
-def load_private_key(camera_id: str) -> dict:
+    Yields:
+        dict: Wallet come generate_camera_wallet()
     """
-    Carica private key dal file
+    workers = workers or os.cpu_count() or 1
+    pending = deque()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        remaining = count
+        while remaining > 0:
+            size = min(chunk_size, remaining)
+            pending.append(pool.submit(_generate_wallet_chunk, size))
+            remaining -= size
+
+            # Limita i blocchi in volo: i wallet vengono salvati mentre gli altri sono generati
+            while len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+
+        while pending:
+            yield from pending.popleft().result()
+
+
+def bulk_generate_wallets(camera_ids: list, workers: int = None, chunk_size: int = 16) -> tuple:
     """
-    if not os.path.exists(CONFIG["PRIVATE_KEY_FILE"]):
-        raise FileNotFoundError("File private keys non trovato!")
+    Genera e salva i wallet di più camere in parallelo
+
+    Le camere già presenti nel keystore vengono saltate, confrontando i
+    Camera ID normalizzati ("0x" + hex minuscolo, il formato con cui vengono
+    salvati). Con keystore SQLite o journal le chiavi sono salvate a blocchi
+    mentre la generazione procede; con il file JSON semplice il file viene
+    riscritto una sola volta alla fine.
+
+    Returns:
+        tuple: (wallet generati {camera_id: address}, camere saltate, secondi)
+    """
+    existing = {_canonical_camera_id(camera_id) for camera_id in _read_all_keys()}
+    todo = []
+    seen = set()
+    skipped = 0
+    for camera_id in map(_canonical_camera_id, camera_ids):
+        if camera_id in existing or camera_id in seen:
+            skipped += 1
+            continue
+        seen.add(camera_id)
+        todo.append(camera_id)
+
+    streaming = is_sqlite_keystore(CONFIG["PRIVATE_KEY_FILE"]) or CONFIG["KEY_JOURNAL"]
+    generated = {}
+    batch = []
+
+    start = time.perf_counter()
+    if CONFIG["HD_WALLETS"]:
+        wallets = generate_hd_wallets(len(todo))
+    else:
+        wallets = generate_camera_wallets(len(todo), workers=workers, chunk_size=chunk_size)
+    for camera_id, wallet_data in zip(todo, wallets):
+        batch.append((camera_id, _make_entry(wallet_data)))
+        generated[camera_id] = wallet_data["address"]
+
+        if streaming and len(batch) >= chunk_size:
+            _store_entries(batch)
+            batch = []
+
+        if len(generated) % 500 == 0:
+            elapsed = time.perf_counter() - start
+            print(f"   ... {len(generated)}/{len(todo)} wallet ({len(generated) / elapsed:.1f} wallet/s)")
+
+    if batch:
+        _store_entries(batch)
+    # (con gli shard ogni journal viene sincronizzato alla chiusura del processo)
+    if CONFIG["KEY_JOURNAL"] and not is_sqlite_keystore(CONFIG["PRIVATE_KEY_FILE"]) \
+            and not is_sharded_keystore(CONFIG["PRIVATE_KEY_FILE"]):
+        open_journal(CONFIG["PRIVATE_KEY_FILE"]).flush()
+
+    return generated, skipped, time.perf_counter() - start
+
 
-    with open(CONFIG["PRIVATE_KEY_FILE"], 'r') as f:
-        keys = json.load(f)
+def _decrypt_entry(entry: dict) -> dict:
+    """Copia della entry con private key e mnemonic in chiaro (se cifrati enc:v1)"""
+    entry = dict(entry)
+    entry["privateKey"] = resolve_private_key(entry["privateKey"])
+    if entry.get("mnemonic"):
+        entry["mnemonic"] = resolve_private_key(entry["mnemonic"])
+    return entry
+
+
+def load_private_key(camera_id: str, key_file: str = None) -> dict:
+    """
+    Carica private key dal file (decifrata se salvata nel formato enc:v1)
+    """
+    key_file = key_file or CONFIG["PRIVATE_KEY_FILE"]
+
+    # Keystore a shard: la ricerca va solo nello shard del camera_id
+    if is_sharded_keystore(key_file):
+        return load_private_key(camera_id, open_manifest(key_file).route(camera_id))
+
+    if is_sqlite_keystore(key_file) or is_snapshot_keystore(key_file):
+        if not os.path.exists(key_file):
+            raise FileNotFoundError("File private keys non trovato!")
+        if is_snapshot_keystore(key_file):
+            found = open_snapshot(key_file).get(camera_id)
+        else:
+            found = open_keystore(key_file).get(camera_id)
+        if found is None:
+            raise KeyError(f"Private key per Camera ID {camera_id} non trovata!")
+        return _decrypt_entry(found[1])
+
+    try:
+        keys = read_keystore(key_file)
+    except FileNotFoundError:
+        raise FileNotFoundError("File private keys non trovato!")
 
     if camera_id not in keys:
         raise KeyError(f"Private key per Camera ID {camera_id} non trovata!")
 
-    return keys[camera_id]
+    return _decrypt_entry(keys[camera_id])
 
 
 def get_wallet_from_camera_id(camera_id: str) -> str:
@@ -248,7 +463,10 @@ def main():
 
         camera_id = input("Inserisci Camera ID: ").strip()
 
-        wallet_data = generate_camera_wallet()
+        if CONFIG["HD_WALLETS"]:
+            wallet_data = next(generate_hd_wallets(1))
+        else:
+            wallet_data = generate_camera_wallet()
 
         print("\n✅ Wallet generato:")
         print(f"  Address: {wallet_data['address']}")
@@ -295,5 +513,343 @@ def main():
         print("❌ Opzione non valida")
 
 
+def read_inventory(csv_file: str) -> list:
+    """
+    Legge l'inventario CSV delle camere (colonne: mac, efuse, location, model)
+
+    Sono accettati anche i nomi delle colonne del contratto
+    (macAddress / eFuseId) e quelli di generate_camera_id (mac_address / efuse_id).
+
+    Returns:
+        list: dict {mac, efuse, location, model} per ogni riga valida
+    """
+    aliases = {
+        "mac": ("mac", "mac_address", "macaddress"),
+        "efuse": ("efuse", "efuse_id", "efuseid"),
+        "location": ("location",),
+        "model": ("model",)
+    }
+
+    cameras = []
+    with open(csv_file, 'r', newline='') as f:
+        reader = csv.DictReader(f)
+        columns = {name.strip().lower(): name for name in reader.fieldnames or []}
+        mapping = {}
+        for field, names in aliases.items():
+            mapping[field] = next((columns[n] for n in names if n in columns), None)
+        if mapping["mac"] is None or mapping["efuse"] is None:
+            raise ValueError("Il CSV deve avere almeno le colonne mac ed efuse")
+
+        for line, row in enumerate(reader, 2):
+            camera = {
+                field: (row.get(column) or "").strip() if column else ""
+                for field, column in mapping.items()
+            }
+            if not camera["mac"] or not camera["efuse"]:
+                print(f"⚠️  Riga {line} ignorata: MAC o eFuse mancante")
+                continue
+            cameras.append(camera)
+    return cameras
+
+
+def _query_registered(client, camera_id: str) -> tuple:
+    """
+    Interroga getCameraInfo senza output a video
+
+    Returns:
+        tuple: (camera_id, True/False se registrata, errore o None)
+    """
+    try:
+        info = client.get_camera_info(camera_id)
+    except FireFlyError as e:
+        # getCameraInfo fa revert per le camere non registrate
+        if "non esistente" in e.response.text:
+            return camera_id, False, None
+        return camera_id, None, f"HTTP {e.status_code}: {e.response.text[:200]}"
+    except (requests.exceptions.RequestException, ValueError) as e:
+        return camera_id, None, str(e)
+    return camera_id, int(info.get("registeredAt") or 0) > 0, None
+
+
+def check_registered(camera_ids: list, workers: int = 32) -> tuple:
+    """
+    Controlla in parallelo quali camere sono già registrate nel contratto
+
+    Returns:
+        tuple: (set camere registrate, dict camera_id -> errore per quelle non verificabili)
+    """
+    registered = set()
+    errors = {}
+
+    with _firefly_client(pool_size=workers) as client, ThreadPoolExecutor(max_workers=workers) as pool:
+        for camera_id, is_registered, error in pool.map(lambda c: _query_registered(client, c), camera_ids):
+            if error is not None:
+                errors[camera_id] = error
+            elif is_registered:
+                registered.add(camera_id)
+    return registered, errors
+
+
+def onboard_fleet(cameras: list, workers: int = None, check_workers: int = 32,
+                  check: bool = True) -> dict:
+    """
+    Onboarding non interattivo di una flotta di camere
+
+    Calcola i Camera ID (come generate_camera_id), salta le camere già
+    registrate nel contratto, genera in parallelo i wallet mancanti e
+    prepara le richieste registerAndAuthorizeCamera.
+
+    Returns:
+        dict: Payload con le richieste di registrazione e il riepilogo
+    """
+    # Import locale: web3 serve solo per l'onboarding
+    from generate_camera_id import generate_camera_id
+
+    by_id = {}
+    for camera in cameras:
+        camera_id = _canonical_camera_id(generate_camera_id(camera["mac"], camera["efuse"]))
+        by_id.setdefault(camera_id, camera)
+    duplicates = len(cameras) - len(by_id)
+
+    registered, errors = set(), {}
+    if check:
+        registered, errors = check_registered(list(by_id), workers=check_workers)
+    todo = [camera_id for camera_id in by_id if camera_id not in registered and camera_id not in errors]
+
+    # Camere con chiave già nel keystore ma non registrate: si riusa il wallet esistente
+    # (anche se salvata con maiuscole o senza 0x)
+    existing = {_canonical_camera_id(camera_id): entry for camera_id, entry in _read_all_keys().items()}
+    addresses = {camera_id: existing[camera_id]["address"] for camera_id in todo if camera_id in existing}
+    generated, _, elapsed = bulk_generate_wallets(
+        [camera_id for camera_id in todo if camera_id not in addresses], workers=workers
+    )
+    addresses.update(generated)
+
+    requests_payload = []
+    for camera_id in todo:
+        camera = by_id[camera_id]
+        requests_payload.append({
+            "cameraId": camera_id,
+            "input": {
+                "_macAddress": camera["mac"],
+                "_eFuseId": camera["efuse"],
+                "_walletAddress": addresses[camera_id],
+                "_location": camera["location"],
+                "_model": camera["model"]
+            }
+        })
+
+    return {
+        "url": f"{CONFIG['API_BASE_URL']}/api/v1/namespaces/{CONFIG['NAMESPACE']}/apis/{CONFIG['API_NAME']}/invoke/registerAndAuthorizeCamera",
+        "method": "registerAndAuthorizeCamera",
+        "createdAt": datetime.now().isoformat(),
+        "summary": {
+            "inventory": len(cameras),
+            "duplicates": duplicates,
+            "alreadyRegistered": len(registered),
+            "checkErrors": len(errors),
+            "walletsGenerated": len(generated),
+            "walletsReused": len(addresses) - len(generated),
+            "toRegister": len(requests_payload),
+            "walletSeconds": round(elapsed, 3)
+        },
+        "errors": errors,
+        "requests": requests_payload
+    }
+
+
+def main_onboard(args):
+    """
+    Onboarding da inventario CSV: un solo payload di registrazione per tutta la flotta
+    """
+    try:
+        cameras = read_inventory(args.csv_file)
+    except (OSError, ValueError) as e:
+        print(f"❌ Errore nella lettura di {args.csv_file}: {e}")
+        sys.exit(1)
+
+    print("=" * 70)
+    print("🚀 ONBOARDING FLOTTA DA CSV")
+    print("=" * 70 + "\n")
+    print(f"📹 Camere nell'inventario: {len(cameras)}")
+    print(f"📂 Keystore: {CONFIG['PRIVATE_KEY_FILE']}")
+    print(f"📡 API: {CONFIG['API_BASE_URL']}")
+    if args.no_check:
+        print("⚠️  Controllo getCameraInfo disattivato")
+    print()
+
+    start = time.perf_counter()
+    payload = onboard_fleet(
+        cameras,
+        workers=args.workers,
+        check_workers=args.check_workers,
+        check=not args.no_check
+    )
+    elapsed = time.perf_counter() - start
+
+    with open(args.output, 'w') as f:
+        json.dump(payload, f, indent=2)
+
+    summary = payload["summary"]
+    print(f"✅ Onboarding preparato in {elapsed:.2f}s")
+    print(f"   Duplicati nel CSV:        {summary['duplicates']}")
+    print(f"   Già registrate:           {summary['alreadyRegistered']}")
+    print(f"   Wallet generati:          {summary['walletsGenerated']}")
+    print(f"   Wallet già nel keystore:  {summary['walletsReused']}")
+    print(f"   Da registrare:            {summary['toRegister']}")
+    if payload["errors"]:
+        print(f"❌ Camere non verificate (escluse dal payload): {len(payload['errors'])}")
+        for camera_id, error in list(payload["errors"].items())[:5]:
+            print(f"   {camera_id[:18]}...: {error}")
+    print(f"\n📄 Payload registerAndAuthorizeCamera salvato in: {args.output}")
+
+
+def main_bulk(args):
+    """
+    Generazione massiva non interattiva: un Camera ID per riga nel file
+    """
+    with open(args.ids_file, 'r') as f:
+        camera_ids = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+    if not camera_ids:
+        print(f"❌ Nessun Camera ID in {args.ids_file}")
+        sys.exit(1)
+
+    print("=" * 70)
+    print("📝 GENERAZIONE MASSIVA WALLET")
+    print("=" * 70 + "\n")
+    print(f"📹 Camere: {len(camera_ids)}")
+    print(f"⚙️  Worker: {args.workers or os.cpu_count() or 1}")
+    print(f"📂 Keystore: {CONFIG['PRIVATE_KEY_FILE']}\n")
+
+    generated, skipped, elapsed = bulk_generate_wallets(
+        camera_ids, workers=args.workers, chunk_size=args.chunk_size
+    )
+
+    rate = len(generated) / elapsed if elapsed > 0 else 0.0
+    print(f"\n✅ Wallet generati: {len(generated)} in {elapsed:.2f}s ({rate:.1f} wallet/s)")
+    if skipped:
+        print(f"⏭️  Camere saltate (già nel keystore o duplicate): {skipped}")
+    print(f"💾 Private key salvate in: {CONFIG['PRIVATE_KEY_FILE']}")
+    print("⚠️ IMPORTANTE:  Proteggi questo file e NON committarlo su Git!")
+
+    if args.addresses and generated:
+        with open(args.addresses, 'w') as f:
+            json.dump(generated, f, indent=2)
+        print(f"📄 Address da registrare nel contratto salvati in: {args.addresses}")
+
+
+def main_snapshot(args):
+    """
+    Crea lo snapshot binario (.snap) del keystore per l'avvio dei gateway
+    """
+    if not is_snapshot_keystore(args.snapshot_file):
+        print(f"❌ Lo snapshot deve avere estensione .snap: {args.snapshot_file}")
+        sys.exit(1)
+
+    keys = _read_all_keys()
+    if not keys:
+        print(f"❌ Nessuna camera in {CONFIG['PRIVATE_KEY_FILE']}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    try:
+        count = build_snapshot(keys, args.snapshot_file)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+
+    print(f"✅ Snapshot creato: {args.snapshot_file} ({count} camere, {elapsed:.2f}s)")
+    print("⚠️ IMPORTANTE:  Proteggi questo file e NON committarlo su Git!")
+
+
+def main_shard(args):
+    """
+    Divide il keystore in shard per prefisso del camera_id e crea il manifest dei gateway
+    """
+    keys = _read_all_keys(all_shards=True)
+    if not keys:
+        print(f"❌ Nessuna camera in {CONFIG['PRIVATE_KEY_FILE']}")
+        sys.exit(1)
+
+    gateways = [g.strip() for g in args.gateways.split(',') if g.strip()] if args.gateways else []
+    try:
+        counts = split_keystore(
+            keys, args.manifest_file,
+            prefix_length=args.prefix_length,
+            gateways=gateways,
+            shard_suffix=args.format
+        )
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    manifest = open_manifest(args.manifest_file)
+    print(f"✅ {len(keys)} camere divise in {len(counts)} shard ({args.format})")
+    for gateway, prefixes in manifest.gateways.items():
+        cameras = sum(counts[prefix] for prefix in prefixes)
+        print(f"   {gateway}: shard {prefixes[0]}-{prefixes[-1]} ({cameras} camere)")
+    print(f"📄 Manifest salvato in: {args.manifest_file}")
+    print("⚠️ IMPORTANTE:  Proteggi gli shard e NON committarli su Git!")
+
+
+def main_cli():
+    """
+    Comandi non interattivi (senza argomenti parte il menu interattivo)
+    """
+    parser = argparse.ArgumentParser(description='Camera Wallet Manager')
+    parser.add_argument('--keys', default=CONFIG["PRIVATE_KEY_FILE"], help='Keystore (JSON, .db, .snap o .shards.json)')
+    parser.add_argument('--journal', action='store_true', help='Accoda le nuove chiavi al journal')
+    parser.add_argument('--encrypt', action='store_true', help='Salva le chiavi cifrate (enc:v1)')
+    parser.add_argument('--hd', action='store_true', help='Deriva i wallet dal seed di flotta (hd_wallet.py init)')
+    parser.add_argument('--seed', default=hd_wallet.CONFIG["SEED_FILE"], help='File del seed di flotta')
+    parser.add_argument('--api', default=CONFIG["API_BASE_URL"], help='URL base di FireFly (default: FIREFLY_API_URL)')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_bulk = sub.add_parser('bulk', help='Genera i wallet per una lista di Camera ID')
+    p_bulk.add_argument('ids_file', help='File con un Camera ID per riga')
+    p_bulk.add_argument('--workers', '-w', type=int, default=None, help='Processi paralleli (default: tutti i core)')
+    p_bulk.add_argument('--chunk-size', type=int, default=16, help='Wallet per blocco inviato a un worker')
+    p_bulk.add_argument('--addresses', default=None, help='JSON camera_id -> address dei wallet generati')
+
+    p_onboard = sub.add_parser('onboard', help='Onboarding della flotta da inventario CSV')
+    p_onboard.add_argument('csv_file', help='CSV con colonne mac, efuse, location, model')
+    p_onboard.add_argument('--output', '-o', default='registration_payload.json', help='Payload di registrazione')
+    p_onboard.add_argument('--workers', '-w', type=int, default=None, help='Processi per la generazione wallet')
+    p_onboard.add_argument('--check-workers', type=int, default=32, help='Richieste getCameraInfo concorrenti')
+    p_onboard.add_argument('--no-check', action='store_true', help='Non interrogare getCameraInfo')
+
+    p_shard = sub.add_parser('shard', help='Divide il keystore in shard per prefisso del camera_id')
+    p_shard.add_argument('manifest_file', help='Manifest di destinazione (es. camera_keys.shards.json)')
+    p_shard.add_argument('--gateways', default='', help='Gateway tra cui dividere gli shard (es. gw-nord,gw-sud)')
+    p_shard.add_argument('--prefix-length', type=int, default=1, help='Cifre hex del prefisso (16^N shard)')
+    p_shard.add_argument('--format', choices=['.json', '.db', '.snap'], default='.json', help='Formato degli shard')
+
+    p_snap = sub.add_parser('snapshot', help='Crea lo snapshot binario mmap (.snap) del keystore')
+    p_snap.add_argument('snapshot_file', help='File .snap di destinazione (es. camera_keys.snap)')
+
+    args = parser.parse_args()
+
+    CONFIG["PRIVATE_KEY_FILE"] = args.keys
+    CONFIG["API_BASE_URL"] = args.api.rstrip('/')
+    CONFIG["KEY_JOURNAL"] = CONFIG["KEY_JOURNAL"] or args.journal
+    CONFIG["ENCRYPT_KEYS"] = CONFIG["ENCRYPT_KEYS"] or args.encrypt
+    CONFIG["HD_WALLETS"] = CONFIG["HD_WALLETS"] or args.hd
+    hd_wallet.CONFIG["SEED_FILE"] = args.seed
+
+    if args.command == 'bulk':
+        main_bulk(args)
+    elif args.command == 'onboard':
+        main_onboard(args)
+    elif args.command == 'shard':
+        main_shard(args)
+    elif args.command == 'snapshot':
+        main_snapshot(args)
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if len(sys.argv) > 1:
+        main_cli()
+    else:
+        main()
\ No newline at end of file
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Wallet camere gerarchico-deterministici (BIP32/BIP44) da un unico seed di flotta
+Invece di un mnemonic per camera, ogni wallet è derivato dal seed master
+lungo il path m/44'/60'/0'/0/<indice>: il keystore salva solo il riferimento
+"hd:<indice>" al posto della private key, che viene ri-derivata su richiesta.
+
+Il seed (PBKDF2 del mnemonic) e il nodo padre m/44'/60'/0'/0 sono calcolati
+una sola volta per processo; ogni camera richiede poi un solo HMAC-SHA512
+(derivazione figlia non hardened) e le chiavi derivate restano in cache.
+
+Gli indici nuovi sono riservati a blocchi sul contatore fleet_seed.json.index
+(sotto lock): processi concorrenti non assegnano mai lo stesso indice.
+
+⚠️ Il receiver Go legge solo chiavi in chiaro o enc:v1: per le camere HD
+   esportare la chiave con load_private_key prima di configurarlo.
+
+Uso da riga di comando:
+    python hd_wallet.py init                 # crea fleet_seed.json
+    python hd_wallet.py derive 0x<camera_id> --keys camera_keys.json
+"""
+
+import argparse
+import hmac
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from hashlib import sha512
+
+from eth_account import Account
+from eth_account.hdaccount import seed_from_mnemonic
+from eth_account.hdaccount.deterministic import Node, SECP256K1_N, derive_child_key
+from eth_keys import keys
+
+from key_crypto import encrypt_private_key, resolve_private_key
+from key_journal import keystore_lock
+
+# Prefisso dei riferimenti a chiavi HD nel keystore
+HD_PREFIX = "hd:"
+
+# Massimo indice figlio non hardened (BIP32)
+MAX_INDEX = 2 ** 31 - 1
+
+# Suffisso del contatore degli indici assegnati, accanto al seed
+INDEX_SUFFIX = ".index"
+
+# ⚙️ Configurazione
+CONFIG = {
+    "SEED_FILE": os.environ.get("CAMERA_FLEET_SEED", "./fleet_seed.json"),
+    "BASE_PATH": "m/44'/60'/0'/0",
+    "CACHE_SIZE": 4096
+}
+
+
+def is_hd_reference(value):
+    """True se il valore è un riferimento "hd:<indice>" invece di una chiave"""
+    return isinstance(value, str) and value.startswith(HD_PREFIX)
+
+
+def hd_reference(index):
+    """Riferimento da salvare nel keystore al posto della private key"""
+    return f"{HD_PREFIX}{index}"
+
+
+def hd_index(value):
+    """Indice di derivazione di un riferimento "hd:<indice>" """
+    index = int(value[len(HD_PREFIX):])
+    if not 0 <= index <= MAX_INDEX:
+        raise ValueError(f"Indice HD fuori intervallo: {index}")
+    return index
+
+
+class FleetDeriver:
+    """
+    Derivazione delle chiavi camera dal seed di flotta
+
+    Mantiene il nodo padre (chiave, chain code, chiave pubblica compressa)
+    e una cache LRU delle chiavi figlie già derivate.
+    """
+
+    def __init__(self, seed, base_path=CONFIG["BASE_PATH"], cache_size=CONFIG["CACHE_SIZE"]):
+        # Nodo padre: stessa derivazione di HDPath.derive, mantenendo il chain code
+        node = hmac.new(b"Bitcoin seed", seed, sha512).digest()
+        key, chain_code = node[:32], node[32:]
+        for part in base_path.split('/')[1:]:
+            key, chain_code = derive_child_key(key, chain_code, Node.decode(part))
+
+        self.base_path = base_path
+        self._key = int.from_bytes(key, 'big')
+        self._chain_code = chain_code
+        self._public_key = keys.PrivateKey(key).public_key.to_compressed_bytes()
+
+        self.maxsize = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _derive(self, index):
+        """CKDpriv non hardened: un solo HMAC-SHA512 con la chiave pubblica del padre già calcolata"""
+        while True:
+            I = hmac.new(self._chain_code, self._public_key + index.to_bytes(4, 'big'), sha512).digest()
+            tweak = int.from_bytes(I[:32], 'big')
+            child = (tweak + self._key) % SECP256K1_N
+            # Chiave non valida (probabilità < 2^-127): si passa all'indice successivo, come BIP32
+            if tweak < SECP256K1_N and child != 0:
+                return child.to_bytes(32, 'big')
+            index += 1
+
+    def private_key(self, index):
+        """Private key "0x..." della camera con questo indice (in cache dopo la prima derivazione)"""
+        if not 0 <= index <= MAX_INDEX:
+            raise ValueError(f"Indice HD fuori intervallo: {index}")
+        with self._lock:
+            key = self._entries.get(index)
+            if key is not None:
+                self._entries.move_to_end(index)
+                self.hits += 1
+                return key
+            self.misses += 1
+
+        key = '0x' + self._derive(index).hex()
+
+        with self._lock:
+            self._entries[index] = key
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return key
+
+    def address(self, index):
+        """Address checksum del wallet con questo indice"""
+        return keys.PrivateKey(bytes.fromhex(self.private_key(index)[2:])).public_key.to_checksum_address()
+
+    def clear(self):
+        """Svuota la cache delle chiavi derivate"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'maxsize': self.maxsize
+            }
+
+
+def create_fleet_seed(seed_file=None, num_words=24):
+    """
+    Genera il mnemonic master e lo salva cifrato (enc:v1) nel file del seed
+
+    Returns:
+        str: Mnemonic in chiaro, da conservare offline come backup
+    """
+    seed_file = seed_file or CONFIG["SEED_FILE"]
+    if os.path.exists(seed_file):
+        raise FileExistsError(f"Seed di flotta già presente: {seed_file}")
+
+    Account.enable_unaudited_hdwallet_features()
+    _, mnemonic = Account.create_with_mnemonic(num_words=num_words)
+    data = {
+        "mnemonic": encrypt_private_key(mnemonic),
+        "basePath": CONFIG["BASE_PATH"],
+        "createdAt": datetime.now().isoformat()
+    }
+
+    fd = os.open(seed_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(data, f, indent=2)
+    return mnemonic
+
+
+# Deriver per processo: path seed -> FleetDeriver
+_derivers = {}
+_lock = threading.Lock()
+
+
+def get_deriver(seed_file=None):
+    """Ritorna il deriver del seed di flotta, calcolando il seed (PBKDF2) una sola volta per processo"""
+    seed_file = os.path.abspath(seed_file or CONFIG["SEED_FILE"])
+    with _lock:
+        deriver = _derivers.get(seed_file)
+        if deriver is None:
+            try:
+                with open(seed_file, 'r') as f:
+                    data = json.load(f)
+            except FileNotFoundError:
+                raise FileNotFoundError(f"Seed di flotta non trovato: {seed_file}")
+            mnemonic = resolve_private_key(data["mnemonic"])
+            deriver = FleetDeriver(
+                seed_from_mnemonic(mnemonic, ""),
+                base_path=data.get("basePath", CONFIG["BASE_PATH"])
+            )
+            _derivers[seed_file] = deriver
+        return deriver
+
+
+def clear_caches():
+    """Svuota le chiavi derivate in cache di tutti i seed aperti"""
+    with _lock:
+        derivers = list(_derivers.values())
+    for deriver in derivers:
+        deriver.clear()
+
+
+def next_hd_index(private_keys):
+    """Primo indice libero dato l'elenco delle private key (o riferimenti) del keystore"""
+    used = [hd_index(value) for value in private_keys if is_hd_reference(value)]
+    return max(used) + 1 if used else 0
+
+
+def index_counter_path(seed_file=None):
+    """Path del contatore degli indici già assegnati (accanto al seed di flotta)"""
+    return os.path.abspath(seed_file or CONFIG["SEED_FILE"]) + INDEX_SUFFIX
+
+
+def reserve_hd_indexes(count, private_keys=(), seed_file=None):
+    """
+    Riserva `count` indici consecutivi mai assegnati e ritorna il primo
+
+    Il contatore accanto al seed viene letto e aggiornato sotto lock
+    esclusivo: due processi che generano wallet insieme ricevono blocchi
+    disgiunti anche se nessuno dei due ha ancora salvato le proprie chiavi.
+    Un blocco riservato e non usato (processo interrotto) resta inutilizzato.
+
+    Args:
+        count: Numero di indici da riservare
+        private_keys: Private key (o riferimenti) del keystore, per i keystore
+                      creati prima del contatore
+        seed_file: File del seed di flotta
+
+    Returns:
+        int: Primo indice del blocco [primo, primo + count)
+    """
+    counter_file = index_counter_path(seed_file)
+    # Il keystore si legge fuori dal lock: gli indici riservati ma non ancora salvati sono nel contatore
+    first = next_hd_index(private_keys)
+
+    with keystore_lock(counter_file, exclusive=True):
+        try:
+            with open(counter_file, 'r') as f:
+                first = max(first, int(json.load(f)["nextIndex"]))
+        except FileNotFoundError:
+            pass
+        if first + count - 1 > MAX_INDEX:
+            raise ValueError(f"Indici HD esauriti: richiesti {count} a partire da {first}")
+
+        tmp_file = f"{counter_file}.{os.getpid()}.tmp"
+        fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump({"nextIndex": first + count, "updatedAt": datetime.now().isoformat()}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, counter_file)
+
+    return first
+
+
+def derive_private_key(value, seed_file=None):
+    """Private key in chiaro di un riferimento "hd:<indice>" """
+    return get_deriver(seed_file).private_key(hd_index(value))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Wallet camere HD da seed di flotta')
+    parser.add_argument('--seed', default=CONFIG["SEED_FILE"], help='File del seed di flotta')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('init', help='Genera un nuovo seed di flotta')
+    p_derive = sub.add_parser('derive', help='Mostra address (e indice) di una camera HD')
+    p_derive.add_argument('camera_id', help='Camera ID')
+    p_derive.add_argument('--keys', default='./camera_keys.json', help='Keystore con la mappa camera -> indice')
+    args = parser.parse_args()
+
+    if args.command == 'init':
+        try:
+            mnemonic = create_fleet_seed(args.seed)
+        except FileExistsError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        print(f"✅ Seed di flotta salvato (cifrato) in: {args.seed}")
+        print("⚠️ IMPORTANTE: conserva offline questo mnemonic, permette di ricreare TUTTE le chiavi:")
+        print(f"   {mnemonic}")
+        return
+
+    # Import locale: sign_photo importa (indirettamente) questo modulo
+    from sign_photo import load_credentials
+
+    CONFIG["SEED_FILE"] = args.seed
+    credentials = load_credentials(args.keys, camera_id=args.camera_id)
+    print(f"📹 Camera ID: {credentials['camera_id']}")
+    print(f"📍 Address:   {credentials['address']}")
+    print(f"🔑 Derivata:  {keys.PrivateKey(bytes.fromhex(credentials['private_key'][2:])).public_key.to_checksum_address()}")
+
+
+if __name__ == "__main__":
+    main()
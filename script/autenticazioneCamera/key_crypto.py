@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Private key cifrate "enc:v1:" compatibili con il receiver Go
+Formato: "enc:v1:" + base64(nonce[12] | ciphertext | tag[16]) con AES-256-GCM
+e la stessa chiave locale keyEncKey di mqtt-go/main.go
+(decryptPrivateKey / encryptPrivateKey).
+
+Le chiavi decifrate sono tenute in una cache limitata con TTL, così i
+firmatari batch e il servizio di firma decifrano ogni chiave una sola volta.
+
+Uso da riga di comando (cifra tutte le chiavi in chiaro di un keystore JSON):
+    python key_crypto.py encrypt-file camera_keys.json
+"""
+
+import argparse
+import base64
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from Crypto.Cipher import AES
+
+from key_journal import _write_snapshot, journal_path, keystore_lock, read_keystore
+
+# Prefisso delle chiavi cifrate (come nel receiver Go)
+ENC_PREFIX = "enc:v1:"
+
+# ⚙️ Configurazione
+CONFIG = {
+    # Stessa keyEncKey del receiver Go (32 byte => AES-256), sovrascrivibile da ambiente
+    "KEY_ENC_KEY": os.environ.get("CAMERA_KEY_ENC_KEY", "5831b0c486b30acfd1db20e20a970725").encode('utf-8'),
+    "CACHE_SIZE": 1024,
+    "CACHE_TTL": 300  # secondi
+}
+
+NONCE_SIZE = 12
+TAG_SIZE = 16
+
+
+def is_encrypted(value):
+    """True se la chiave è nel formato cifrato enc:v1"""
+    return isinstance(value, str) and value.startswith(ENC_PREFIX)
+
+
+def is_key_reference(value):
+    """True se il valore non è una chiave in chiaro: cifrata enc:v1 o riferimento HD "hd:<indice>" """
+    return is_encrypted(value) or (isinstance(value, str) and value.startswith("hd:"))
+
+
+def _enc_key():
+    key = CONFIG["KEY_ENC_KEY"]
+    if len(key) != 32:
+        raise ValueError("keyEncKey non valida: servono 32 byte")
+    return key
+
+
+def encrypt_private_key(private_key):
+    """
+    Cifra la private key con AES-256-GCM
+
+    Returns:
+        str: "enc:v1:" + base64(nonce|ciphertext|tag)
+    """
+    nonce = os.urandom(NONCE_SIZE)
+    cipher = AES.new(_enc_key(), AES.MODE_GCM, nonce=nonce)
+    ciphertext, tag = cipher.encrypt_and_digest(private_key.strip().encode('utf-8'))
+    return ENC_PREFIX + base64.b64encode(nonce + ciphertext + tag).decode('ascii')
+
+
+def decrypt_private_key(enc):
+    """
+    Decifra una private key "enc:v1:..." (stesso formato del receiver Go)
+
+    Raises:
+        ValueError: Formato non valido o autenticazione GCM fallita
+    """
+    raw = base64.b64decode(enc[len(ENC_PREFIX):] if enc.startswith(ENC_PREFIX) else enc, validate=True)
+    if len(raw) < NONCE_SIZE + TAG_SIZE:
+        raise ValueError("Chiave cifrata troppo corta")
+
+    nonce, ciphertext, tag = raw[:NONCE_SIZE], raw[NONCE_SIZE:-TAG_SIZE], raw[-TAG_SIZE:]
+    cipher = AES.new(_enc_key(), AES.MODE_GCM, nonce=nonce)
+    try:
+        plain = cipher.decrypt_and_verify(ciphertext, tag)
+    except ValueError:
+        raise ValueError("Decifratura private key fallita (chiave o dati non validi)")
+    return plain.decode('utf-8').strip()
+
+
+class DecryptedKeyCache:
+    """
+    Cache LRU delle chiavi decifrate, con scadenza (TTL) e cancellazione esplicita
+
+    Le chiavi in chiaro sono tenute in bytearray azzerati quando la voce
+    scade, viene rimossa o si chiama wipe() (best effort: le stringhe
+    restituite ai chiamanti restano gestite dal garbage collector).
+    """
+
+    def __init__(self, maxsize=CONFIG["CACHE_SIZE"], ttl=CONFIG["CACHE_TTL"]):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _zero(buffer):
+        for i in range(len(buffer)):
+            buffer[i] = 0
+
+    def get(self, enc):
+        """Ritorna la chiave in chiaro, decifrandola solo se non in cache o scaduta"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(enc)
+            if entry is not None:
+                expires_at, plain = entry
+                if expires_at > now:
+                    self._entries.move_to_end(enc)
+                    self.hits += 1
+                    return plain.decode('utf-8')
+                del self._entries[enc]
+                self._zero(plain)
+            self.misses += 1
+
+        plain = bytearray(decrypt_private_key(enc).encode('utf-8'))
+
+        with self._lock:
+            self._entries[enc] = (now + self.ttl, plain)
+            while len(self._entries) > self.maxsize:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._zero(evicted)
+        return plain.decode('utf-8')
+
+    def wipe(self):
+        """Cancella tutte le chiavi decifrate dalla memoria della cache"""
+        with self._lock:
+            for _, plain in self._entries.values():
+                self._zero(plain)
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl
+            }
+
+
+# Cache condivisa delle chiavi decifrate
+decrypted_key_cache = DecryptedKeyCache()
+
+
+def resolve_private_key(value):
+    """
+    Ritorna la private key in chiaro: decifra (con cache) se è nel formato enc:v1,
+    la deriva dal seed di flotta se è un riferimento HD "hd:<indice>"
+    """
+    if is_encrypted(value):
+        return decrypted_key_cache.get(value)
+    if is_key_reference(value):
+        # Import locale: eth_account serve solo per le camere HD
+        from hd_wallet import derive_private_key
+        return derive_private_key(value)
+    return value
+
+
+def encrypt_keystore_file(json_file):
+    """Cifra in place tutte le chiavi (e mnemonic) in chiaro di un keystore JSON"""
+    # Lock esclusivo: nessun altro processo salva chiavi durante la riscrittura
+    with keystore_lock(json_file):
+        # Include le righe del journal, che vengono riportate nello snapshot
+        keys = read_keystore(json_file)
+
+        count = 0
+        for entry in keys.values():
+            if entry.get("privateKey") and not is_key_reference(entry["privateKey"]):
+                private_key = entry["privateKey"]
+                if not private_key.startswith('0x'):
+                    private_key = '0x' + private_key
+                entry["privateKey"] = encrypt_private_key(private_key)
+                count += 1
+            if entry.get("mnemonic") and not is_encrypted(entry["mnemonic"]):
+                entry["mnemonic"] = encrypt_private_key(entry["mnemonic"])
+
+        _write_snapshot(json_file, keys)
+        if os.path.exists(journal_path(json_file)):
+            os.truncate(journal_path(json_file), 0)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Private key cifrate enc:v1')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_file = sub.add_parser('encrypt-file', help='Cifra le chiavi in chiaro di un keystore JSON')
+    p_file.add_argument('json_file', help='Keystore JSON (es. camera_keys.json)')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.json_file) and not os.path.exists(journal_path(args.json_file)):
+        print(f"❌ File {args.json_file} non trovato")
+        sys.exit(1)
+
+    count = encrypt_keystore_file(args.json_file)
+    print(f"✅ Cifrate {count} chiavi in {args.json_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+"""
+Keystore log-structured per camera_keys.json
+Invece di riscrivere tutto il file JSON a ogni nuova chiave, save_private_key
+accoda una riga al journal (camera_keys.json.journal). Le fsync sono
+raggruppate (ogni N righe o ogni pochi millisecondi) e un thread in
+background compatta periodicamente il journal nello snapshot JSON.
+
+I lettori ricostruiscono il keystore leggendo lo snapshot e riapplicando
+le righe del journal: una riga troncata da un crash viene ignorata, una
+lettura sovrapposta a una compattazione viene ripetuta.
+
+Più processi possono scrivere sullo stesso keystore: le append prendono un
+lock condiviso (flock) su camera_keys.json.lock, le riscritture dello
+snapshot (salvataggio JSON, compattazione) un lock esclusivo, così nessuna
+riga viene persa tra la lettura e la riscrittura.
+
+Nota: il receiver Go legge solo lo snapshot, quindi vede le nuove camere
+dopo la compattazione (compact() o python key_journal.py compact).
+"""
+
+import argparse
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Windows: nessun lock tra processi
+
+# Suffisso del journal accanto allo snapshot JSON
+JOURNAL_SUFFIX = ".journal"
+
+# Suffisso del file di lock accanto allo snapshot JSON
+LOCK_SUFFIX = ".lock"
+
+# ⚙️ Configurazione di default
+CONFIG = {
+    "FSYNC_BATCH": 64,          # fsync dopo N righe accodate...
+    "FSYNC_INTERVAL": 0.05,     # ...o dopo questi secondi dall'ultima riga non sincronizzata
+    "COMPACT_THRESHOLD": 10000  # compattazione in background oltre N righe nel journal
+}
+
+# Journal aperti per processo: path snapshot -> KeyJournal
+_open_journals = {}
+_lock = threading.Lock()
+
+
+def journal_path(snapshot_file):
+    """Path del journal associato allo snapshot"""
+    return snapshot_file + JOURNAL_SUFFIX
+
+
+def lock_path(snapshot_file):
+    """Path del file di lock associato allo snapshot"""
+    return snapshot_file + LOCK_SUFFIX
+
+
+def _open_lock(snapshot_file):
+    return os.open(lock_path(snapshot_file), os.O_RDWR | os.O_CREAT, 0o600)
+
+
+@contextmanager
+def keystore_lock(snapshot_file, exclusive=True):
+    """
+    Lock tra processi sul keystore (flock su camera_keys.json.lock)
+
+    Esclusivo per le riscritture dello snapshot, condiviso per le append al journal.
+    """
+    fd = _open_lock(snapshot_file)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield
+    finally:
+        # La chiusura del descrittore rilascia anche il lock
+        os.close(fd)
+
+
+def _read_journal(path):
+    """Legge le righe valide del journal: lista di (camera_id, entry)"""
+    records = []
+    try:
+        with open(path, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Riga incompleta (crash durante la scrittura): scartata
+                    continue
+                records.append((record["camera_id"], record["entry"]))
+    except FileNotFoundError:
+        pass
+    return records
+
+
+def read_journal_from(path, offset=0):
+    """
+    Legge le righe complete del journal a partire da un offset in byte
+
+    Una riga finale non ancora terminata non viene consumata: sarà letta
+    alla chiamata successiva, quando il writer l'avrà completata.
+
+    Returns:
+        tuple: (lista di (camera_id, entry), nuovo offset)
+    """
+    records = []
+    try:
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        return records, 0
+
+    end = data.rfind(b"\n") + 1
+    for line in data[:end].splitlines():
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        records.append((record["camera_id"], record["entry"]))
+    return records, offset + end
+
+
+def _repair_tail(path):
+    """Tronca un'eventuale riga incompleta in coda al journal (crash durante la write)"""
+    try:
+        with open(path, 'rb+') as f:
+            size = f.seek(0, os.SEEK_END)
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+            # Cerca l'ultimo fine riga all'indietro
+            pos = size
+            while pos > 0:
+                step = min(4096, pos)
+                f.seek(pos - step)
+                block = f.read(step)
+                idx = block.rfind(b"\n")
+                if idx >= 0:
+                    f.truncate(pos - step + idx + 1)
+                    return
+                pos -= step
+            f.truncate(0)
+    except FileNotFoundError:
+        pass
+
+
+def _file_identity(st):
+    """(device, inode) di un file: cambia quando lo snapshot viene sostituito con os.replace"""
+    return st.st_dev, st.st_ino
+
+
+def read_keystore(snapshot_file):
+    """
+    Ricostruisce il keystore: snapshot JSON + righe del journal
+
+    Senza lock: una compattazione concorrente sostituisce lo snapshot e poi
+    svuota il journal, quindi se dopo la lettura del journal il path punta a
+    un file diverso da quello letto (snapshot vecchio + journal già svuotato)
+    la lettura viene ripetuta.
+
+    Returns:
+        dict: camera_id -> entry, come camera_keys.json
+    """
+    while True:
+        keys = {}
+        identity = None
+        try:
+            with open(snapshot_file, 'r') as f:
+                identity = _file_identity(os.fstat(f.fileno()))
+                keys = json.load(f)
+        except FileNotFoundError:
+            if not os.path.exists(journal_path(snapshot_file)):
+                raise
+
+        for camera_id, entry in _read_journal(journal_path(snapshot_file)):
+            keys[camera_id] = entry
+
+        try:
+            current = _file_identity(os.stat(snapshot_file))
+        except FileNotFoundError:
+            current = None
+        if current == identity:
+            return keys
+
+
+def _write_snapshot(snapshot_file, keys):
+    """Scrive lo snapshot in modo atomico (file temporaneo + fsync + rename)"""
+    tmp_file = f"{snapshot_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+    fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(keys, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, snapshot_file)
+
+
+class KeyJournal:
+    """
+    Writer del journal: append con fsync raggruppate e compattazione in background
+
+    Più processi possono scrivere sullo stesso keystore: ogni append è una
+    sola write con O_APPEND sotto lock condiviso, la compattazione prende
+    il lock esclusivo.
+    """
+
+    def __init__(self, snapshot_file, fsync_batch=CONFIG["FSYNC_BATCH"],
+                 fsync_interval=CONFIG["FSYNC_INTERVAL"],
+                 compact_threshold=CONFIG["COMPACT_THRESHOLD"]):
+        self.snapshot_file = snapshot_file
+        self.path = journal_path(snapshot_file)
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+        self.compact_threshold = compact_threshold
+
+        self._lock_fd = _open_lock(snapshot_file)
+        self._flock(exclusive=True)
+        try:
+            _repair_tail(self.path)
+        finally:
+            self._funlock()
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        self._entries = len(_read_journal(self.path))
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._closed = False
+        self._compact_requested = False
+
+        self._cond = threading.Condition()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def _flock(self, exclusive):
+        if fcntl is not None:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+
+    def _funlock(self):
+        if fcntl is not None:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def append(self, camera_id, entry):
+        """Accoda una chiave al journal (fsync raggruppata)"""
+        line = json.dumps({"camera_id": camera_id, "entry": entry}) + "\n"
+        with self._cond:
+            if self._closed:
+                raise ValueError("Journal chiuso")
+            # Una sola write per riga: con O_APPEND la riga non si mescola ad altre.
+            # Il lock condiviso impedisce che una compattazione la perda.
+            self._flock(exclusive=False)
+            try:
+                os.write(self._fd, line.encode('utf-8'))
+            finally:
+                self._funlock()
+            self._entries += 1
+            self._pending += 1
+            if self._pending >= self.fsync_batch:
+                self._sync_locked()
+            if self._entries >= self.compact_threshold:
+                self._compact_requested = True
+            self._cond.notify()
+
+    def _sync_locked(self):
+        if self._pending:
+            os.fsync(self._fd)
+            self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def flush(self):
+        """Forza la fsync delle righe accodate"""
+        with self._cond:
+            self._sync_locked()
+
+    def compact(self):
+        """Riscrive lo snapshot includendo il journal e svuota il journal"""
+        with self._cond:
+            self._compact_locked()
+
+    def _compact_locked(self):
+        self._sync_locked()
+        self._flock(exclusive=True)
+        try:
+            keys = read_keystore(self.snapshot_file)
+            _write_snapshot(self.snapshot_file, keys)
+            # Lo snapshot contiene ora tutte le righe: il journal può ripartire da zero
+            os.ftruncate(self._fd, 0)
+            os.fsync(self._fd)
+        finally:
+            self._funlock()
+        self._entries = 0
+        self._compact_requested = False
+
+    def _run(self):
+        """Thread in background: fsync periodiche e compattazione su soglia"""
+        with self._cond:
+            while not self._closed:
+                if self._compact_requested:
+                    self._compact_locked()
+                    continue
+                if self._pending:
+                    remaining = self.fsync_interval - (time.monotonic() - self._last_sync)
+                    if remaining <= 0:
+                        self._sync_locked()
+                        continue
+                    self._cond.wait(remaining)
+                else:
+                    self._cond.wait()
+
+    def close(self):
+        """Sincronizza le righe pendenti e chiude il journal"""
+        with self._cond:
+            if self._closed:
+                return
+            self._sync_locked()
+            self._closed = True
+            self._cond.notify()
+        self._worker.join()
+        os.close(self._fd)
+        os.close(self._lock_fd)
+
+
+def open_journal(snapshot_file):
+    """Ritorna il journal del keystore, aprendolo una sola volta per processo"""
+    snapshot_file = os.path.abspath(snapshot_file)
+    with _lock:
+        journal = _open_journals.get(snapshot_file)
+        if journal is None:
+            journal = KeyJournal(snapshot_file)
+            _open_journals[snapshot_file] = journal
+        return journal
+
+
+@atexit.register
+def _close_all():
+    """All'uscita del processo nessuna riga accodata resta senza fsync"""
+    with _lock:
+        journals = list(_open_journals.values())
+        _open_journals.clear()
+    for journal in journals:
+        journal.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gestione journal del keystore camere')
+    parser.add_argument('command', choices=['compact', 'status'], help='Operazione')
+    parser.add_argument('--keys', default='./camera_keys.json', help='Snapshot JSON del keystore')
+    args = parser.parse_args()
+
+    path = journal_path(args.keys)
+    if not os.path.exists(args.keys) and not os.path.exists(path):
+        print(f"❌ File {args.keys} non trovato")
+        sys.exit(1)
+
+    if args.command == 'status':
+        print(f"📂 Snapshot: {args.keys}")
+        print(f"📝 Righe nel journal: {len(_read_journal(path))}")
+        print(f"📹 Camere totali: {len(read_keystore(args.keys))}")
+        return
+
+    journal = open_journal(args.keys)
+    journal.compact()
+    print(f"✅ Journal compattato in {args.keys}")
+
+
+if __name__ == "__main__":
+    main()
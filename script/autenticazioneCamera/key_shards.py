@@ -0,0 +1,239 @@
+"""
+Keystore suddiviso in shard per prefisso del camera_id (deploy multi-gateway)
+Un manifest (*.shards.json) elenca gli shard, uno per prefisso esadecimale
+del camera_id, e quali shard appartengono a ciascun gateway. Ogni gateway
+carica solo i propri shard: load_credentials / load_private_key usano il
+manifest per instradare la ricerca verso lo shard giusto.
+
+Il gateway locale si indica con CAMERA_GATEWAY_ID (o CONFIG["GATEWAY_ID"]);
+senza gateway sono visibili tutti gli shard (uso amministrativo).
+
+Esempio di manifest:
+    {
+      "version": 1,
+      "prefixLength": 1,
+      "shards": {"0": "camera_keys.0.json", ..., "f": "camera_keys.f.json"},
+      "gateways": {"gw-nord": ["0", ..., "7"], "gw-sud": ["8", ..., "f"]}
+    }
+
+Gli shard possono essere file JSON, keystore SQLite (.db) o snapshot (.snap).
+Il manifest si crea da un keystore esistente con:
+    python get_camera_wallet.py --keys camera_keys.json shard camera_keys.shards.json --gateways gw-nord,gw-sud
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+
+from key_journal import _write_snapshot, journal_path, keystore_lock, read_keystore
+from key_snapshot import KeySnapshot, build_snapshot, is_snapshot_keystore
+from keystore import is_sqlite_keystore, open_keystore
+
+# Estensione che identifica un manifest di shard
+SHARDS_SUFFIX = ".shards.json"
+
+HEX_DIGITS = set("0123456789abcdef")
+
+# ⚙️ Configurazione
+CONFIG = {
+    "GATEWAY_ID": os.environ.get("CAMERA_GATEWAY_ID") or None,
+    "PREFIX_LENGTH": 1  # 1 cifra esadecimale => 16 shard
+}
+
+# Manifest aperti per processo: path -> (mtime_ns, ShardManifest)
+_manifests = {}
+_lock = threading.Lock()
+
+
+def is_sharded_keystore(path):
+    """True se il path indica un manifest di shard invece di un keystore"""
+    return str(path).lower().endswith(SHARDS_SUFFIX)
+
+
+def _normalize_camera_id(camera_id):
+    """Normalizza un camera ID per il confronto (senza 0x, minuscolo)"""
+    return camera_id.replace('0x', '').lower()
+
+
+def _shard_prefix(camera_id, prefix_length):
+    """
+    Prefisso esadecimale del camera_id che sceglie lo shard
+
+    Raises:
+        ValueError: Camera ID non esadecimale o più corto del prefisso
+    """
+    normalized = _normalize_camera_id(camera_id) if isinstance(camera_id, str) else ""
+    if len(normalized) < prefix_length or not set(normalized) <= HEX_DIGITS:
+        raise ValueError(f"Camera ID non valido per lo sharding (serve un ID esadecimale): {camera_id!r}")
+    return normalized[:prefix_length]
+
+
+class ShardManifest:
+    """Manifest degli shard: prefisso -> file e gateway -> prefissi"""
+
+    def __init__(self, path, data):
+        self.path = path
+        base_dir = os.path.dirname(os.path.abspath(path))
+        self.prefix_length = int(data["prefixLength"])
+        self.shards = {
+            prefix.lower(): os.path.join(base_dir, shard_file)
+            for prefix, shard_file in data["shards"].items()
+        }
+        self.gateways = {
+            gateway: [prefix.lower() for prefix in prefixes]
+            for gateway, prefixes in data.get("gateways", {}).items()
+        }
+        self._owners = {
+            prefix: gateway
+            for gateway, prefixes in self.gateways.items()
+            for prefix in prefixes
+        }
+
+    def shard_key(self, camera_id):
+        """Prefisso (shard) del camera_id"""
+        return _shard_prefix(camera_id, self.prefix_length)
+
+    def owner(self, prefix):
+        """Gateway proprietario dello shard (None se non assegnato)"""
+        return self._owners.get(prefix)
+
+    def local_shards(self, gateway_id=None):
+        """
+        Path degli shard del gateway (tutti se gateway_id è None)
+
+        Raises:
+            ValueError: Gateway non presente nel manifest
+        """
+        gateway_id = gateway_id if gateway_id is not None else CONFIG["GATEWAY_ID"]
+        if gateway_id is None:
+            return [self.shards[prefix] for prefix in sorted(self.shards)]
+        if gateway_id not in self.gateways:
+            raise ValueError(f"Gateway {gateway_id} non presente nel manifest {self.path}")
+        return [self.shards[prefix] for prefix in self.gateways[gateway_id] if prefix in self.shards]
+
+    def route(self, camera_id, gateway_id=None):
+        """
+        Path dello shard che contiene la camera
+
+        Raises:
+            ValueError: Camera assegnata a un altro gateway o prefisso senza shard
+        """
+        gateway_id = gateway_id if gateway_id is not None else CONFIG["GATEWAY_ID"]
+        prefix = self.shard_key(camera_id)
+        path = self.shards.get(prefix)
+        if path is None:
+            raise ValueError(f"Nessuno shard per il prefisso {prefix!r} di {camera_id}")
+        owner = self.owner(prefix)
+        if gateway_id is not None and owner != gateway_id:
+            raise ValueError(f"Camera ID {camera_id} gestita dal gateway {owner}, non da {gateway_id}")
+        return path
+
+
+def open_manifest(path):
+    """Ritorna il manifest, rileggendolo solo se il file è cambiato"""
+    path = os.path.abspath(path)
+    mtime = os.stat(path).st_mtime_ns
+    with _lock:
+        cached = _manifests.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        with open(path, 'r') as f:
+            manifest = ShardManifest(path, json.load(f))
+        _manifests[path] = (mtime, manifest)
+        return manifest
+
+
+def _write_shard(path, entries):
+    """
+    Aggiunge le camere a uno shard nel formato indicato dall'estensione
+
+    Le camere già presenti nello shard e non in `entries` vengono mantenute
+    (come put_many per gli shard SQLite): una nuova divisione non perde chiavi.
+    """
+    if is_sqlite_keystore(path):
+        open_keystore(path).put_many(entries.items())
+    elif is_snapshot_keystore(path):
+        if not entries:
+            return  # Snapshot in sola lettura: nulla da aggiungere
+        merged = {}
+        if os.path.exists(path):
+            with KeySnapshot(path) as snapshot:
+                merged.update(snapshot.items())
+        merged.update(entries)
+        build_snapshot(merged, path)
+    else:
+        # Stesso lock di save_private_key: nessuna scrittura concorrente viene persa
+        with keystore_lock(path):
+            merged = {}
+            if os.path.exists(path) or os.path.exists(journal_path(path)):
+                merged.update(read_keystore(path))
+            merged.update(entries)
+            _write_snapshot(path, merged)
+            # Le righe del journal sono ora nel file: il journal riparte vuoto
+            if os.path.exists(journal_path(path)):
+                os.truncate(journal_path(path), 0)
+
+
+def split_keystore(keys, manifest_file, prefix_length=CONFIG["PREFIX_LENGTH"],
+                   gateways=(), shard_suffix=".json"):
+    """
+    Divide un keystore in shard per prefisso del camera_id e scrive il manifest
+
+    I prefissi sono assegnati ai gateway in blocchi contigui di dimensione
+    simile (es. 2 gateway, 16 shard: 0-7 e 8-f). Le camere vengono aggiunte
+    agli shard esistenti in tutti i formati (JSON, SQLite, snapshot): ripetere
+    la divisione non elimina le chiavi già presenti negli shard.
+
+    Args:
+        keys: dict camera_id -> entry (come camera_keys.json)
+        manifest_file: Path del manifest (*.shards.json)
+        prefix_length: Cifre esadecimali del prefisso (16 ** prefix_length shard)
+        gateways: Nomi dei gateway tra cui dividere gli shard
+        shard_suffix: Formato degli shard (.json, .db, .snap)
+
+    Returns:
+        dict: Numero di camere per prefisso
+
+    Raises:
+        ValueError: Manifest con estensione errata o camera ID non esadecimale
+    """
+    if not is_sharded_keystore(manifest_file):
+        raise ValueError(f"Il manifest deve terminare con {SHARDS_SUFFIX}")
+
+    prefixes = [format(i, f"0{prefix_length}x") for i in range(16 ** prefix_length)]
+    buckets = {prefix: {} for prefix in prefixes}
+    for camera_id, entry in keys.items():
+        buckets[_shard_prefix(camera_id, prefix_length)][camera_id] = entry
+
+    base = os.path.basename(manifest_file)[:-len(SHARDS_SUFFIX)]
+    base_dir = os.path.dirname(os.path.abspath(manifest_file))
+    shards = {prefix: f"{base}.{prefix}{shard_suffix}" for prefix in prefixes}
+
+    for prefix, entries in buckets.items():
+        # Gli snapshot sono in sola lettura: si scrivono solo gli shard non vuoti
+        if entries or not is_snapshot_keystore(shards[prefix]):
+            _write_shard(os.path.join(base_dir, shards[prefix]), entries)
+
+    assignment = {}
+    if gateways:
+        per_gateway, extra = divmod(len(prefixes), len(gateways))
+        start = 0
+        for i, gateway in enumerate(gateways):
+            end = start + per_gateway + (1 if i < extra else 0)
+            assignment[gateway] = prefixes[start:end]
+            start = end
+
+    manifest = {
+        "version": 1,
+        "prefixLength": prefix_length,
+        "shards": shards,
+        "gateways": assignment,
+        "createdAt": datetime.now().isoformat()
+    }
+    tmp_file = f"{manifest_file}.{os.getpid()}.tmp"
+    with open(tmp_file, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_file, manifest_file)
+
+    return {prefix: len(entries) for prefix, entries in buckets.items()}
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Snapshot binario in sola lettura del keystore camere (.snap)
+Pensato per l'avvio dei gateway: invece di leggere e fare il parsing di
+tutto camera_keys.json, il file viene aperto con mmap e interrogato con
+ricerca binaria. L'apertura non dipende dal numero di camere e le pagine
+del file sono condivise tra tutti i processi che lo leggono.
+
+Formato (little endian):
+- header: magic, dimensione record, numero camere, prima camera inserita,
+  offset dell'indice per address
+- record a larghezza fissa ordinati per camera_id (32 byte):
+  camera_id | flag | address | private key (anche enc:v1 / hd:) | createdAt
+- indice per address: (address 20 byte, numero record) ordinati per address
+
+I mnemonic non sono inclusi. Lo snapshot si crea dal keystore esistente con:
+    python get_camera_wallet.py --keys camera_keys.json snapshot camera_keys.snap
+"""
+
+import mmap
+import os
+import struct
+import threading
+
+# Estensione che identifica uno snapshot binario
+SNAPSHOT_SUFFIX = ".snap"
+
+MAGIC = b"CAMKEYS1"
+
+# magic, dimensione record, numero camere, posizione prima camera, offset indice address
+HEADER = struct.Struct("<8sIIIQ4x")
+
+# camera_id, flag, address, private key, createdAt
+RECORD = struct.Struct("<32sB42s160s32s13x")
+
+# address (20 byte), numero record
+ADDRESS_ENTRY = struct.Struct("<20sI")
+
+# Flag del record: il camera_id originale aveva il prefisso 0x
+FLAG_0X = 0x01
+
+# Snapshot aperti per processo: path -> KeySnapshot
+_open_snapshots = {}
+_lock = threading.Lock()
+
+
+def is_snapshot_keystore(path):
+    """True se il path indica uno snapshot binario del keystore"""
+    return str(path).lower().endswith(SNAPSHOT_SUFFIX)
+
+
+def _camera_key(camera_id):
+    """camera_id (64 hex, con o senza 0x) -> 32 byte; None se non valido"""
+    try:
+        key = bytes.fromhex(camera_id.replace('0x', ''))
+    except ValueError:
+        return None
+    return key if len(key) == 32 else None
+
+
+def _address_key(address):
+    """address (0x + 40 hex) -> 20 byte; None se non valido"""
+    try:
+        key = bytes.fromhex(address[2:] if address.startswith('0x') else address)
+    except ValueError:
+        return None
+    return key if len(key) == 20 else None
+
+
+def _field(value, size, name):
+    raw = value.encode('ascii')
+    if len(raw) > size:
+        raise ValueError(f"Campo {name} troppo lungo per lo snapshot ({len(raw)} > {size} byte)")
+    return raw
+
+
+def build_snapshot(keys, snapshot_file):
+    """
+    Scrive lo snapshot binario di un keystore
+
+    Args:
+        keys: dict camera_id -> entry (come camera_keys.json), in ordine di inserimento
+        snapshot_file: Path del file .snap da creare (scritto in modo atomico)
+
+    Returns:
+        int: Numero di camere nello snapshot
+    """
+    records = []
+    seen = set()
+    for position, (camera_id, entry) in enumerate(keys.items()):
+        key = _camera_key(camera_id)
+        if key is None:
+            raise ValueError(f"Camera ID non valido per lo snapshot (servono 32 byte hex): {camera_id}")
+        if key in seen:
+            continue  # Come l'indice JSON: vale la prima occorrenza
+        seen.add(key)
+
+        address = _address_key(entry["address"])
+        if address is None:
+            raise ValueError(f"Address non valido per la camera {camera_id}: {entry['address']}")
+
+        records.append((key, position, address, RECORD.pack(
+            key,
+            FLAG_0X if camera_id.startswith('0x') else 0,
+            _field(entry["address"], 42, "address"),
+            _field(entry["privateKey"], 160, "privateKey"),
+            _field(entry.get("createdAt", ""), 32, "createdAt")
+        )))
+
+    records.sort(key=lambda r: r[0])
+
+    # Prima camera in ordine di inserimento (usata quando non si specifica la camera)
+    first = min(range(len(records)), key=lambda i: records[i][1]) if records else 0
+
+    # Indice per address: a parità di address vale la camera inserita per prima
+    address_index = sorted(range(len(records)), key=lambda i: (records[i][2], records[i][1]))
+
+    address_offset = HEADER.size + len(records) * RECORD.size
+
+    tmp_file = f"{snapshot_file}.{os.getpid()}.tmp"
+    fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, RECORD.size, len(records), first, address_offset))
+        for record in records:
+            f.write(record[3])
+        for i in address_index:
+            f.write(ADDRESS_ENTRY.pack(records[i][2], i))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, snapshot_file)
+
+    return len(records)
+
+
+class KeySnapshot:
+    """
+    Snapshot del keystore mappato in memoria (sola lettura)
+
+    Le ricerche per camera_id e per address sono ricerche binarie sul file
+    mappato: nessun parsing all'apertura e nessuna copia in memoria.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            if len(self._mm) < HEADER.size:
+                raise ValueError(f"Snapshot non valido: {path}")
+            magic, record_size, count, first, address_offset = HEADER.unpack_from(self._mm, 0)
+            if magic != MAGIC or record_size != RECORD.size:
+                raise ValueError(f"Snapshot non valido o di versione diversa: {path}")
+            if len(self._mm) < address_offset + count * ADDRESS_ENTRY.size:
+                raise ValueError(f"Snapshot troncato: {path}")
+        except BaseException:
+            # Header non valido: il file mappato non resta aperto
+            self._mm.close()
+            raise
+
+        self._count = count
+        self._first = first
+        self._address_offset = address_offset
+
+    def close(self):
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self._count
+
+    def _record(self, index):
+        """Ritorna (camera_id, entry) del record in posizione index"""
+        key, flags, address, private_key, created_at = RECORD.unpack_from(
+            self._mm, HEADER.size + index * RECORD.size
+        )
+        camera_id = ('0x' if flags & FLAG_0X else '') + key.hex()
+        return camera_id, {
+            "address": address.rstrip(b"\0").decode('ascii'),
+            "privateKey": private_key.rstrip(b"\0").decode('ascii'),
+            "mnemonic": "",
+            "createdAt": created_at.rstrip(b"\0").decode('ascii')
+        }
+
+    def _camera_key_at(self, index):
+        offset = HEADER.size + index * RECORD.size
+        return self._mm[offset:offset + 32]
+
+    def _address_entry_at(self, index):
+        return ADDRESS_ENTRY.unpack_from(self._mm, self._address_offset + index * ADDRESS_ENTRY.size)
+
+    def get(self, camera_id):
+        """Ritorna (camera_id, entry) oppure None (ricerca binaria per camera_id)"""
+        key = _camera_key(camera_id)
+        if key is None:
+            return None
+
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._camera_key_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._count and self._camera_key_at(lo) == key:
+            return self._record(lo)
+        return None
+
+    def get_by_address(self, address):
+        """Ritorna (camera_id, entry) della camera con questo wallet oppure None"""
+        key = _address_key(address)
+        if key is None:
+            return None
+
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._address_entry_at(mid)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._count:
+            found, index = self._address_entry_at(lo)
+            if found == key:
+                return self._record(index)
+        return None
+
+    def first(self):
+        """Prima camera inserita nel keystore oppure None se lo snapshot è vuoto"""
+        return self._record(self._first) if self._count else None
+
+    def items(self):
+        """Tutte le camere (ordinate per camera_id): lista di (camera_id, entry)"""
+        return [self._record(i) for i in range(self._count)]
+
+
+def open_snapshot(path):
+    """
+    Ritorna lo snapshot del path, mappandolo una sola volta per processo
+
+    Se il file viene ricostruito (nuovo inode) lo snapshot viene riaperto.
+    Lo snapshot è condiviso tra i chiamanti (non va chiuso): per letture
+    complete una tantum usare `with KeySnapshot(path)`.
+    """
+    path = os.path.abspath(path)
+    inode = os.stat(path).st_ino
+    with _lock:
+        cached = _open_snapshots.get(path)
+        if cached is not None and cached[0] == inode:
+            return cached[1]
+        snapshot = KeySnapshot(path)
+        _open_snapshots[path] = (inode, snapshot)
+        return snapshot
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Keystore camere su SQLite (alternativo a camera_keys.json)
+Le chiavi sono indicizzate per camera_id normalizzato e per wallet address,
+il database è aperto in modalità WAL: ricerche e inserimenti restano veloci
+anche con 100k+ camere, senza riscrivere tutto il file a ogni nuova chiave.
+
+Le funzioni esistenti (load_credentials, load_private_key, save_private_key)
+usano questo keystore quando il path termina con .db/.sqlite/.sqlite3.
+
+Uso da riga di comando:
+    python keystore.py import camera_keys.json camera_keys.db
+    python keystore.py export camera_keys.db camera_keys.json
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+
+from key_journal import journal_path, read_keystore
+
+# Estensioni che identificano un keystore SQLite
+SQLITE_SUFFIXES = ('.db', '.sqlite', '.sqlite3')
+
+# Keystore aperti per processo: path -> SqliteKeystore
+_open_keystores = {}
+_lock = threading.Lock()
+
+
+def is_sqlite_keystore(path):
+    """True se il path indica un keystore SQLite invece del file JSON"""
+    return str(path).lower().endswith(SQLITE_SUFFIXES)
+
+
+def _normalize_camera_id(camera_id):
+    """Normalizza un camera ID per il confronto (senza 0x, minuscolo)"""
+    return camera_id.replace('0x', '').lower()
+
+
+def _restrict_permissions(path):
+    """Porta a 0600 il database e i suoi file -wal/-shm (anche se creati da versioni precedenti)"""
+    for file in (path, path + "-wal", path + "-shm"):
+        try:
+            os.chmod(file, 0o600)
+        except OSError:
+            pass  # File non ancora creato o filesystem senza permessi POSIX (Windows)
+
+
+class SqliteKeystore:
+    """
+    Keystore SQLite: una riga per camera, stesso contenuto delle entry JSON
+    (address, privateKey, mnemonic, createdAt)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        # Il database e i file -wal/-shm contengono le private key in chiaro:
+        # creati 0600 (umask 077 mentre SQLite li crea), come camera_keys.json
+        os.close(os.open(path, os.O_RDWR | os.O_CREAT, 0o600))
+        previous_umask = os.umask(0o077)
+        try:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        finally:
+            os.umask(previous_umask)
+        _restrict_permissions(path)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS cameras (
+                camera_key TEXT PRIMARY KEY,
+                camera_id TEXT NOT NULL,
+                address TEXT NOT NULL,
+                address_key TEXT NOT NULL,
+                private_key TEXT NOT NULL,
+                mnemonic TEXT NOT NULL DEFAULT '',
+                created_at TEXT NOT NULL DEFAULT ''
+            );
+            CREATE INDEX IF NOT EXISTS idx_cameras_address ON cameras(address_key);
+        """)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _row_to_entry(row):
+        camera_id, address, private_key, mnemonic, created_at = row
+        return camera_id, {
+            "address": address,
+            "privateKey": private_key,
+            "mnemonic": mnemonic,
+            "createdAt": created_at
+        }
+
+    def _query_one(self, sql, params=()):
+        with self._lock:
+            row = self._conn.execute(sql, params).fetchone()
+        return self._row_to_entry(row) if row else None
+
+    def get(self, camera_id):
+        """Ritorna (camera_id originale, entry) oppure None"""
+        return self._query_one(
+            "SELECT camera_id, address, private_key, mnemonic, created_at "
+            "FROM cameras WHERE camera_key = ?",
+            (_normalize_camera_id(camera_id),)
+        )
+
+    def get_by_address(self, address):
+        """Ritorna (camera_id, entry) della camera con questo wallet oppure None"""
+        return self._query_one(
+            "SELECT camera_id, address, private_key, mnemonic, created_at "
+            "FROM cameras WHERE address_key = ? ORDER BY rowid LIMIT 1",
+            (address.lower(),)
+        )
+
+    def first(self):
+        """Prima camera inserita oppure None se il keystore è vuoto"""
+        return self._query_one(
+            "SELECT camera_id, address, private_key, mnemonic, created_at "
+            "FROM cameras ORDER BY rowid LIMIT 1"
+        )
+
+    def put_many(self, entries):
+        """
+        Inserisce o aggiorna più camere in un'unica transazione
+
+        Args:
+            entries: Iterabile di tuple (camera_id, entry JSON)
+        """
+        # REPLACE con rowid sempre crescenti: anche le camere aggiornate ricevono
+        # un nuovo rowid, così items_since() vede sia le nuove sia le modificate
+        with self._lock, self._conn:
+            # Lock di scrittura prima di leggere MAX(rowid): niente rowid duplicati tra processi
+            self._conn.execute("BEGIN IMMEDIATE")
+            base = self._conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM cameras").fetchone()[0]
+            rows = (
+                (
+                    base + offset,
+                    _normalize_camera_id(camera_id),
+                    camera_id,
+                    entry["address"],
+                    entry["address"].lower(),
+                    entry["privateKey"],
+                    entry.get("mnemonic", ""),
+                    entry.get("createdAt", "")
+                )
+                for offset, (camera_id, entry) in enumerate(entries, 1)
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO cameras "
+                "(rowid, camera_key, camera_id, address, address_key, private_key, mnemonic, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+
+    def put(self, camera_id, entry):
+        """Inserisce o aggiorna una camera"""
+        self.put_many([(camera_id, entry)])
+
+    def items(self):
+        """Tutte le camere in ordine di inserimento: lista di (camera_id, entry)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT camera_id, address, private_key, mnemonic, created_at "
+                "FROM cameras ORDER BY rowid"
+            ).fetchall()
+        return [self._row_to_entry(row) for row in rows]
+
+    def items_since(self, rowid):
+        """
+        Camere inserite o aggiornate dopo un certo rowid
+
+        Returns:
+            tuple: (lista di (camera_id, entry), ultimo rowid letto)
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT rowid, camera_id, address, private_key, mnemonic, created_at "
+                "FROM cameras WHERE rowid > ? ORDER BY rowid",
+                (rowid,)
+            ).fetchall()
+        if not rows:
+            return [], rowid
+        return [self._row_to_entry(row[1:]) for row in rows], rows[-1][0]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cameras").fetchone()[0]
+
+    def import_json(self, json_file):
+        """
+        Importa tutte le camere da un camera_keys.json; ritorna il numero importato
+
+        Le camere sono lette come da read_keystore: snapshot JSON più le righe
+        del journal (camere salvate ma non ancora compattate).
+        """
+        cameras = read_keystore(json_file)
+        self.put_many(cameras.items())
+        return len(cameras)
+
+    def export_json(self, json_file):
+        """Esporta il keystore nel formato camera_keys.json; ritorna il numero esportato"""
+        cameras = dict(self.items())
+        # Creato direttamente 0600: le chiavi non sono mai leggibili da altri utenti
+        fd = os.open(json_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(cameras, f, indent=2)
+        try:
+            os.chmod(json_file, 0o600)  # file già esistente con permessi più larghi
+        except OSError:
+            pass  # Potrebbe fallire su Windows
+        return len(cameras)
+
+
+def open_keystore(path):
+    """Ritorna il keystore SQLite del path, aprendolo una sola volta per processo"""
+    path = os.path.abspath(path)
+    with _lock:
+        keystore = _open_keystores.get(path)
+        if keystore is None:
+            keystore = SqliteKeystore(path)
+            _open_keystores[path] = keystore
+        return keystore
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Keystore camere su SQLite')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_import = sub.add_parser('import', help='Importa camera_keys.json nel keystore SQLite')
+    p_import.add_argument('json_file', help='File JSON sorgente')
+    p_import.add_argument('db_file', help='Keystore SQLite di destinazione')
+
+    p_export = sub.add_parser('export', help='Esporta il keystore SQLite in formato JSON')
+    p_export.add_argument('db_file', help='Keystore SQLite sorgente')
+    p_export.add_argument('json_file', help='File JSON di destinazione')
+
+    args = parser.parse_args()
+
+    if args.command == 'import':
+        if not os.path.exists(args.json_file) and not os.path.exists(journal_path(args.json_file)):
+            print(f"❌ File {args.json_file} non trovato")
+            sys.exit(1)
+        count = open_keystore(args.db_file).import_json(args.json_file)
+        print(f"✅ Importate {count} camere in {args.db_file}")
+    else:
+        if not os.path.exists(args.db_file):
+            print(f"❌ File {args.db_file} non trovato")
+            sys.exit(1)
+        count = open_keystore(args.db_file).export_json(args.json_file)
+        print(f"✅ Esportate {count} camere in {args.json_file}")
+        print("⚠️ IMPORTANTE:  Proteggi questo file e NON committarlo su Git!")
+
+
+if __name__ == "__main__":
+    main()
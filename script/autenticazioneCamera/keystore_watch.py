@@ -0,0 +1,218 @@
+"""
+Ricarica incrementale del keystore per i processi di lunga durata
+(servizio di firma, ingest): le camere registrate dopo l'avvio con
+save_private_key diventano utilizzabili senza rileggere tutto il file.
+
+Rilevamento delle modifiche per tipo di keystore:
+- JSON + journal: si leggono solo le righe del journal aggiunte dopo
+  l'ultimo offset; lo snapshot JSON viene riletto solo quando cambia
+  (salvataggio senza journal o compattazione)
+- SQLite: solo le righe con rowid maggiore dell'ultimo letto
+  (put_many assegna un nuovo rowid anche alle camere aggiornate)
+- snapshot .snap: riapertura del file mappato quando viene ricreato
+- manifest .shards.json: un controllo per ciascuno shard del gateway locale
+
+Le camere invariate restano in memoria così come le chiavi già derivate
+nella SignerCache del chiamante.
+"""
+
+import json
+import os
+import threading
+
+from credentials_index import _normalize_camera_id
+from key_journal import journal_path, read_journal_from
+from key_shards import is_sharded_keystore, open_manifest
+from key_snapshot import KeySnapshot, is_snapshot_keystore
+from keystore import is_sqlite_keystore, open_keystore
+from sign_photo import _credentials_from_entry
+
+# ⚙️ Configurazione
+CONFIG = {
+    "POLL_INTERVAL": 0.5  # secondi tra due controlli nel thread in background
+}
+
+
+def _stat_key(path):
+    """(mtime_ns, size, inode) del file oppure None se non esiste"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+class KeystoreWatcher:
+    """
+    Credenziali del keystore in memoria, aggiornate in modo incrementale
+
+    Le credenziali sono indicizzate per camera ID normalizzato (come
+    load_all_credentials) e mantengono le chiavi nel formato salvato
+    (enc:v1 / hd: risolti al primo uso da PhotoSigner).
+    """
+
+    def __init__(self, path, interval=CONFIG["POLL_INTERVAL"]):
+        self.path = path
+        self.interval = interval
+        self.credentials = {}
+        self.reloads = 0
+        self.updates = 0
+
+        self._lock = threading.Lock()
+        self._snapshot_key = None
+        self._journal_offset = 0
+        self._last_rowid = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._shard_files = []
+        self._shards = {}
+
+        if not os.path.exists(path) and not os.path.exists(journal_path(path)):
+            raise FileNotFoundError(path)
+        if is_sharded_keystore(path):
+            # Solo gli shard del gateway locale
+            self._shard_files = open_manifest(path).local_shards()
+        self.refresh()
+
+    def _apply(self, entries):
+        """Applica le entry nuove o modificate; ritorna i camera ID aggiornati"""
+        changed = []
+        for camera_id, entry in entries:
+            key = _normalize_camera_id(camera_id)
+            credentials = _credentials_from_entry(camera_id, entry, decrypt=False)
+            if self.credentials.get(key) != credentials:
+                self.credentials[key] = credentials
+                changed.append(key)
+        return changed
+
+    def _refresh_json(self):
+        snapshot_key = _stat_key(self.path)
+        journal = journal_path(self.path)
+        journal_size = (_stat_key(journal) or (0, 0, 0))[1]
+
+        if snapshot_key == self._snapshot_key and journal_size >= self._journal_offset:
+            # Solo righe nuove nel journal
+            entries, self._journal_offset = read_journal_from(journal, self._journal_offset)
+            return self._apply(entries)
+
+        # Snapshot riscritto o journal compattato: rilettura completa
+        while True:
+            keys = {}
+            if snapshot_key is not None:
+                with open(self.path, 'r') as f:
+                    keys = json.load(f)
+            entries, offset = read_journal_from(journal, 0)
+            # Compattazione avvenuta durante la lettura: si riprova
+            current = _stat_key(self.path)
+            if current == snapshot_key:
+                break
+            snapshot_key = current
+        keys.update(entries)
+
+        removed = set(self.credentials) - {_normalize_camera_id(k) for k in keys}
+        for key in removed:
+            del self.credentials[key]
+
+        self._snapshot_key = snapshot_key
+        self._journal_offset = offset
+        self.reloads += 1
+        return self._apply(keys.items()) + list(removed)
+
+    def _refresh_sqlite(self):
+        entries, self._last_rowid = open_keystore(self.path).items_since(self._last_rowid)
+        return self._apply(entries)
+
+    def _refresh_snapshot(self):
+        snapshot_key = _stat_key(self.path)
+        if snapshot_key == self._snapshot_key:
+            return []
+        with KeySnapshot(self.path) as snapshot:
+            keys = dict(snapshot.items())
+        removed = set(self.credentials) - {_normalize_camera_id(k) for k in keys}
+        for key in removed:
+            del self.credentials[key]
+        self._snapshot_key = snapshot_key
+        self.reloads += 1
+        return self._apply(keys.items()) + list(removed)
+
+    def _refresh_shards(self):
+        changed = []
+        for shard_file in self._shard_files:
+            shard = self._shards.get(shard_file)
+            if shard is None:
+                # Shard ancora vuoto: viene aperto quando compare il file
+                if not os.path.exists(shard_file) and not os.path.exists(journal_path(shard_file)):
+                    continue
+                shard = self._shards[shard_file] = KeystoreWatcher(shard_file, interval=0)
+                self.credentials.update(shard.credentials)
+                changed.extend(shard.credentials)
+                continue
+            for key in shard.refresh():
+                credentials = shard.credentials.get(key)
+                if credentials is None:
+                    self.credentials.pop(key, None)
+                else:
+                    self.credentials[key] = credentials
+                changed.append(key)
+        return changed
+
+    def refresh(self):
+        """
+        Controlla il keystore e applica solo le modifiche
+
+        Returns:
+            list: Camera ID (normalizzati) aggiunti, modificati o rimossi
+        """
+        with self._lock:
+            if is_sharded_keystore(self.path):
+                changed = self._refresh_shards()
+            elif is_sqlite_keystore(self.path):
+                changed = self._refresh_sqlite()
+            elif is_snapshot_keystore(self.path):
+                changed = self._refresh_snapshot()
+            else:
+                changed = self._refresh_json()
+            self.updates += len(changed)
+            return changed
+
+    def get(self, camera_id):
+        """
+        Credenziali della camera; se non presente ricontrolla subito il keystore
+        (una camera appena registrata è disponibile senza attendere il polling)
+        """
+        key = _normalize_camera_id(camera_id)
+        credentials = self.credentials.get(key)
+        if credentials is None and self.refresh():
+            credentials = self.credentials.get(key)
+        return credentials
+
+    def __len__(self):
+        return len(self.credentials)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.refresh()
+            except (OSError, ValueError) as e:
+                # File in riscrittura o temporaneamente non leggibile: riprova al giro successivo
+                print(f"⚠️  Ricarica keystore non riuscita: {e}")
+
+    def start(self):
+        """Avvia il controllo periodico in background"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        return {
+            'cameras': len(self.credentials),
+            'reloads': self.reloads,
+            'updates': self.updates
+        }
@@ -0,0 +1,139 @@
+"""
+Finestra di record pre-firmati con nonce contigui
+Il contratto verifica la firma con nonces[msg.sender]: invece di leggere
+getNonce prima di ogni foto, si parte da un nonce noto N e si firmano le
+foto in coda con N, N+1, N+2, ... per inviarle tutte in sequenza.
+Se un invio fallisce a metà, i record non ancora inviati vengono
+ri-firmati automaticamente a partire dal nonce corretto.
+"""
+
+from collections import deque
+
+from sign_photo import sign_photo
+from signing_core import PhotoSigner, signer_cache
+
+
+def presign_window(private_key, pending, start_nonce, camera_id=None):
+    """
+    Firma una coda di foto con nonce contigui a partire da start_nonce
+
+    Args:
+        private_key: Chiave privata della telecamera (o PhotoSigner)
+        pending: Iterabile di tuple (photo_hash, location, metadata)
+        start_nonce: Nonce del relay per la prima foto
+        camera_id: ID camera (riusa la chiave derivata da signer_cache)
+
+    Returns:
+        list: Record firmati, nonce start_nonce, start_nonce + 1, ...
+    """
+    return [
+        sign_photo(private_key, photo_hash, location, metadata, start_nonce + idx, camera_id=camera_id)
+        for idx, (photo_hash, location, metadata) in enumerate(pending)
+    ]
+
+
+class NonceWindow:
+    """
+    Coda di foto pre-firmate con nonce contigui, inviabili in un'unica raffica
+
+    Esempio:
+        client = firefly_client.get_client()
+        window = NonceWindow(private_key, start_nonce=client.get_nonce(relay))
+        window.add(photo_hash, location, metadata)
+        result = window.flush(submit, get_nonce=lambda: client.get_nonce(relay))
+    """
+
+    def __init__(self, private_key, start_nonce, camera_id=None):
+        if isinstance(private_key, PhotoSigner):
+            self._signer = private_key
+        elif camera_id is not None:
+            self._signer = signer_cache.get(camera_id, private_key)
+        else:
+            self._signer = PhotoSigner(private_key)
+        self.camera_id = camera_id
+        self.start_nonce = start_nonce
+        self._records = deque()
+
+    @property
+    def next_nonce(self):
+        """Nonce che verrà assegnato alla prossima foto aggiunta"""
+        return self.start_nonce + len(self._records)
+
+    def __len__(self):
+        return len(self._records)
+
+    def records(self):
+        """Record firmati in attesa di invio, in ordine di nonce"""
+        return list(self._records)
+
+    def _sign(self, photo_hash, location, metadata, nonce):
+        record = sign_photo(self._signer, photo_hash, location, metadata, nonce)
+        if self.camera_id is not None:
+            record['camera_id'] = self.camera_id
+        return record
+
+    def add(self, photo_hash, location, metadata):
+        """Firma subito la foto con il prossimo nonce della finestra e la accoda"""
+        record = self._sign(photo_hash, location, metadata, self.next_nonce)
+        self._records.append(record)
+        return record
+
+    def extend(self, pending):
+        """Accoda più foto (tuple photo_hash, location, metadata)"""
+        return [self.add(*item) for item in pending]
+
+    def _resigned(self, records, start_nonce):
+        """Nuove firme dei record con nonce contigui a partire da start_nonce"""
+        return deque(
+            self._sign(r['photo_hash'], r['location'], r['metadata'], start_nonce + idx)
+            for idx, r in enumerate(records)
+        )
+
+    def resign(self, start_nonce):
+        """Ri-firma tutti i record in attesa a partire da start_nonce"""
+        self._records = self._resigned(self._records, start_nonce)
+        self.start_nonce = start_nonce
+
+    def flush(self, submit, get_nonce=None):
+        """
+        Invia i record della finestra in ordine
+
+        Args:
+            submit: Callable(record) che invia il record a recordPhotoWithSignature;
+                    deve sollevare un'eccezione (o ritornare False) in caso di errore
+            get_nonce: Callable() che legge il nonce attuale del relay dopo un errore.
+                       Se assente si assume che il record fallito non abbia consumato il nonce.
+
+        Returns:
+            dict: {'submitted': [...], 'failed': record o None, 'error': eccezione o None}
+                  Il record fallito viene tolto dalla finestra; i successivi restano
+                  in coda già ri-firmati con il nonce corretto.
+
+        Raises:
+            Exception: Errore di get_nonce o della nuova firma; la finestra resta
+                       invariata, con il record fallito ancora in testa
+        """
+        submitted = []
+
+        while self._records:
+            record = self._records[0]
+            try:
+                ok = submit(record)
+                error = None if ok is not False else RuntimeError("Invio rifiutato")
+            except Exception as e:
+                error = e
+
+            if error is None:
+                self._records.popleft()
+                submitted.append(record)
+                self.start_nonce = record['nonce'] + 1
+                continue
+
+            # I successivi erano firmati con nonce ormai non più validi e vanno
+            # ri-firmati; il record fallito esce dalla finestra solo dopo
+            new_nonce = get_nonce() if get_nonce is not None else record['nonce']
+            self._records = self._resigned(list(self._records)[1:], new_nonce)
+            self.start_nonce = new_nonce
+            return {'submitted': submitted, 'failed': record, 'error': error}
+
+        return {'submitted': submitted, 'failed': None, 'error': None}
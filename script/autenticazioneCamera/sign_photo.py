@@ -6,19 +6,176 @@ Supporta formato JSON multi-camera
 """
 
 import json
+import os
 import sys
-from eth_account import Account
-from eth_account.messages import encode_defunct
-from web3 import Web3
+import glob
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import hashlib
+import mmap
+import sqlite3
+import credentials_index
+from credentials_index import _normalize_camera_id
+from key_journal import journal_path, read_keystore
+from key_crypto import is_key_reference, resolve_private_key
+from key_shards import is_sharded_keystore, open_manifest
+from key_snapshot import KeySnapshot, is_snapshot_keystore, open_snapshot
+from keystore import is_sqlite_keystore, open_keystore
+from signing_core import PhotoSigner, signer_cache
+
+# Dimensione di default dei blocchi letti per calcolare l'hash della foto
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def _credentials_from_entry(key, data, decrypt=True):
+    """
+    Costruisce il dict credenziali da una entry del file JSON
+
+    Le chiavi cifrate "enc:v1:" e i riferimenti HD "hd:<indice>" sono risolti
+    (con cache) se decrypt=True, altrimenti restano tali e vengono risolti al
+    primo uso da PhotoSigner.
+    """
+    private_key = data['privateKey']
+    if is_key_reference(private_key) and decrypt:
+        private_key = resolve_private_key(private_key)
+    if not is_key_reference(private_key) and not private_key.startswith('0x'):
+        private_key = '0x' + private_key
+
+    return {
+        'camera_id':  key,
+        'address':  data['address'],
+        'private_key': private_key,
+        'mnemonic': data. get('mnemonic', ''),
+        'created_at':  data.get('createdAt', '')
+    }
+
+
+def _read_keystore(json_file):
+    """Legge tutte le entry del keystore (file JSON + journal, database SQLite o snapshot .snap)"""
+    if is_sharded_keystore(json_file):
+        # Solo gli shard del gateway locale
+        cameras = {}
+        for shard_file in open_manifest(json_file).local_shards():
+            if os.path.exists(shard_file) or os.path.exists(journal_path(shard_file)):
+                cameras.update(_read_keystore(shard_file))
+        return cameras
+    if is_sqlite_keystore(json_file):
+        if not os.path.exists(json_file):
+            raise FileNotFoundError(json_file)
+        return dict(open_keystore(json_file).items())
+    if is_snapshot_keystore(json_file):
+        with KeySnapshot(json_file) as snapshot:
+            return dict(snapshot.items())
+
+    return read_keystore(json_file)
+
+
+def load_all_credentials(json_file):
+    """
+    Carica tutte le camere del file JSON in una sola lettura
+
+    Le chiavi cifrate restano nel formato "enc:v1:" e vengono decifrate
+    una sola volta, quando la camera firma per la prima volta.
+
+    Args:
+        json_file: Path al file JSON (o keystore SQLite .db)
+
+    Returns:
+        dict: Credenziali indicizzate per camera ID normalizzato (senza 0x, minuscolo)
+    """
+    cameras = _read_keystore(json_file)
+
+    return {
+        _normalize_camera_id(key): _credentials_from_entry(key, data, decrypt=False)
+        for key, data in cameras.items()
+    }
+
+
+def _scan_credentials(json_file, camera_id=None, address=None):
+    """
+    Ricerca lineare nel file JSON (usata se l'indice non è disponibile)
+
+    Returns:
+        tuple: (chiave originale, entry JSON) oppure None se non trovata
+    """
+    cameras = _read_keystore(json_file)
+
+    if not camera_id and not address:
+        return next(iter(cameras.items()), None)
+
+    # Cerca per camera_id
+    if camera_id:
+        # Rimuovi 0x se presente
+        camera_id_clean = _normalize_camera_id(camera_id)
+
+        for key, data in cameras.items():
+            if _normalize_camera_id(key) == camera_id_clean:
+                return key, data
+        return None
+
+    # Cerca per address
+    for key, data in cameras.items():
+        if data['address']. lower() == address.lower():
+            return key, data
+    return None
+
+
+def _find_credentials(json_file, camera_id=None, address=None):
+    """
+    Cerca una camera nel keystore usando l'indice più adatto
+
+    Returns:
+        tuple: (chiave originale, entry JSON) oppure None se non trovata
+    """
+    if is_sharded_keystore(json_file):
+        manifest = open_manifest(json_file)
+        if camera_id:
+            shard_files = [manifest.route(camera_id)]
+        else:
+            shard_files = manifest.local_shards()
+        for shard_file in shard_files:
+            if not os.path.exists(shard_file) and not os.path.exists(journal_path(shard_file)):
+                continue  # Shard ancora vuoto
+            found = _find_credentials(shard_file, camera_id=camera_id, address=address)
+            if found is not None:
+                return found
+        return None
+
+    if is_sqlite_keystore(json_file) or is_snapshot_keystore(json_file):
+        if not os.path.exists(json_file):
+            raise FileNotFoundError(json_file)
+        if is_snapshot_keystore(json_file):
+            # Snapshot condiviso del processo: le ricerche non rimappano il file
+            keystore = open_snapshot(json_file)
+        else:
+            keystore = open_keystore(json_file)
+        if camera_id:
+            return keystore.get(camera_id)
+        if address:
+            return keystore.get_by_address(address)
+        return keystore.first()
+
+    try:
+        return credentials_index.lookup(json_file, camera_id=camera_id, address=address)
+    except (sqlite3.Error, PermissionError):
+        # Indice non scrivibile o corrotto: ricerca lineare sul JSON
+        return _scan_credentials(json_file, camera_id=camera_id, address=address)
 
 
 def load_credentials(json_file, camera_id=None, address=None):
     """
     Carica private key dal file JSON multi-camera
 
+    La ricerca usa l'indice persistente accanto al file (credentials_index),
+    ricostruito solo quando il file JSON cambia. Se il path è un keystore
+    SQLite (.db) la ricerca avviene direttamente sul database, se è uno
+    snapshot binario (.snap) con ricerca binaria sul file mappato. Con un
+    manifest di shard (.shards.json) la ricerca va allo shard del camera_id.
+
     Args:
-        json_file: Path al file JSON
+        json_file: Path al file JSON (o keystore SQLite .db, snapshot .snap,
+            manifest .shards.json)
         camera_id: ID della camera (hash, con o senza 0x)
         address: Address della camera (alternativo a camera_id)
 
@@ -26,47 +183,20 @@ def load_credentials(json_file, camera_id=None, address=None):
         dict: Credenziali della camera selezionata
     """
     try:
-        with open(json_file, 'r') as f:
-            cameras = json.load(f)
+        found = _find_credentials(json_file, camera_id=camera_id, address=address)
 
-        if not cameras:
+        if found is None:
+            if camera_id:
+                raise ValueError(f"Camera ID {camera_id} non trovato")
+            if address:
+                raise ValueError(f"Address {address} non trovato")
             raise ValueError("File JSON vuoto")
 
         # Se non specificato, usa la prima camera
         if not camera_id and not address:
-            camera_id = list(cameras.keys())[0]
-            print(f"⚠️  Nessuna camera specificata, uso la prima: {camera_id[: 16]}...")
+            print(f"⚠️  Nessuna camera specificata, uso la prima: {found[0][: 16]}...")
 
-        # Cerca per camera_id
-        if camera_id:
-            # Rimuovi 0x se presente
-            camera_id_clean = camera_id.replace('0x', '').lower()
-
-            for key, data in cameras.items():
-                if key.replace('0x', '').lower() == camera_id_clean:
-                    return {
-                        'camera_id':  key,
-                        'address':  data['address'],
-                        'private_key': '0x' + data['privateKey'] if not data['privateKey'].startswith('0x') else data['privateKey'],
-                        'mnemonic': data. get('mnemonic', ''),
-                        'created_at':  data.get('createdAt', '')
-                    }
-
-            raise ValueError(f"Camera ID {camera_id} non trovato")
-
-        # Cerca per address
-        if address:
-            for key, data in cameras.items():
-                if data['address']. lower() == address.lower():
-                    return {
-                        'camera_id': key,
-                        'address': data['address'],
-                        'private_key':  '0x' + data['privateKey'] if not data['privateKey'].startswith('0x') else data['privateKey'],
-                        'mnemonic': data.get('mnemonic', ''),
-                        'created_at': data.get('createdAt', '')
-                    }
-
-            raise ValueError(f"Address {address} non trovato")
+        return _credentials_from_entry(*found)
 
     except FileNotFoundError:
         print(f"❌ File {json_file} non trovato")
@@ -78,8 +208,7 @@ def load_credentials(json_file, camera_id=None, address=None):
 def list_cameras(json_file):
     """Mostra tutte le camere disponibili nel file JSON"""
     try:
-        with open(json_file, 'r') as f:
-            cameras = json.load(f)
+        cameras = _read_keystore(json_file)
 
         print("\n📹 CAMERE DISPONIBILI:")
         print("=" * 80)
@@ -94,66 +223,280 @@ def list_cameras(json_file):
     except Exception as e:
         print(f"❌ Errore nella lettura delle camere: {e}")
 
-def sign_photo(private_key, photo_hash, location, metadata, nonce):
+def sign_photo(private_key, photo_hash, location, metadata, nonce, camera_id=None):
     """
     Firma i dati della foto localmente (NO RPC)
 
     Args:
-        private_key:  Chiave privata della telecamera
+        private_key:  Chiave privata della telecamera (o PhotoSigner già derivato)
         photo_hash: Hash della foto (bytes32)
         location: Posizione
         metadata: Metadati
         nonce: Nonce corrente della telecamera
+        camera_id: Se indicato, la chiave derivata viene riusata da signer_cache
 
     Returns:
         dict: Dati firmati pronti per recordPhotoWithSignature
     """
 
-    # Crea account dalla private key
-    account = Account.from_key(private_key)
+    # Deriva la chiave di firma (in modalità batch arriva già derivata)
+    if isinstance(private_key, PhotoSigner):
+        signer = private_key
+    elif camera_id is not None:
+        signer = signer_cache.get(camera_id, private_key)
+    else:
+        signer = PhotoSigner(private_key)
 
-    # Converti photo_hash in bytes32 se è stringa
-    if isinstance(photo_hash, str):
-        if not photo_hash.startswith('0x'):
-            photo_hash = '0x' + photo_hash
-
-    # Crea il messaggio da firmare (stesso formato del contratto)
+    # Messaggio firmato (stesso formato del contratto, prefix Ethereum Signed Message):
     # keccak256(abi.encodePacked(photoHash, location, metadata, nonce))
-    message_hash = Web3.solidity_keccak(
-        ['bytes32', 'string', 'string', 'uint256'],
-        [photo_hash, location, metadata, nonce]
-    )
+    return signer.sign(photo_hash, location, metadata, nonce)
 
-    # Firma il messaggio (aggiunge automaticamente il prefix Ethereum Signed Message)
-    message = encode_defunct(hexstr=message_hash. hex())
-    signed_message = account.sign_message(message)
+def hash_photo_file(photo_file, block_size=HASH_BLOCK_SIZE, use_mmap=False):
+    """
+    Calcola lo SHA-256 della foto nel formato usato on-chain ("0x" + hex)
+
+    Il file è letto a blocchi di block_size byte in un buffer riusato,
+    quindi la memoria resta costante anche per foto molto grandi.
+    Il digest è identico a sha256.Sum256 del receiver Go sull'intero file.
+
+    Args:
+        photo_file: Path del file foto
+        block_size: Dimensione del blocco di lettura in byte
+        use_mmap: Se True mappa il file a finestre di block_size byte invece di leggerlo
+
+    Returns:
+        str: Hash della foto con prefisso 0x
+    """
+    if block_size <= 0:
+        raise ValueError("block_size deve essere positivo")
+
+    digest = hashlib.sha256()
+
+    with open(photo_file, 'rb', buffering=0) as f:
+        file_size = os.fstat(f.fileno()).st_size
+
+        if use_mmap and file_size > 0:
+            # Le finestre devono partire da un offset allineato alla granularità di mmap
+            window = max(block_size - block_size % mmap.ALLOCATIONGRANULARITY, mmap.ALLOCATIONGRANULARITY)
+            for offset in range(0, file_size, window):
+                length = min(window, file_size - offset)
+                with mmap.mmap(f.fileno(), length, offset=offset, access=mmap.ACCESS_READ) as mapped:
+                    digest.update(mapped)
+        else:
+            buffer = bytearray(block_size)
+            view = memoryview(buffer)
+            while True:
+                n = f.readinto(buffer)
+                if not n:
+                    break
+                digest.update(view[:n])
+
+    return "0x" + digest.hexdigest()
+
+
+def iter_batch_items(source, location, metadata):
+    """
+    Elenca le foto da firmare in modalità batch
+
+    Args:
+        source: Directory, pattern glob (es. "foto/*.jpg") o manifest JSONL
+                (una riga per foto: {"photo": ..., "location": ..., "metadata": ...})
+        location: Posizione di default (se assente nel manifest)
+        metadata: Metadati di default (se assenti nel manifest)
+
+    Yields:
+        dict: {'photo', 'location', 'metadata'} per ogni foto, in ordine stabile
+    """
+    if source.endswith('.jsonl') and os.path.isfile(source):
+        base_dir = os.path.dirname(os.path.abspath(source))
+        with open(source, 'r') as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    raise ValueError(f"Riga {line_no} del manifest non valida")
+                if 'photo' not in entry:
+                    raise ValueError(f"Riga {line_no} del manifest: campo 'photo' mancante")
+                yield {
+                    'photo': os.path.join(base_dir, entry['photo']),
+                    'location': entry.get('location', location),
+                    'metadata': entry.get('metadata', metadata)
+                }
+        return
+
+    if os.path.isdir(source):
+        paths = [
+            os.path.join(source, name) for name in os.listdir(source)
+            if not name.startswith('.') and os.path.isfile(os.path.join(source, name))
+        ]
+    else:
+        paths = [p for p in glob.glob(source) if os.path.isfile(p)]
+
+    for path in sorted(paths):
+        yield {'photo': path, 'location': location, 'metadata': metadata}
+
+
+# Chiave di firma derivata una sola volta per ogni processo del pool
+_worker_signer = None
+
+
+def _init_signing_worker(private_key):
+    """Inizializza un processo del pool derivando la chiave una sola volta"""
+    global _worker_signer
+    _worker_signer = PhotoSigner(private_key)
+
+
+def _sign_chunk(chunk):
+    """Firma un blocco di (nonce, photo_hash, location, metadata) nel processo worker"""
+    return [
+        sign_photo(_worker_signer, photo_hash, location, metadata, nonce)
+        for nonce, photo_hash, location, metadata in chunk
+    ]
+
+
+def sign_items_parallel(private_key, items, start_nonce, workers=None, chunk_size=64):
+    """
+    Firma una coda di foto distribuendo il lavoro su più core
+
+    I nonce sono assegnati nel processo principale, in ordine di arrivo
+    (start_nonce, start_nonce + 1, ...), prima di inviare i blocchi ai worker.
+    I risultati vengono restituiti nello stesso ordine, quindi possono essere
+    inviati a recordPhotoWithSignature in sequenza.
+
+    Args:
+        private_key: Chiave privata della telecamera
+        items: Iterabile di tuple (photo_hash, location, metadata)
+        start_nonce: Nonce del relay per il primo elemento
+        workers: Numero di processi (default: tutti i core)
+        chunk_size: Elementi per blocco inviato a un worker
+
+    Yields:
+        dict: Dati firmati (come sign_photo), in ordine di nonce
+    """
+    workers = workers or os.cpu_count() or 1
+    pending = deque()
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_signing_worker,
+        initargs=(private_key,)
+    ) as pool:
+        chunk = []
+        nonce = start_nonce
+
+        for photo_hash, location, metadata in items:
+            chunk.append((nonce, photo_hash, location, metadata))
+            nonce += 1
+
+            if len(chunk) == chunk_size:
+                pending.append(pool.submit(_sign_chunk, chunk))
+                chunk = []
+
+                # Limita i blocchi in volo per non caricare tutta la coda in memoria
+                while len(pending) >= workers * 2:
+                    yield from pending.popleft().result()
+
+        if chunk:
+            pending.append(pool.submit(_sign_chunk, chunk))
+
+        while pending:
+            yield from pending.popleft().result()
+
+
+def sign_batch(credentials, items, start_nonce, output_file, workers=1,
+               block_size=HASH_BLOCK_SIZE, use_mmap=False):
+    """
+    Firma una sequenza di foto con un'unica chiave caricata una sola volta
+
+    I nonce sono assegnati in ordine (start_nonce, start_nonce + 1, ...)
+    così i record possono essere inviati a recordPhotoWithSignature in sequenza.
+    Ogni record firmato viene scritto subito come riga JSONL.
+
+    Args:
+        credentials: Credenziali restituite da load_credentials
+        items: Iterabile di dict {'photo', 'location', 'metadata'}
+        start_nonce: Nonce del relay per la prima foto
+        output_file: Path del file JSONL di output
+        workers: Processi di firma (1 = nel processo corrente, 0/None = tutti i core)
+        block_size: Dimensione dei blocchi di lettura per l'hash delle foto
+        use_mmap: Calcola l'hash mappando le foto in memoria
+
+    Returns:
+        tuple: (foto firmate, secondi impiegati)
+    """
+    count = 0
+    start = time.perf_counter()
+
+    if workers == 1:
+        # Deriva la chiave una sola volta per tutto il batch
+        signer = signer_cache.get(credentials['camera_id'], credentials['private_key'])
+        signed_items = (
+            (item, sign_photo(
+                private_key=signer,
+                photo_hash=hash_photo_file(item['photo'], block_size, use_mmap),
+                location=item['location'],
+                metadata=item['metadata'],
+                nonce=start_nonce + idx
+            ))
+            for idx, item in enumerate(items)
+        )
+    else:
+        # Gli item vengono accodati mentre si generano i task: il pool
+        # restituisce le firme nello stesso ordine
+        queued = deque()
+
+        def tasks():
+            for item in items:
+                queued.append(item)
+                yield hash_photo_file(item['photo'], block_size, use_mmap), item['location'], item['metadata']
+
+        signed_items = (
+            (queued.popleft(), signed_data)
+            for signed_data in sign_items_parallel(
+                credentials['private_key'], tasks(), start_nonce, workers
+            )
+        )
+
+    with open(output_file, 'w') as out:
+        for item, signed_data in signed_items:
+            record = {
+                **signed_data,
+                'camera_id': credentials['camera_id'],
+                'photo_file': item['photo']
+            }
+            out.write(json.dumps(record) + "\n")
+            count += 1
+
+    return count, time.perf_counter() - start
 
-    return {
-        'photo_hash': photo_hash,
-        'location': location,
-        'metadata': metadata,
-        'nonce': nonce,
-        'signature': signed_message.signature. hex(),
-        'camera_address': account.address,
-        'r': hex(signed_message.r),
-        's': hex(signed_message.s),
-        'v': signed_message.v
-    }
 
 import argparse
 
 def main():
     # ===== PARSING ARGOMENTI =====
     parser = argparse.ArgumentParser(description='Firma foto per SecurityCamera V3')
-    parser.add_argument('--photo', '-p', required=True, help='Path file foto (es. a.png)')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--photo', '-p', help='Path file foto (es. a.png)')
+    source.add_argument('--batch', '-b', help='Directory, glob (es. "foto/*.jpg") o manifest JSONL da firmare in blocco')
     parser.add_argument('--camera-id', '-c', required=True, help='ID della camera (hash con o senza 0x)')
     parser.add_argument('--location', '-l', default='Building A - Entrance', help='Posizione della camera')
     parser.add_argument('--metadata', '-m', default='Motion detected', help='Metadati della foto')
     parser.add_argument('--nonce', '-n', type=int, default=0, help='Nonce corrente della camera')
     parser.add_argument('--credentials', default='./camera_keys.json', help='File JSON con le credenziali')
+    parser.add_argument('--list', action='store_true', help='Mostra tutte le camere del file credenziali')
+    parser.add_argument('--output', '-o', default='signed_photos.jsonl', help='File JSONL di output (solo modalità batch)')
+    parser.add_argument('--block-size', type=int, default=HASH_BLOCK_SIZE, help='Byte letti per blocco nel calcolo dello SHA-256')
+    parser.add_argument('--mmap', action='store_true', help='Calcola lo SHA-256 mappando la foto in memoria')
+    parser.add_argument('--workers', '-w', type=int, default=1, help='Processi di firma in modalità batch (0 = tutti i core)')
 
     args = parser.parse_args()
 
+    if args.batch:
+        return main_batch(args)
+
     # ===== CONFIGURAZIONE =====
     CREDENTIALS_FILE = args.credentials
     CAMERA_ID = args.camera_id
@@ -167,17 +510,16 @@ def main():
 
     # Leggi e calcola hash della foto
     try:
-        with open(photo_file, 'rb') as f:
-            photo_data = f.read()
-            photo_hash = "0x" + hashlib.sha256(photo_data).hexdigest()
+        photo_hash = hash_photo_file(photo_file, args.block_size, use_mmap=args.mmap)
         print(f"📸 File foto: {photo_file}")
         print(f"📊 Hash foto: {photo_hash}\n")
     except FileNotFoundError:
         print(f"❌ File foto non trovato: {photo_file}")
         sys.exit(1)
 
-    # Mostra camere disponibili
-    list_cameras(CREDENTIALS_FILE)
+    # Mostra camere disponibili (solo se richiesto: con molte camere è costoso)
+    if args.list:
+        list_cameras(CREDENTIALS_FILE)
 
     # Carica credenziali della camera selezionata
     print(f"\n📂 Caricamento credenziali...")
@@ -250,5 +592,43 @@ def main():
     print(f"    '{signed_data['signature']}'")
     print(").transact({'from': relay_address})")
 
+
+def main_batch(args):
+    """Modalità batch: firma tutte le foto di una directory/glob/manifest"""
+    print("🔐 SecurityCamera V3 - Firma Foto Batch")
+    print("=" * 80)
+
+    # Carica la chiave una sola volta per tutto il batch
+    credentials = load_credentials(args.credentials, camera_id=args.camera_id)
+    print(f"✅ Camera: {credentials['camera_id']} ({credentials['address']})")
+    print(f"📂 Sorgente: {args.batch}")
+    print(f"ℹ️  Nonce iniziale: {args.nonce}\n")
+
+    items = iter_batch_items(args.batch, args.location, args.metadata)
+
+    try:
+        count, elapsed = sign_batch(
+            credentials, items, args.nonce, args.output,
+            workers=args.workers,
+            block_size=args.block_size,
+            use_mmap=args.mmap
+        )
+    except FileNotFoundError as e:
+        print(f"❌ File foto non trovato: {e.filename}")
+        sys.exit(1)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    if count == 0:
+        print("⚠️  Nessuna foto trovata")
+        return
+
+    rate = count / elapsed if elapsed > 0 else float('inf')
+    print(f"✅ Firmate {count} foto in {elapsed:.2f}s ({rate:.1f} foto/s)")
+    print(f"   Nonce usati: {args.nonce} → {args.nonce + count - 1}")
+    print(f"💾 Record salvati in: {args.output}")
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
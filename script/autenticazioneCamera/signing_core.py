@@ -0,0 +1,219 @@
+"""
+Core di firma foto per SecurityCamera V3 senza web3
+Replica recoverSigner del contratto usando solo eth_hash + eth_keys:
+keccak256(abi.encodePacked(bytes32, string, string, uint256))
+con prefisso "\\x19Ethereum Signed Message:\\n32" (EIP-191)
+"""
+
+import threading
+from collections import OrderedDict
+
+from eth_hash.auto import keccak
+from eth_keys import keys
+from eth_keys.exceptions import BadSignature, ValidationError
+
+# Risultato di ecrecover per firme non recuperabili (come address(0) in Solidity)
+ZERO_ADDRESS = "0x" + "00" * 20
+
+# Prefisso EIP-191 per un messaggio da 32 byte (come nel contratto)
+ETH_SIGNED_MESSAGE_PREFIX = b"\x19Ethereum Signed Message:\n32"
+
+
+def _hex_to_bytes(value):
+    """Converte una stringa hex (con o senza 0x) in bytes"""
+    if value.startswith(('0x', '0X')):
+        value = value[2:]
+    return bytes.fromhex(value)
+
+
+def pack_photo_message(photo_hash, location, metadata, nonce):
+    """
+    Ricrea abi.encodePacked(photoHash, location, metadata, nonce) come Solidity
+
+    Args:
+        photo_hash: Hash della foto (bytes32, hex con o senza 0x oppure bytes)
+        location: Posizione
+        metadata: Metadati
+        nonce: Nonce del relay (uint256)
+
+    Returns:
+        bytes: Messaggio impacchettato
+    """
+    hash_bytes = _hex_to_bytes(photo_hash) if isinstance(photo_hash, str) else bytes(photo_hash)
+    if len(hash_bytes) != 32:
+        raise ValueError(f"Photo hash deve essere di 32 byte, trovati {len(hash_bytes)}")
+    if nonce < 0 or nonce >= 2 ** 256:
+        raise ValueError(f"Nonce fuori range uint256: {nonce}")
+
+    return (
+        hash_bytes
+        + location.encode('utf-8')
+        + metadata.encode('utf-8')
+        + nonce.to_bytes(32, 'big')
+    )
+
+
+def photo_message_hash(photo_hash, location, metadata, nonce):
+    """keccak256(abi.encodePacked(photoHash, location, metadata, nonce))"""
+    return keccak(pack_photo_message(photo_hash, location, metadata, nonce))
+
+
+def eth_signed_message_hash(message_hash):
+    """keccak256("\\x19Ethereum Signed Message:\\n32" + messageHash)"""
+    return keccak(ETH_SIGNED_MESSAGE_PREFIX + message_hash)
+
+
+def recover_address(eth_signed_hash, signature):
+    """
+    Replica recoverAddress del contratto (ecrecover)
+
+    Args:
+        eth_signed_hash: Hash con prefisso EIP-191 (32 byte)
+        signature: Firma r|s|v (65 byte, bytes o hex)
+
+    Returns:
+        str: Address checksum del firmatario, ZERO_ADDRESS se ecrecover fallisce
+
+    Raises:
+        ValueError: Lunghezza firma o valore v non validi (require del contratto)
+    """
+    if isinstance(signature, str):
+        signature = _hex_to_bytes(signature)
+    if len(signature) != 65:
+        raise ValueError("Lunghezza firma non valida")
+
+    r = int.from_bytes(signature[0:32], 'big')
+    s = int.from_bytes(signature[32:64], 'big')
+    v = signature[64]
+
+    # Aggiusta v se necessario
+    if v < 27:
+        v += 27
+    if v not in (27, 28):
+        raise ValueError("Valore v non valido")
+
+    try:
+        public_key = keys.Signature(vrs=(v - 27, r, s)).recover_public_key_from_msg_hash(eth_signed_hash)
+    except (BadSignature, ValidationError):
+        return ZERO_ADDRESS
+    return public_key.to_checksum_address()
+
+
+def recover_signer(photo_hash, location, metadata, nonce, signature):
+    """Replica recoverSigner del contratto: ritorna l'address che ha firmato la foto"""
+    message_hash = photo_message_hash(photo_hash, location, metadata, nonce)
+    return recover_address(eth_signed_message_hash(message_hash), signature)
+
+
+class PhotoSigner:
+    """
+    Chiave di firma di una camera, derivata una sola volta
+
+    Mantiene la private key (eth_keys) e l'address checksum associato,
+    così più firme della stessa camera non ripetono la derivazione.
+    Accetta anche chiavi cifrate "enc:v1:" e riferimenti HD "hd:<indice>"
+    (risolti tramite key_crypto).
+    """
+
+    __slots__ = ('private_key', 'address')
+
+    def __init__(self, private_key):
+        if isinstance(private_key, str):
+            if private_key.startswith(('enc:v1:', 'hd:')):
+                # Import locale: AES e derivazione HD servono solo per questi keystore
+                from key_crypto import resolve_private_key
+                private_key = resolve_private_key(private_key)
+            private_key = _hex_to_bytes(private_key.strip())
+        self.private_key = keys.PrivateKey(bytes(private_key))
+        self.address = self.private_key.public_key.to_checksum_address()
+
+    def sign(self, photo_hash, location, metadata, nonce):
+        """
+        Firma i dati della foto
+
+        Returns:
+            dict: Stesso formato di sign_photo.sign_photo
+        """
+        if isinstance(photo_hash, str) and not photo_hash.startswith('0x'):
+            photo_hash = '0x' + photo_hash
+
+        message_hash = photo_message_hash(photo_hash, location, metadata, nonce)
+        signature = self.private_key.sign_msg_hash(eth_signed_message_hash(message_hash))
+
+        # Formato r|s|v con v in {27, 28}, come crypto.Sign + 27 nel receiver Go
+        v = signature.v + 27
+        signature_bytes = signature.r.to_bytes(32, 'big') + signature.s.to_bytes(32, 'big') + bytes([v])
+
+        return {
+            'photo_hash': photo_hash,
+            'location': location,
+            'metadata': metadata,
+            'nonce': nonce,
+            'signature': signature_bytes.hex(),
+            'camera_address': self.address,
+            'r': hex(signature.r),
+            's': hex(signature.s),
+            'v': v
+        }
+
+
+class SignerCache:
+    """
+    Cache LRU limitata dei PhotoSigner derivati, indicizzata per camera
+
+    Evita di ripetere la derivazione chiave pubblica/address a ogni firma.
+    Ogni voce ricorda la private key da cui è stata derivata: se la chiave
+    della camera cambia la voce viene ricalcolata.
+    """
+
+    def __init__(self, maxsize=1024):
+        if maxsize <= 0:
+            raise ValueError("maxsize deve essere positivo")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, camera_id, private_key):
+        """Ritorna il PhotoSigner della camera, derivandolo solo se non in cache"""
+        key = camera_id.replace('0x', '').lower()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == private_key:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        signer = PhotoSigner(private_key)
+
+        with self._lock:
+            self._entries[key] = (private_key, signer)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+        return signer
+
+    def clear(self):
+        """Svuota la cache e azzera i contatori"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Contatori della cache: hit, miss, voci presenti e capacità"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'maxsize': self.maxsize
+            }
+
+
+# Cache condivisa usata da sign_photo quando è indicato il camera_id
+signer_cache = SignerCache()
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Servizio di firma residente per SecurityCamera V3
+Carica camera_keys.json una sola volta, tiene in memoria le chiavi derivate
+e firma su richiesta tramite socket Unix. Le camere registrate dopo l'avvio
+sono caricate in modo incrementale (keystore_watch).
+
+Il protocollo non ha autenticazione: l'accesso è limitato dai permessi 0600
+del socket (solo l'utente del servizio può connettersi). Per questo non c'è
+una modalità TCP, raggiungibile da qualsiasi processo della macchina.
+
+Protocollo: una richiesta JSON per riga, una risposta JSON per riga, nello
+stesso ordine. Il client può inviare più richieste senza attendere le
+risposte (pipelining).
+
+Richiesta:  {"id": 1, "camera_id": "0x...", "photo_hash": "0x...",
+             "location": "...", "metadata": "...", "nonce": 0}
+Risposta:   {"id": 1, "ok": true, "result": {...dati firmati...}}
+            {"id": 1, "ok": false, "error": "..."}
+
+Altre operazioni: {"op": "ping"}, {"op": "stats"} (contatori della cache chiavi)
+e {"op": "wipe"} (cancella dalla memoria le chiavi decifrate e derivate).
+"""
+
+import argparse
+import json
+import os
+import queue
+import socket
+import socketserver
+import sys
+import threading
+
+from keystore_watch import KeystoreWatcher
+from sign_photo import sign_photo
+from key_crypto import decrypted_key_cache
+from signing_core import SignerCache
+
+# ⚙️ Configurazione
+CONFIG = {
+    "CREDENTIALS_FILE": "./camera_keys.json",
+    "SOCKET_PATH": "./signing.sock",
+    "SIGNER_CACHE_SIZE": 4096,
+    "RELOAD_INTERVAL": 0.5  # secondi tra due controlli del keystore (0 = solo su camera sconosciuta)
+}
+
+
+class SigningService:
+    """
+    Stato del servizio: credenziali caricate una volta e chiavi derivate in memoria
+    """
+
+    def __init__(self, credentials_file, cache_size=CONFIG["SIGNER_CACHE_SIZE"],
+                 reload_interval=CONFIG["RELOAD_INTERVAL"]):
+        self.credentials = KeystoreWatcher(credentials_file, interval=reload_interval)
+        if reload_interval:
+            self.credentials.start()
+        self.signers = SignerCache(cache_size)
+
+    def signer_for(self, camera_id):
+        """Ritorna (credenziali, PhotoSigner) della camera, derivando la chiave solo se non in cache"""
+        credentials = self.credentials.get(camera_id)
+        if credentials is None:
+            raise ValueError(f"Camera ID {camera_id} non trovato")
+        return credentials, self.signers.get(credentials['camera_id'], credentials['private_key'])
+
+    def handle(self, request):
+        """
+        Esegue una richiesta e ritorna la risposta (dict)
+
+        Non solleva eccezioni: ogni errore diventa la risposta {"ok": false}
+        della sola richiesta, le altre in pipelining sulla connessione proseguono.
+        """
+        if not isinstance(request, dict):
+            return {'id': None, 'ok': False, 'error': 'Richiesta non valida: atteso un oggetto JSON'}
+        request_id = request.get('id')
+        op = request.get('op', 'sign')
+
+        try:
+            if op == 'ping':
+                return {'id': request_id, 'ok': True, 'result': {'cameras': len(self.credentials)}}
+
+            if op == 'stats':
+                stats = self.signers.stats()
+                stats['decrypted_keys'] = decrypted_key_cache.stats()
+                stats['keystore'] = self.credentials.stats()
+                return {'id': request_id, 'ok': True, 'result': stats}
+
+            if op == 'wipe':
+                # Le chiavi cifrate verranno decifrate di nuovo al primo uso
+                self.signers.clear()
+                decrypted_key_cache.wipe()
+                hd_wallet = sys.modules.get('hd_wallet')
+                if hd_wallet is not None:
+                    hd_wallet.clear_caches()
+                return {'id': request_id, 'ok': True, 'result': self.signers.stats()}
+
+            if op != 'sign':
+                raise ValueError(f"Operazione non supportata: {op}")
+
+            for field in ('camera_id', 'photo_hash'):
+                if not isinstance(request[field], str):
+                    raise TypeError(f"Campo {field} non valido: attesa una stringa")
+
+            credentials, signer = self.signer_for(request['camera_id'])
+            signed_data = sign_photo(
+                private_key=signer,
+                photo_hash=request['photo_hash'],
+                location=request.get('location', ''),
+                metadata=request.get('metadata', ''),
+                nonce=int(request.get('nonce', 0))
+            )
+            signed_data['camera_id'] = credentials['camera_id']
+            return {'id': request_id, 'ok': True, 'result': signed_data}
+
+        except KeyError as e:
+            return {'id': request_id, 'ok': False, 'error': f"Campo mancante: {e.args[0]}"}
+        except (ValueError, TypeError) as e:
+            return {'id': request_id, 'ok': False, 'error': str(e)}
+        except Exception as e:
+            return {'id': request_id, 'ok': False, 'error': f"Errore interno: {type(e).__name__}: {e}"}
+
+
+class SigningRequestHandler(socketserver.StreamRequestHandler):
+    """Gestisce una connessione: legge richieste riga per riga e risponde in ordine"""
+
+    def handle(self):
+        service = self.server.service
+        for line in self.rfile:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                response = service.handle(json.loads(line))
+            except ValueError:
+                # JSON non valido o non UTF-8
+                response = {'id': None, 'ok': False, 'error': 'JSON non valido'}
+            self.wfile.write(json.dumps(response).encode('utf-8') + b"\n")
+
+
+class UnixSigningServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        # Socket creato già 0600: nessun altro utente può connettersi tra bind e chmod
+        previous_umask = os.umask(0o177)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(previous_umask)
+
+
+class SigningClient:
+    """
+    Client per il servizio di firma (socket Unix)
+    """
+
+    def __init__(self, socket_path=None):
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.connect(socket_path or CONFIG["SOCKET_PATH"])
+        self._reader = self._sock.makefile('rb')
+        self._next_id = 0
+
+    def close(self):
+        self._reader.close()
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _request(self, camera_id, photo_hash, location, metadata, nonce):
+        self._next_id += 1
+        return {
+            'id': self._next_id,
+            'camera_id': camera_id,
+            'photo_hash': photo_hash,
+            'location': location,
+            'metadata': metadata,
+            'nonce': nonce
+        }
+
+    def _read_response(self):
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Connessione chiusa dal servizio di firma")
+        return json.loads(line)
+
+    def sign(self, camera_id, photo_hash, location, metadata, nonce):
+        """Firma una foto e ritorna la risposta del servizio"""
+        request = self._request(camera_id, photo_hash, location, metadata, nonce)
+        self._sock.sendall(json.dumps(request).encode('utf-8') + b"\n")
+        return self._read_response()
+
+    def stats(self):
+        """Contatori hit/miss della cache chiavi del servizio"""
+        self._next_id += 1
+        self._sock.sendall(json.dumps({'id': self._next_id, 'op': 'stats'}).encode('utf-8') + b"\n")
+        return self._read_response()['result']
+
+    def sign_many(self, items):
+        """
+        Firma più foto in pipelining: le richieste sono inviate senza attendere
+        le risposte, che arrivano nello stesso ordine
+
+        Args:
+            items: Iterabile di tuple (camera_id, photo_hash, location, metadata, nonce)
+
+        Yields:
+            dict: Risposte del servizio, in ordine
+        """
+        # Il sender accoda un segnaposto per ogni richiesta inviata, None alla fine
+        sent = queue.Queue()
+
+        def sender():
+            try:
+                for item in items:
+                    request = self._request(*item)
+                    self._sock.sendall(json.dumps(request).encode('utf-8') + b"\n")
+                    sent.put(request['id'])
+            finally:
+                sent.put(None)
+
+        thread = threading.Thread(target=sender, daemon=True)
+        thread.start()
+
+        while sent.get() is not None:
+            yield self._read_response()
+
+        thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servizio di firma residente per SecurityCamera V3')
+    parser.add_argument('--credentials', default=CONFIG["CREDENTIALS_FILE"], help='File JSON con le credenziali')
+    parser.add_argument('--socket', default=CONFIG["SOCKET_PATH"],
+                        help='Path del socket Unix (creato 0600: solo l\'utente del servizio può firmare)')
+    parser.add_argument('--cache-size', type=int, default=CONFIG["SIGNER_CACHE_SIZE"], help='Chiavi derivate tenute in memoria (LRU)')
+    parser.add_argument('--reload-interval', type=float, default=CONFIG["RELOAD_INTERVAL"],
+                        help='Secondi tra due controlli del keystore (0 = solo su camera sconosciuta)')
+    args = parser.parse_args()
+
+    print("🔐 SecurityCamera V3 - Servizio di Firma")
+    print("=" * 80)
+
+    try:
+        service = SigningService(args.credentials, args.cache_size, args.reload_interval)
+    except FileNotFoundError:
+        print(f"❌ File {args.credentials} non trovato")
+        sys.exit(1)
+    except json.JSONDecodeError:
+        print(f"❌ Errore nel parsing del file JSON")
+        sys.exit(1)
+
+    print(f"✅ Camere caricate: {len(service.credentials)}")
+
+    if os.path.exists(args.socket):
+        os.remove(args.socket)
+    server = UnixSigningServer(args.socket, SigningRequestHandler)
+    print(f"📡 In ascolto su {args.socket}")
+
+    server.service = service
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Arresto servizio")
+    finally:
+        server.server_close()
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Fixture comuni dei test degli script di autenticazione camera
+Gli script si importano tra loro per nome (es. "from key_journal import ..."),
+quindi la cartella degli script va nel path di import.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+
+
+@pytest.fixture
+def umask_022():
+    """umask tipica (file 0644 di default) per verificare i permessi dei file con le chiavi"""
+    previous = os.umask(0o022)
+    yield
+    os.umask(previous)
+
+
+@pytest.fixture
+def camera_account():
+    """(camera_id, Account) di una camera con wallet casuale"""
+    from eth_account import Account
+    return "0x" + os.urandom(32).hex(), Account.create()
+
+
+@pytest.fixture
+def keys_file(tmp_path, camera_account):
+    """Keystore JSON con una sola camera"""
+    camera_id, account = camera_account
+    path = tmp_path / "camera_keys.json"
+    path.write_text(json.dumps({
+        camera_id: {
+            "address": account.address,
+            "privateKey": account.key.hex(),
+            "mnemonic": "",
+            "createdAt": ""
+        }
+    }))
+    return str(path)
+
+
+@pytest.fixture
+def make_entry():
+    """Factory di entry di keystore con address e chiave casuali (non derivati)"""
+    def make():
+        return {
+            "address": "0x" + os.urandom(20).hex(),
+            "privateKey": "0x" + os.urandom(32).hex(),
+            "mnemonic": "",
+            "createdAt": ""
+        }
+    return make
+
+
+@pytest.fixture
+def firefly_server():
+    """Stand-in FireFly locale (firefly_local) su una porta libera, in un thread"""
+    import firefly_local
+
+    server = firefly_local.FireFlyLocalServer(("127.0.0.1", 0))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def firefly_url(firefly_server):
+    """URL base della stand-in FireFly"""
+    host, port = firefly_server.server_address
+    return f"http://{host}:{port}"
+
+
+class ScriptedHandler(BaseHTTPRequestHandler):
+    """
+    Risponde con le azioni in coda sul server, una per richiesta:
+    (status, body JSON o bytes grezzi) oppure ("sleep", secondi)
+    """
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.server.requests.append((self.path, json.loads(self.rfile.read(length) or b"null")))
+        with self.server.lock:
+            action = self.server.script.pop(0) if self.server.script else (200, {"output": "ok"})
+        if action[0] == "sleep":
+            time.sleep(action[1])
+            action = (200, {"output": "tardi"})
+        status, body = action
+        data = body if isinstance(body, bytes) else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST
+
+
+@pytest.fixture
+def scripted():
+    """Server HTTP con risposte programmate (server.script) e richieste ricevute (server.requests)"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ScriptedHandler)
+    server.script, server.requests, server.lock = [], [], threading.Lock()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
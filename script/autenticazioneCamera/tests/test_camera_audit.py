@@ -0,0 +1,69 @@
+import asyncio
+import io
+import json
+import subprocess
+import sys
+
+import pytest
+
+import camera_audit
+import firefly_client
+from camera_audit import audit_fleet, fetch_camera_infos
+
+
+def _audit(camera_ids, url, concurrency=4):
+    out = io.StringIO()
+    summary = asyncio.run(audit_fleet(camera_ids, out, concurrency=concurrency, base_url=url, progress_every=0))
+    return summary, [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_audit_against_local_firefly(firefly_server, firefly_url):
+    state = firefly_server.state
+    ids = ["0x" + f"{i:02x}" * 32 for i in range(1, 4)]
+    state.register_camera(state.owner, "", "", "0x" + "11" * 20, "Roma", "X", camera_id=ids[0])
+    state.authorize_camera(state.owner, ids[0])
+    state.register_camera(state.owner, "", "", "0x" + "22" * 20, "Roma", "X", camera_id=ids[1])
+
+    summary, results = _audit(ids, firefly_url)
+
+    assert {k: summary[k] for k in ("total", "registered", "authorized", "notRegistered", "errors")} == \
+        {"total": 3, "registered": 2, "authorized": 1, "notRegistered": 1, "errors": 0}
+    by_id = {r["camera_id"]: r for r in results}
+    assert by_id[ids[0]]["authorized"] is True and by_id[ids[1]]["authorized"] is False
+    assert by_id[ids[2]]["registered"] is False
+    assert summary["latencyMs"]["count"] == 3
+
+
+def test_malformed_responses_are_recorded_as_errors(scripted, monkeypatch):
+    monkeypatch.setitem(firefly_client.CONFIG, "BACKOFF_BASE", 0)
+    scripted.script = [
+        (200, b"{not json"),
+        (200, {"output": [1, 2]}),
+        (200, {"output": {"registeredAt": "abc"}}),
+        (200, {"output": {"registeredAt": [1]}}),
+        (200, {}),
+        (503, {}), (200, {"output": {"registeredAt": "5", "isAuthorized": True}}),
+    ]
+    host, port = scripted.server_address
+    ids = [f"0x{i:064x}" for i in range(6)]
+
+    summary, results = _audit(ids, f"http://{host}:{port}", concurrency=1)
+
+    assert summary["total"] == 6 and summary["errors"] == 5 and summary["authorized"] == 1
+    assert [r["attempts"] for r in results] == [1, 1, 1, 1, 1, 2]
+    assert all(r["error"] for r in results[:5])
+
+
+def test_concurrency_below_one_is_rejected(tmp_path):
+    async def consume():
+        return [r async for r in fetch_camera_infos(["0x00"], concurrency=0, base_url="http://127.0.0.1:9")]
+
+    with pytest.raises(ValueError):
+        asyncio.run(consume())
+
+    ids_file = tmp_path / "ids.txt"
+    ids_file.write_text("0x00\n")
+    result = subprocess.run([sys.executable, camera_audit.__file__, str(ids_file), "--concurrency", "0"],
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 1
+    assert "--concurrency" in result.stderr
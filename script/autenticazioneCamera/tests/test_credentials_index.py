@@ -0,0 +1,105 @@
+import json
+import os
+import sqlite3
+import stat
+
+import credentials_index
+from credentials_index import INDEX_SUFFIX, lookup
+from key_journal import KeyJournal, journal_path
+
+
+def _write_keystore(path, keys):
+    with open(path, "w") as f:
+        json.dump(keys, f, indent=2)
+
+
+def test_index_is_private_and_holds_no_keys(keys_file, camera_account, umask_022):
+    camera_id, account = camera_account
+
+    found_id, entry = lookup(keys_file, camera_id=camera_id.upper().replace("0X", ""))
+    assert found_id == camera_id
+    assert entry["privateKey"] == account.key.hex()
+
+    index_file = keys_file + INDEX_SUFFIX
+    assert stat.S_IMODE(os.stat(index_file).st_mode) == 0o600
+    with open(index_file, "rb") as f:
+        data = f.read()
+    assert account.key.hex()[2:].encode() not in data
+    assert account.key.hex()[2:].upper().encode() not in data
+
+
+def test_lookup_by_address_and_first_camera(tmp_path, make_entry):
+    path = str(tmp_path / "camera_keys.json")
+    keys = {f"0x{i:064x}": make_entry() for i in range(1, 6)}
+    # Valori non ASCII prima delle camere cercate: gli offset restano in byte
+    keys["0x" + "0" * 63 + "2"]["note"] = "Città – ingresso è"
+    with open(path, "w") as f:
+        json.dump(keys, f, indent=2, ensure_ascii=False)
+
+    camera_id, entry = next(iter(keys.items()))
+    assert lookup(path) == (camera_id, entry)
+    for camera_id, entry in keys.items():
+        assert lookup(path, address=entry["address"].upper()) == (camera_id, entry)
+        assert lookup(path, camera_id=camera_id) == (camera_id, entry)
+    assert lookup(path, camera_id="0x" + "f" * 64) is None
+
+
+def test_index_follows_snapshot_and_journal_changes(tmp_path, make_entry):
+    path = str(tmp_path / "camera_keys.json")
+    first, second, third = make_entry(), make_entry(), make_entry()
+    _write_keystore(path, {"0xaa": first})
+    assert lookup(path, camera_id="0xaa")[1] == first
+
+    # Nuova camera e chiave aggiornata nel journal
+    journal = KeyJournal(path, compact_threshold=10 ** 9)
+    journal.append("0xbb", second)
+    journal.append("0xaa", third)
+    journal.flush()
+    assert lookup(path, camera_id="0xbb")[1] == second
+    assert lookup(path, camera_id="0xaa")[1] == third
+    assert lookup(path) == ("0xaa", third)
+
+    # Compattazione: le entry passano dal journal allo snapshot
+    journal.compact()
+    journal.close()
+    assert os.path.getsize(journal_path(path)) == 0
+    assert lookup(path, address=second["address"])[1] == second
+
+    # Snapshot riscritto da un altro strumento
+    _write_keystore(path, {"0xcc": first})
+    assert lookup(path, camera_id="0xaa") is None
+    assert lookup(path, camera_id="cc")[1] == first
+
+
+def test_journal_only_keystore_skips_torn_lines(tmp_path, make_entry):
+    path = str(tmp_path / "camera_keys.json")
+    entry = make_entry()
+    with open(journal_path(path), "w") as f:
+        f.write(json.dumps({"camera_id": "0xaa", "entry": entry}) + "\n")
+        f.write('{"camera_id": "0xbb", "ent')
+
+    assert lookup(path, camera_id="0xaa") == ("0xaa", entry)
+    assert lookup(path, camera_id="0xbb") is None
+
+
+def test_index_with_keys_from_previous_format_is_replaced(keys_file, camera_account):
+    camera_id, account = camera_account
+    index_file = keys_file + INDEX_SUFFIX
+    fingerprint = credentials_index._fingerprint(keys_file)
+
+    # Indice della versione precedente: entry complete, stessa impronta del keystore
+    conn = sqlite3.connect(index_file)
+    conn.executescript("""
+        CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+        CREATE TABLE cameras (position INTEGER PRIMARY KEY, camera_key TEXT, address TEXT,
+                              camera_id TEXT, data TEXT);
+    """)
+    conn.execute("INSERT INTO meta VALUES ('fingerprint', ?)", (fingerprint,))
+    conn.execute("INSERT INTO cameras (camera_key, address, camera_id, data) VALUES (?, ?, ?, ?)",
+                 (camera_id[2:], account.address.lower(), camera_id, json.dumps({"privateKey": account.key.hex()})))
+    conn.commit()
+    conn.close()
+
+    assert lookup(keys_file, camera_id=camera_id)[1]["address"] == account.address
+    with open(index_file, "rb") as f:
+        assert account.key.hex()[2:].encode() not in f.read()
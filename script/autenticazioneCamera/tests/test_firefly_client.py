@@ -0,0 +1,94 @@
+import socket
+import time
+
+import pytest
+import requests
+
+import firefly_client
+from firefly_client import FireFlyClient, FireFlyError
+
+
+@pytest.fixture
+def client(scripted, monkeypatch):
+    monkeypatch.setitem(firefly_client.CONFIG, "BACKOFF_BASE", 0)
+    host, port = scripted.server_address
+    timeouts = dict.fromkeys(firefly_client.CONFIG["TIMEOUTS"], 0.5)
+    with FireFlyClient(f"http://{host}:{port}/", retries=2, timeouts=timeouts) as c:
+        yield c
+
+
+def test_query_retries_transient_errors(scripted, client):
+    scripted.script = [(503, {}), (502, {}), (200, {"output": {"isAuthorized": True}})]
+
+    assert client.get_camera_info("0xaa") == {"isAuthorized": True}
+    assert len(scripted.requests) == 3
+    assert scripted.requests[0] == ("/api/v1/namespaces/default/apis/secCamv3/query/getCameraInfo",
+                                    {"input": {"_cameraId": "0xaa"}})
+    assert client.stats()["retried"] == 2
+
+
+def test_query_gives_up_after_the_retry_budget(scripted, client):
+    scripted.script = [(504, {})] * 3
+    with pytest.raises(FireFlyError) as e:
+        client.query("getNonce", _cameraAddress="0x1")
+    assert e.value.status_code == 504
+    assert len(scripted.requests) == 3
+
+
+def test_query_retries_a_read_timeout(scripted, client):
+    scripted.script = [("sleep", 1.0), (200, {"output": "5"})]
+    assert client.get_nonce("0x1") == 5
+    assert len(scripted.requests) == 2
+
+
+def test_invoke_is_never_retried_after_a_read_timeout(scripted, client):
+    scripted.script = [("sleep", 1.0)]
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        client.record_photo("0x" + "11" * 32, "Roma", "meta")
+    time.sleep(0.7)
+    # La transazione potrebbe essere già partita: una sola richiesta
+    assert len(scripted.requests) == 1
+    assert client.stats()["failures"] == 1
+
+
+def test_invoke_retries_only_requests_firefly_did_not_accept(scripted, client):
+    scripted.script = [(503, {}), (429, {}), (200, {"id": "tx"})]
+    assert client.invoke("recordPhoto", _photoHash="0x00") == {"id": "tx"}
+    assert scripted.requests[0][0].endswith("/invoke/recordPhoto?confirm=true")
+
+    scripted.script, scripted.requests[:] = [(502, {})], []
+    with pytest.raises(FireFlyError):
+        client.invoke("recordPhoto", _photoHash="0x00")
+    assert len(scripted.requests) == 1
+
+
+def test_revert_is_reported_without_retry(scripted, client):
+    scripted.script = [(500, {"error": "FF10111: execution reverted: Telecamera non esistente"})]
+    with pytest.raises(FireFlyError) as e:
+        client.get_camera_info("0xaa")
+    assert e.value.is_revert
+    assert len(scripted.requests) == 1
+
+
+def test_invoke_retries_a_refused_connection(monkeypatch):
+    monkeypatch.setitem(firefly_client.CONFIG, "BACKOFF_BASE", 0)
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    client = FireFlyClient(f"http://127.0.0.1:{port}", retries=2)
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client.invoke("recordPhoto", _photoHash="0x00")
+    assert client.stats()["requests"] == 3
+    client.close()
+
+
+def test_get_client_is_shared_per_api():
+    assert firefly_client.get_client("http://h:1/") is firefly_client.get_client("http://h:1")
+    assert firefly_client.get_client("http://h:1") is not firefly_client.get_client("http://h:2")
+
+
+def test_backoff_delay_is_bounded():
+    for attempt in range(10):
+        assert 0 <= firefly_client.backoff_delay(attempt, 0.25, 5.0) <= min(5.0, 0.25 * 2 ** attempt)
+    assert firefly_client.backoff_delay(3, base=0) == 0
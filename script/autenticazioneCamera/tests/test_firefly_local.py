@@ -0,0 +1,77 @@
+import pytest
+import requests
+
+from signing_core import PhotoSigner
+
+PHOTO_HASH = "0x" + "11" * 32
+
+
+@pytest.fixture
+def api(firefly_url):
+    return f"{firefly_url}/api/v1/namespaces/default/apis/secCamv3"
+
+
+@pytest.fixture
+def camera(firefly_server, camera_account):
+    """Camera registrata e autorizzata nello stato del contratto"""
+    camera_id, account = camera_account
+    state = firefly_server.state
+    state.register_camera(state.owner, "", "", account.address, "Roma", "X", camera_id=camera_id)
+    state.authorize_camera(state.owner, camera_id)
+    return camera_id, account
+
+
+def _record(api, **inputs):
+    return requests.post(f"{api}/invoke/recordPhotoWithSignature?confirm=true", json={"input": inputs}, timeout=10)
+
+
+def test_signed_photo_is_recorded_once(api, camera):
+    _, account = camera
+    signed = PhotoSigner(account.key).sign(PHOTO_HASH, "Roma", "meta", 0)
+    inputs = dict(_photoHash=PHOTO_HASH, _location="Roma", _metadata="meta", _signature=signed["signature"])
+
+    assert _record(api, **inputs).status_code == 200
+    duplicate = _record(api, **inputs)
+    assert duplicate.status_code == 500
+    assert "Foto gia registrata" in duplicate.text
+
+    verified = requests.post(f"{api}/query/verifyPhoto", json={"input": {"_photoHash": PHOTO_HASH}}, timeout=10)
+    assert verified.json()["exists"] is True
+
+
+@pytest.mark.parametrize("inputs", [
+    {"_photoHash": PHOTO_HASH, "_signature": None},
+    {"_photoHash": PHOTO_HASH, "_signature": "zz"},
+    {"_photoHash": PHOTO_HASH, "_location": 5, "_signature": "0x00"},
+    {"_photoHash": PHOTO_HASH, "_metadata": {"a": 1}, "_signature": "0x00"},
+    {"_photoHash": None, "_signature": "0x00"},
+])
+def test_malformed_record_inputs_are_rejected_with_400(firefly_server, api, inputs):
+    response = _record(api, **inputs)
+    assert response.status_code == 400
+    assert firefly_server.state.photo_records == []
+
+
+@pytest.mark.parametrize("body", [[1, 2], "x", {"input": [1]}, {"input": "x"}])
+def test_malformed_bodies_are_rejected_with_400(api, body):
+    response = requests.post(f"{api}/invoke/recordPhotoWithSignature", json=body, timeout=10)
+    assert response.status_code == 400
+
+
+def test_malformed_admin_and_query_inputs(api):
+    assert requests.post(f"{api}/invoke/setPaused", json={"input": {"_paused": "yes"}}, timeout=10).status_code == 400
+    assert requests.post(f"{api}/invoke/setPaused", json={"input": {"_paused": True}, "key": 7},
+                         timeout=10).status_code == 400
+    assert requests.post(f"{api}/query/getCameraInfo", json={"input": {"_cameraId": None}},
+                         timeout=10).status_code == 400
+
+
+def test_unregistered_camera_is_a_revert(api):
+    response = requests.post(f"{api}/query/getCameraInfo", json={"input": {"_cameraId": "0x" + "22" * 32}}, timeout=10)
+    assert response.status_code == 500
+    assert "Telecamera non esistente" in response.text
+
+
+def test_invalid_events_filter(firefly_url):
+    response = requests.get(f"{firefly_url}/api/v1/namespaces/default/events?limit=abc", timeout=10)
+    assert response.status_code == 400
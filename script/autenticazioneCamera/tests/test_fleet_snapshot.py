@@ -0,0 +1,96 @@
+import pytest
+
+import firefly_client
+import fleet_snapshot
+from firefly_client import get_client
+from firefly_local import ContractRevert
+from fleet_snapshot import FleetSnapshot, export_fleet, fleet_stats, refresh_fleet
+
+
+def _camera_id(n):
+    return "0x" + f"{n:02x}" * 32
+
+
+def _register(state, n, location="Roma", authorize=True):
+    camera_id = state.register_camera(state.owner, "", "", "0x" + f"{n:02x}" * 20, location, "X",
+                                      camera_id=_camera_id(n))
+    if authorize:
+        state.authorize_camera(state.owner, camera_id)
+    return camera_id
+
+
+def _rows(path):
+    snapshot = FleetSnapshot(path)
+    try:
+        return snapshot.rows(), fleet_stats(snapshot), snapshot.pending
+    finally:
+        snapshot.close()
+
+
+@pytest.fixture
+def fleet(tmp_path, firefly_server, firefly_url, monkeypatch):
+    monkeypatch.setitem(firefly_client.CONFIG, "RETRIES", 0)
+    state = firefly_server.state
+    ids = [_register(state, 1), _register(state, 2, "Milano"), _register(state, 3, authorize=False)]
+    return state, ids, str(tmp_path / "fleet.fleet"), get_client(base_url=firefly_url)
+
+
+def test_export_writes_all_cameras_and_stats(fleet):
+    state, ids, path, client = fleet
+    unregistered = _camera_id(9)
+
+    summary = export_fleet(path, ids + [unregistered], client=client, concurrency=2)
+
+    rows, stats, pending = _rows(path)
+    assert summary["cameras"] == 4 and summary["errors"] == {} and pending == []
+    assert rows[ids[1]]["walletAddress"] == "0x" + "02" * 20 and rows[ids[1]]["location"] == "Milano"
+    assert rows[unregistered]["registeredAt"] == 0
+    assert {k: stats[k] for k in ("cameras", "registered", "authorized", "photos")} == \
+        {"cameras": 4, "registered": 3, "authorized": 2, "photos": 0}
+    assert stats["topLocationsByCameras"][0] == ("Roma", 2)
+
+
+def test_refresh_rereads_only_changed_cameras(fleet):
+    state, ids, path, client = fleet
+    export_fleet(path, ids, client=client)
+
+    state.revoke_camera(state.owner, ids[0])
+    new_camera = _register(state, 4, "Torino")
+
+    summary = refresh_fleet(path, client=client)
+
+    rows, stats, _ = _rows(path)
+    assert summary["full"] is False and summary["fetched"] == 2
+    assert rows[ids[0]]["isAuthorized"] is False
+    assert rows[new_camera]["location"] == "Torino"
+    assert stats["cameras"] == 4 and stats["authorized"] == 2
+
+    # Nessun evento nuovo: nessuna camera da rileggere
+    assert refresh_fleet(path, client=client)["fetched"] == 0
+
+
+def test_failed_cameras_stay_pending_until_read(fleet, monkeypatch):
+    state, ids, path, client = fleet
+    get_camera_info = state.get_camera_info
+
+    def failing(camera_id):
+        if camera_id == ids[2]:
+            raise ContractRevert("errore simulato")
+        return get_camera_info(camera_id)
+
+    monkeypatch.setattr(state, "get_camera_info", failing)
+    summary = export_fleet(path, ids, client=client)
+
+    rows, stats, pending = _rows(path)
+    assert set(summary["errors"]) == {ids[2]}
+    assert pending == [ids[2]] and stats["pending"] == 1 and ids[2] not in rows
+
+    # Ancora in errore: resta in sospeso anche se la sequence avanza
+    assert refresh_fleet(path, client=client)["fetched"] == 1
+    assert _rows(path)[2] == [ids[2]]
+
+    monkeypatch.setattr(state, "get_camera_info", get_camera_info)
+    refresh_fleet(path, client=client)
+
+    rows, stats, pending = _rows(path)
+    assert pending == [] and rows[ids[2]]["registeredAt"] > 0 and stats["cameras"] == 3
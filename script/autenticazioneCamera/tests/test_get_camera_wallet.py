@@ -0,0 +1,64 @@
+import json
+import multiprocessing
+import os
+
+import pytest
+
+import get_camera_wallet
+import key_journal
+from key_journal import KeyJournal, read_keystore
+from keystore import SqliteKeystore
+
+WRITERS = 6
+KEYS_PER_WRITER = 40
+
+
+def _write_keys(key_file, writer, journal_mode):
+    """Processo writer: salva le sue chiavi una alla volta, come save_private_key"""
+    get_camera_wallet.CONFIG["KEY_JOURNAL"] = journal_mode
+    if journal_mode:
+        journal = KeyJournal(key_file)
+        key_journal._open_journals[os.path.abspath(key_file)] = journal
+    for i in range(KEYS_PER_WRITER):
+        camera_id = "0x" + f"{writer:02x}{i:062x}"
+        get_camera_wallet._store_entries([(camera_id, {"address": "0x" + "00" * 20, "privateKey": camera_id})],
+                                         key_file)
+        if journal_mode and i % 10 == 9:
+            # Compattazioni sovrapposte alle append degli altri writer
+            journal.compact()
+    if journal_mode:
+        journal.close()
+
+
+def _run_writers(key_file, modes):
+    ctx = multiprocessing.get_context("fork")
+    processes = [ctx.Process(target=_write_keys, args=(key_file, writer, mode)) for writer, mode in enumerate(modes)]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join(timeout=120)
+    assert [p.exitcode for p in processes] == [0] * len(modes)
+
+
+@pytest.mark.parametrize("modes", [
+    [False] * WRITERS,                     # riscrittura JSON completa
+    [True] * WRITERS,                      # journal con compattazioni
+    [False, True] * (WRITERS // 2),        # riscritture e append insieme
+], ids=["json", "journal", "mixed"])
+def test_concurrent_json_writers_keep_every_key(tmp_path, modes):
+    key_file = str(tmp_path / "camera_keys.json")
+    _run_writers(key_file, modes)
+
+    keys = read_keystore(key_file)
+    assert len(keys) == WRITERS * KEYS_PER_WRITER
+    with open(key_file) as f:
+        json.load(f)  # lo snapshot non è mai lasciato a metà
+
+
+def test_concurrent_sqlite_writers_keep_every_key(tmp_path):
+    key_file = str(tmp_path / "camera_keys.db")
+    _run_writers(key_file, [False] * WRITERS)
+
+    keystore = SqliteKeystore(key_file)
+    assert len(keystore) == WRITERS * KEYS_PER_WRITER
+    keystore.close()
@@ -0,0 +1,57 @@
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+
+import hd_wallet
+from hd_wallet import hd_reference, reserve_hd_indexes
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _reserve_blocks(seed_file, blocks, size):
+    return [reserve_hd_indexes(size, seed_file=seed_file) for _ in range(blocks)]
+
+
+def test_reserve_continues_after_keystore_indexes(tmp_path):
+    seed_file = str(tmp_path / "fleet_seed.json")
+    existing = [hd_reference(0), hd_reference(7), "0x" + "11" * 32]
+
+    assert reserve_hd_indexes(3, existing, seed_file=seed_file) == 8
+    # Il contatore vale anche se il keystore non contiene ancora le chiavi riservate
+    assert reserve_hd_indexes(2, existing, seed_file=seed_file) == 11
+
+
+def test_concurrent_reservations_never_overlap(tmp_path):
+    seed_file = str(tmp_path / "fleet_seed.json")
+    ctx = multiprocessing.get_context("fork")
+    with ctx.Pool(6) as pool:
+        results = pool.starmap(_reserve_blocks, [(seed_file, 20, 5)] * 6)
+
+    indexes = [first + i for firsts in results for first in firsts for i in range(5)]
+    assert len(indexes) == 6 * 20 * 5
+    assert len(set(indexes)) == len(indexes)
+
+
+def test_parallel_bulk_hd_runs_derive_distinct_wallets(tmp_path):
+    seed_file = str(tmp_path / "fleet_seed.json")
+    hd_wallet.create_fleet_seed(seed_file)
+    keys = str(tmp_path / "camera_keys.json")
+
+    processes = []
+    for run in range(4):
+        ids_file = tmp_path / f"ids{run}.txt"
+        ids_file.write_text("\n".join("0x" + os.urandom(32).hex() for _ in range(25)) + "\n")
+        processes.append(subprocess.Popen(
+            [sys.executable, os.path.join(SCRIPTS_DIR, "get_camera_wallet.py"),
+             "--keys", keys, "--hd", "--seed", seed_file, "bulk", str(ids_file)],
+            cwd=tmp_path, stdout=subprocess.DEVNULL
+        ))
+    assert all(p.wait(timeout=120) == 0 for p in processes)
+
+    with open(keys) as f:
+        entries = json.load(f).values()
+    assert len(entries) == 100
+    assert len({entry["privateKey"] for entry in entries}) == 100
+    assert len({entry["address"] for entry in entries}) == 100
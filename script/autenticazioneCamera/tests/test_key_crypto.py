@@ -0,0 +1,70 @@
+import base64
+import json
+
+import pytest
+
+from key_crypto import (ENC_PREFIX, DecryptedKeyCache, decrypt_private_key, encrypt_keystore_file,
+                        encrypt_private_key, is_encrypted)
+from key_journal import journal_path, read_keystore
+from sign_photo import load_credentials
+from signing_core import PhotoSigner
+
+# Cifrata da mqtt-go con la stessa keyEncKey: gcm.Seal(nonce, nonce, plain, nil), nonce "0123456789ab"
+GO_PLAIN = "0x4c0883a69102937d6231471b5dbb6204fe5129617082792ae468d01a3f362318"
+GO_BLOB = ("enc:v1:MDEyMzQ1Njc4OWFi3+ybpjMGGw6Cy/V2JT8PS8/Sk+XkrJog9FfkZEYug08wrzLtKQoqsxNfeij2Bh9e1QxCXRcd"
+           "L/Z46i0gajCwuRNHBK5tIN12aZE7Zq2J4R1O2A==")
+
+
+def test_decrypts_a_key_encrypted_by_the_go_receiver():
+    assert decrypt_private_key(GO_BLOB) == GO_PLAIN
+
+
+def test_round_trip_uses_the_go_layout():
+    enc = encrypt_private_key(GO_PLAIN)
+    raw = base64.b64decode(enc[len(ENC_PREFIX):])
+
+    assert is_encrypted(enc)
+    assert len(raw) == 12 + len(GO_PLAIN) + 16  # nonce | ciphertext | tag
+    assert decrypt_private_key(enc) == GO_PLAIN
+    assert encrypt_private_key(GO_PLAIN) != enc  # nonce casuale
+
+
+def test_tampered_blob_is_rejected():
+    raw = bytearray(base64.b64decode(GO_BLOB[len(ENC_PREFIX):]))
+    raw[20] ^= 1
+    with pytest.raises(ValueError):
+        decrypt_private_key(ENC_PREFIX + base64.b64encode(bytes(raw)).decode())
+    with pytest.raises(ValueError):
+        decrypt_private_key(ENC_PREFIX + "AAAA")
+
+
+def test_decrypted_key_cache_counts_evicts_and_expires(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("key_crypto.time.monotonic", lambda: now[0])
+    cache = DecryptedKeyCache(maxsize=1, ttl=10)
+    other = encrypt_private_key("0x" + "11" * 32)
+
+    assert cache.get(GO_BLOB) == GO_PLAIN
+    assert cache.get(GO_BLOB) == GO_PLAIN
+    assert cache.get(other) == "0x" + "11" * 32  # espelle GO_BLOB
+    assert cache.stats()['size'] == 1
+    assert cache.get(GO_BLOB) == GO_PLAIN
+    now[0] += 11
+    assert cache.get(GO_BLOB) == GO_PLAIN  # scaduta: decifrata di nuovo
+    assert (cache.stats()['hits'], cache.stats()['misses']) == (1, 4)
+
+    cache.wipe()
+    assert cache.stats()['size'] == 0
+
+
+def test_encrypted_keystore_still_signs(keys_file, camera_account):
+    camera_id, account = camera_account
+    with open(journal_path(keys_file), "w") as f:
+        f.write(json.dumps({"camera_id": "0xbb", "entry": {"address": "0x0", "privateKey": GO_PLAIN}}) + "\n")
+
+    assert encrypt_keystore_file(keys_file) == 2
+    keys = read_keystore(keys_file)
+    assert all(is_encrypted(entry["privateKey"]) for entry in keys.values())
+
+    credentials = load_credentials(keys_file, camera_id=camera_id)
+    assert PhotoSigner(credentials['private_key']).address == account.address
@@ -0,0 +1,57 @@
+import json
+import multiprocessing
+import os
+import stat
+
+from key_journal import KeyJournal, journal_path, read_keystore
+
+
+def _append_many(path, count, compact_threshold):
+    journal = KeyJournal(path, compact_threshold=compact_threshold)
+    for i in range(count):
+        journal.append(f"0x{i:064x}", {"address": "0x" + "00" * 20, "privateKey": f"0x{i:064x}"})
+    journal.close()
+
+
+def test_read_keystore_applies_journal_and_skips_torn_line(tmp_path):
+    path = str(tmp_path / "camera_keys.json")
+    with open(path, "w") as f:
+        json.dump({"0xaa": {"address": "0x1"}}, f)
+    with open(journal_path(path), "w") as f:
+        f.write(json.dumps({"camera_id": "0xbb", "entry": {"address": "0x2"}}) + "\n")
+        f.write(json.dumps({"camera_id": "0xaa", "entry": {"address": "0x3"}}) + "\n")
+        f.write('{"camera_id": "0xcc", "ent')
+
+    assert read_keystore(path) == {"0xaa": {"address": "0x3"}, "0xbb": {"address": "0x2"}}
+
+
+def test_readers_never_lose_keys_during_compaction(tmp_path):
+    path = str(tmp_path / "camera_keys.json")
+    with open(path, "w") as f:
+        json.dump({}, f)
+
+    writer = multiprocessing.get_context("fork").Process(target=_append_many, args=(path, 3000, 25))
+    writer.start()
+    seen = 0
+    drops = 0
+    while writer.is_alive():
+        count = len(read_keystore(path))
+        if count < seen:
+            drops += 1
+        seen = max(seen, count)
+    writer.join()
+
+    assert writer.exitcode == 0
+    assert drops == 0
+    assert len(read_keystore(path)) == 3000
+
+
+def test_compacted_snapshot_is_private(tmp_path, umask_022):
+    path = str(tmp_path / "camera_keys.json")
+    journal = KeyJournal(path)
+    journal.append("0xaa", {"address": "0x1", "privateKey": "0x2"})
+    journal.compact()
+    journal.close()
+
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert stat.S_IMODE(os.stat(journal_path(path)).st_mode) == 0o600
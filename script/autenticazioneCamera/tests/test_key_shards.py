@@ -0,0 +1,38 @@
+import pytest
+
+from key_shards import open_manifest, split_keystore
+from sign_photo import load_all_credentials
+
+
+def _ids(count):
+    return ["0x" + f"{i:02x}" * 32 for i in range(count)]
+
+
+@pytest.mark.parametrize("suffix", [".json", ".db", ".snap"])
+def test_repeated_split_keeps_existing_cameras(tmp_path, make_entry, suffix):
+    manifest = str(tmp_path / "camera_keys.shards.json")
+    first, second = _ids(40)[:20], _ids(40)[20:]
+
+    split_keystore({cid: make_entry() for cid in first}, manifest, prefix_length=1, shard_suffix=suffix)
+    split_keystore({cid: make_entry() for cid in second}, manifest, prefix_length=1, shard_suffix=suffix)
+
+    cameras = load_all_credentials(manifest)
+    assert sorted(cameras) == sorted(cid[2:] for cid in first + second)
+
+
+def test_non_hex_camera_id_is_rejected(tmp_path, make_entry):
+    with pytest.raises(ValueError, match="esadecimale"):
+        split_keystore({"cam-01": make_entry()}, str(tmp_path / "camera_keys.shards.json"))
+
+
+
+def test_gateways_own_contiguous_prefix_blocks(tmp_path, make_entry):
+    manifest_file = str(tmp_path / "camera_keys.shards.json")
+    split_keystore({"0x" + "a1" * 32: make_entry()}, manifest_file, prefix_length=1, gateways=["gw-a", "gw-b"])
+    manifest = open_manifest(manifest_file)
+
+    assert manifest.gateways == {"gw-a": list("01234567"), "gw-b": list("89abcdef")}
+    assert manifest.route("0x" + "a1" * 32, gateway_id="gw-b").endswith(".json")
+    with pytest.raises(ValueError, match="gw-b"):
+        manifest.route("0x" + "a1" * 32, gateway_id="gw-a")
+    assert len(manifest.local_shards("gw-a")) == 8
@@ -0,0 +1,94 @@
+import os
+
+import pytest
+
+from key_snapshot import KeySnapshot, build_snapshot, open_snapshot
+from sign_photo import load_credentials
+from signing_core import PhotoSigner
+
+
+@pytest.fixture
+def keys(make_entry):
+    """200 camere, metà con prefisso 0x, inserite in ordine non ordinato"""
+    entries = {}
+    for i in range(200):
+        camera_id = os.urandom(32).hex()
+        entries[("0x" if i % 2 else "") + camera_id] = dict(make_entry(), createdAt=f"2026-01-{i % 28 + 1:02d}")
+    return entries
+
+
+def _expected(entry):
+    return {**entry, "mnemonic": ""}
+
+
+def test_get_and_get_by_address_find_every_record(tmp_path, keys):
+    path = str(tmp_path / "camera_keys.snap")
+    assert build_snapshot(keys, path) == 200
+
+    with KeySnapshot(path) as snapshot:
+        assert len(snapshot) == 200
+        for camera_id, entry in keys.items():
+            assert snapshot.get(camera_id) == (camera_id, _expected(entry))
+            assert snapshot.get(camera_id.upper().replace("0X", "0x")) == (camera_id, _expected(entry))
+            assert snapshot.get_by_address(entry["address"]) == (camera_id, _expected(entry))
+        assert snapshot.first() == (next(iter(keys)), _expected(next(iter(keys.values()))))
+
+        assert snapshot.get("0x" + "00" * 32) is None
+        assert snapshot.get("cam-01") is None
+        assert snapshot.get_by_address("0x" + "00" * 20) is None
+        assert [camera_id for camera_id, _ in snapshot.items()] == sorted(keys, key=lambda c: c.replace("0x", ""))
+
+
+def test_duplicate_camera_and_address_keep_first_insertion(tmp_path, make_entry):
+    path = str(tmp_path / "camera_keys.snap")
+    first, second = make_entry(), make_entry()
+    second["address"] = first["address"]
+    build_snapshot({"0x" + "bb" * 32: first, "0x" + "aa" * 32: second, "BB" * 32: make_entry()}, path)
+
+    with KeySnapshot(path) as snapshot:
+        assert len(snapshot) == 2
+        assert snapshot.get("bb" * 32)[1]["privateKey"] == first["privateKey"]
+        assert snapshot.get_by_address(first["address"])[0] == "0x" + "bb" * 32
+
+
+def test_empty_snapshot(tmp_path):
+    path = str(tmp_path / "camera_keys.snap")
+    build_snapshot({}, path)
+    with KeySnapshot(path) as snapshot:
+        assert len(snapshot) == 0
+        assert snapshot.first() is None
+        assert snapshot.get("0x" + "aa" * 32) is None
+
+
+def test_open_snapshot_is_shared_until_rebuilt(tmp_path, keys, make_entry):
+    path = str(tmp_path / "camera_keys.snap")
+    build_snapshot(keys, path)
+    shared = open_snapshot(path)
+    assert open_snapshot(path) is shared
+
+    build_snapshot({"0x" + "cc" * 32: make_entry()}, path)
+    reopened = open_snapshot(path)
+    assert reopened is not shared and len(reopened) == 1
+
+
+def test_load_credentials_from_snapshot(tmp_path, camera_account):
+    camera_id, account = camera_account
+    path = str(tmp_path / "camera_keys.snap")
+    build_snapshot({camera_id: {"address": account.address, "privateKey": account.key.hex()}}, path)
+
+    assert load_credentials(path, address=account.address)['camera_id'] == camera_id
+    assert PhotoSigner(load_credentials(path, camera_id=camera_id)['private_key']).address == account.address
+
+
+def test_invalid_snapshot_header_raises(tmp_path, make_entry):
+    path = tmp_path / "camera_keys.snap"
+    build_snapshot({"0x" + "ab" * 32: make_entry()}, str(path))
+    data = bytearray(path.read_bytes())
+    data[0] ^= 0xff
+    path.write_bytes(bytes(data))
+
+    with pytest.raises(ValueError):
+        KeySnapshot(str(path))
+    path.write_bytes(b"short")
+    with pytest.raises(ValueError):
+        KeySnapshot(str(path))
@@ -0,0 +1,74 @@
+import os
+import stat
+
+from keystore import SqliteKeystore
+
+
+def _mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_sqlite_keystore_and_wal_files_are_private(tmp_path, umask_022, make_entry):
+    path = str(tmp_path / "camera_keys.db")
+    keystore = SqliteKeystore(path)
+    keystore.put("0x" + "ab" * 32, make_entry())
+
+    # Connessione ancora aperta: -wal e -shm esistono e contengono le chiavi
+    for file in (path, path + "-wal", path + "-shm"):
+        assert os.path.exists(file)
+        assert _mode(file) == 0o600
+    keystore.close()
+
+
+def test_sqlite_keystore_tightens_existing_database(tmp_path, make_entry):
+    path = str(tmp_path / "camera_keys.db")
+    SqliteKeystore(path).close()
+    os.chmod(path, 0o644)
+
+    SqliteKeystore(path).close()
+    assert _mode(path) == 0o600
+
+
+def test_export_json_is_private(tmp_path, umask_022, make_entry):
+    keystore = SqliteKeystore(str(tmp_path / "camera_keys.db"))
+    keystore.put("0x" + "ab" * 32, make_entry())
+    out = str(tmp_path / "export.json")
+
+    assert keystore.export_json(out) == 1
+    assert _mode(out) == 0o600
+    keystore.close()
+
+
+
+def test_import_json_includes_journal_entries(tmp_path, make_entry):
+    from key_journal import KeyJournal
+
+    json_file = str(tmp_path / "camera_keys.json")
+    compacted, journaled, updated = make_entry(), make_entry(), make_entry()
+    journal = KeyJournal(json_file, compact_threshold=10 ** 9)
+    journal.append("0xaa", compacted)
+    journal.compact()
+    journal.append("0xbb", journaled)
+    journal.append("0xaa", updated)
+    journal.close()
+
+    keystore = SqliteKeystore(str(tmp_path / "camera_keys.db"))
+    assert keystore.import_json(json_file) == 2
+    assert keystore.get("0xaa") == ("0xaa", updated)
+    assert keystore.get_by_address(journaled["address"].lower()) == ("0xbb", journaled)
+    keystore.close()
+
+
+def test_lookups_by_id_address_and_insertion_order(tmp_path, make_entry):
+    keystore = SqliteKeystore(str(tmp_path / "camera_keys.db"))
+    entries = {f"0x{i:064x}": make_entry() for i in range(1, 4)}
+    keystore.put_many(entries.items())
+
+    assert len(keystore) == 3
+    assert keystore.first() == next(iter(entries.items()))
+    camera_id, entry = list(entries.items())[1]
+    assert keystore.get(camera_id.upper().replace("0X", "")) == (camera_id, entry)
+    assert keystore.get_by_address(entry["address"]) == (camera_id, entry)
+    assert keystore.get("0x" + "f" * 64) is None
+    assert dict(keystore.items()) == entries
+    keystore.close()
@@ -0,0 +1,90 @@
+import json
+
+from key_journal import KeyJournal, journal_path
+from key_snapshot import build_snapshot
+from keystore import SqliteKeystore
+from keystore_watch import KeystoreWatcher
+
+
+def _id(i):
+    return "0x" + f"{i:02x}" * 32
+
+
+def test_journal_appends_are_read_incrementally(tmp_path, make_entry):
+    path = str(tmp_path / "camera_keys.json")
+    with open(path, "w") as f:
+        json.dump({_id(1): make_entry()}, f)
+    watcher = KeystoreWatcher(path, interval=0)
+    assert len(watcher) == 1 and watcher.reloads == 1
+
+    journal = KeyJournal(path, compact_threshold=10 ** 9)
+    new, updated = make_entry(), make_entry()
+    journal.append(_id(2), new)
+    journal.append(_id(1), updated)
+    journal.flush()
+
+    assert sorted(watcher.refresh()) == sorted([_id(1)[2:], _id(2)[2:]])
+    assert watcher.reloads == 1  # nessuna rilettura completa dello snapshot
+    assert watcher.get(_id(1))['address'] == updated['address']
+    assert watcher.refresh() == []
+
+    # Compattazione: lo snapshot cambia, rilettura completa senza perdere camere
+    journal.compact()
+    journal.close()
+    assert watcher.refresh() == []
+    assert watcher.reloads == 2 and len(watcher) == 2
+
+
+def test_incomplete_journal_line_waits_for_the_writer(tmp_path, make_entry):
+    path = str(tmp_path / "camera_keys.json")
+    with open(path, "w") as f:
+        json.dump({}, f)
+    watcher = KeystoreWatcher(path, interval=0)
+
+    line = json.dumps({"camera_id": _id(3), "entry": make_entry()}) + "\n"
+    with open(journal_path(path), "a") as f:
+        f.write(line[:20])
+        f.flush()
+        assert watcher.refresh() == []
+        f.write(line[20:])
+    assert watcher.refresh() == [_id(3)[2:]]
+
+
+def test_get_reloads_on_unknown_camera(tmp_path, make_entry):
+    path = str(tmp_path / "camera_keys.json")
+    with open(path, "w") as f:
+        json.dump({_id(1): make_entry()}, f)
+    watcher = KeystoreWatcher(path, interval=0)
+
+    entry = make_entry()
+    with open(path, "w") as f:
+        json.dump({_id(4): entry}, f)
+    assert watcher.get(_id(4))['address'] == entry['address']
+    assert watcher.get(_id(1)) is None  # rimossa dallo snapshot riscritto
+
+
+def test_sqlite_new_and_updated_rows(tmp_path, make_entry):
+    path = str(tmp_path / "camera_keys.db")
+    keystore = SqliteKeystore(path)
+    keystore.put(_id(1), make_entry())
+    watcher = KeystoreWatcher(path, interval=0)
+    assert len(watcher) == 1
+
+    updated = make_entry()
+    keystore.put(_id(2), make_entry())
+    keystore.put(_id(1), updated)
+    assert sorted(watcher.refresh()) == sorted([_id(1)[2:], _id(2)[2:]])
+    assert watcher.get(_id(1))['address'] == updated['address']
+    assert watcher.refresh() == []
+    keystore.close()
+
+
+def test_snapshot_rebuild_is_detected(tmp_path, make_entry):
+    path = str(tmp_path / "camera_keys.snap")
+    build_snapshot({_id(1): make_entry()}, path)
+    watcher = KeystoreWatcher(path, interval=0)
+    assert watcher.refresh() == []
+
+    build_snapshot({_id(2): make_entry()}, path)
+    assert sorted(watcher.refresh()) == sorted([_id(1)[2:], _id(2)[2:]])
+    assert watcher.get(_id(1)) is None and watcher.get(_id(2)) is not None
@@ -0,0 +1,64 @@
+import pytest
+
+from nonce_window import NonceWindow, presign_window
+from signing_core import recover_signer
+
+
+def _items(count):
+    return [("0x" + f"{i:064x}", "Roma", f"meta{i}") for i in range(1, count + 1)]
+
+
+def _assert_signed(records, start_nonce, address):
+    assert [r['nonce'] for r in records] == list(range(start_nonce, start_nonce + len(records)))
+    for r in records:
+        assert recover_signer(r['photo_hash'], r['location'], r['metadata'], r['nonce'], r['signature']) == address
+
+
+def test_presign_window_uses_contiguous_nonces(camera_account):
+    _, account = camera_account
+    _assert_signed(presign_window(account.key, _items(4), 9), 9, account.address)
+
+
+def test_flush_resigns_remaining_records_after_a_failure(camera_account):
+    camera_id, account = camera_account
+    window = NonceWindow(account.key, start_nonce=5, camera_id=camera_id)
+    window.extend(_items(5))
+    failures = [RuntimeError("revert")]
+
+    def submit(record):
+        if record['nonce'] == 7 and failures:
+            raise failures.pop()
+
+    # Il record con nonce 7 fallisce e il relay è rimasto a 7
+    result = window.flush(submit, get_nonce=lambda: 7)
+    assert [r['nonce'] for r in result['submitted']] == [5, 6]
+    assert result['failed']['photo_hash'] == _items(5)[2][0]
+    assert str(result['error']) == "revert"
+
+    remaining = window.records()
+    assert [r['photo_hash'] for r in remaining] == [item[0] for item in _items(5)[3:]]
+    _assert_signed(remaining, 7, account.address)
+    assert all(r['camera_id'] == camera_id for r in remaining)
+
+    assert window.flush(submit)['failed'] is None
+    assert window.next_nonce == 9 and len(window) == 0
+
+
+def test_failed_get_nonce_keeps_the_window_unchanged(camera_account):
+    _, account = camera_account
+    window = NonceWindow(account.key, start_nonce=0)
+    window.extend(_items(3))
+    before = window.records()
+
+    def get_nonce():
+        raise ConnectionError("FireFly non raggiungibile")
+
+    with pytest.raises(ConnectionError):
+        window.flush(lambda record: False, get_nonce=get_nonce)
+
+    # Il record fallito è ancora in testa e le firme non sono cambiate
+    assert window.records() == before
+    assert window.start_nonce == 0
+
+    result = window.flush(lambda record: True)
+    assert [r['nonce'] for r in result['submitted']] == [0, 1, 2]
@@ -0,0 +1,71 @@
+import csv
+import json
+import os
+import subprocess
+import sys
+
+import requests
+
+from generate_camera_id import generate_camera_id
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CAMERAS = [
+    ("AA:00:00:00:00:01", "E1", "Roma", "ESP32-CAM"),
+    ("AA:00:00:00:00:02", "E2", "Milano", "ESP32-CAM"),
+    ("AA:00:00:00:00:01", "E1", "Roma", "ESP32-CAM"),   # duplicato
+    ("AA:00:00:00:00:03", "E3", "Torino", "ESP32-CAM"),  # già registrata on-chain
+    ("AA:00:00:00:00:04", "E4", "Napoli", "ESP32-CAM"),  # wallet già nel keystore
+]
+
+
+def _camera_id(mac, efuse):
+    raw = generate_camera_id(mac, efuse)
+    return "0x" + raw.replace("0x", "").lower()
+
+
+def _onboard(tmp_path, firefly_url, keys):
+    inventory = tmp_path / "inventory.csv"
+    with open(inventory, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["mac", "efuse", "location", "model"])
+        writer.writerows(CAMERAS)
+    output = tmp_path / "payload.json"
+    result = subprocess.run(
+        [sys.executable, os.path.join(SCRIPTS_DIR, "get_camera_wallet.py"), "--keys", keys,
+         "--api", firefly_url + "/", "onboard", str(inventory), "--output", str(output), "--workers", "2"],
+        cwd=tmp_path, capture_output=True, text=True, timeout=120
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+    with open(output) as f:
+        return json.load(f)
+
+
+def test_onboarding_skips_duplicates_and_registered_cameras(tmp_path, firefly_server, firefly_url, make_entry):
+    state = firefly_server.state
+    registered = CAMERAS[3]
+    state.register_camera(state.owner, registered[0], registered[1], "0x" + "11" * 20, registered[2], registered[3])
+
+    # Chiave già salvata con un camera ID maiuscolo e senza 0x
+    existing_id = _camera_id(*CAMERAS[4][:2])
+    existing = make_entry()
+    keys = str(tmp_path / "camera_keys.json")
+    with open(keys, "w") as f:
+        json.dump({existing_id[2:].upper(): existing}, f)
+
+    payload = _onboard(tmp_path, firefly_url, keys)
+
+    assert payload["summary"] == dict(payload["summary"], inventory=5, duplicates=1, alreadyRegistered=1,
+                                      checkErrors=0, walletsGenerated=2, walletsReused=1, toRegister=3)
+    assert payload["url"].startswith(firefly_url + "/api/v1/")
+    by_id = {r["cameraId"]: r["input"] for r in payload["requests"]}
+    assert sorted(by_id) == sorted(_camera_id(*c[:2]) for c in (CAMERAS[0], CAMERAS[1], CAMERAS[4]))
+    assert by_id[existing_id]["_walletAddress"] == existing["address"]
+
+    # Il payload è accettato dal contratto; una seconda passata non ha nulla da registrare
+    for request in payload["requests"]:
+        response = requests.post(payload["url"] + "?confirm=true", json={"input": request["input"]}, timeout=10)
+        assert response.status_code == 200, response.text
+
+    summary = _onboard(tmp_path, firefly_url, keys)["summary"]
+    assert (summary["alreadyRegistered"], summary["toRegister"], summary["walletsGenerated"]) == (4, 0, 0)
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import mmap
+
+import pytest
+
+from sign_photo import hash_photo_file, iter_batch_items, load_credentials, sign_batch, sign_items_parallel, sign_photo
+from signing_core import recover_signer
+
+
+@pytest.fixture
+def photos(tmp_path):
+    """Directory con 5 foto (più un file nascosto e una sottocartella ignorati)"""
+    folder = tmp_path / "foto"
+    folder.mkdir()
+    for i in range(5):
+        (folder / f"img{i}.jpg").write_bytes(bytes([i]) * (1000 + i))
+    (folder / ".DS_Store").write_bytes(b"x")
+    (folder / "sub").mkdir()
+    return folder
+
+
+def _read_records(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_batch_sources_directory_glob_and_manifest(photos):
+    from_dir = [item['photo'] for item in iter_batch_items(str(photos), "Roma", "meta")]
+    assert [p.rsplit("/", 1)[1] for p in from_dir] == [f"img{i}.jpg" for i in range(5)]
+
+    from_glob = list(iter_batch_items(str(photos / "img[13].jpg"), "Roma", "meta"))
+    assert [item['photo'] for item in from_glob] == [from_dir[1], from_dir[3]]
+
+    manifest = photos.parent / "manifest.jsonl"
+    manifest.write_text(
+        json.dumps({"photo": "foto/img2.jpg", "location": "Milano"}) + "\n\n"
+        + json.dumps({"photo": "foto/img0.jpg", "metadata": "notte"}) + "\n"
+    )
+    from_manifest = list(iter_batch_items(str(manifest), "Roma", "meta"))
+    assert from_manifest == [
+        {'photo': from_dir[2], 'location': "Milano", 'metadata': "meta"},
+        {'photo': from_dir[0], 'location': "Roma", 'metadata': "notte"},
+    ]
+
+
+def test_manifest_without_photo_field_is_rejected(tmp_path):
+    manifest = tmp_path / "manifest.jsonl"
+    manifest.write_text(json.dumps({"location": "Roma"}) + "\n")
+    with pytest.raises(ValueError, match="photo"):
+        list(iter_batch_items(str(manifest), "Roma", "meta"))
+
+
+def test_batch_assigns_contiguous_nonces(tmp_path, photos, keys_file, camera_account):
+    camera_id, account = camera_account
+    credentials = load_credentials(keys_file, camera_id=camera_id)
+    out = str(tmp_path / "signed.jsonl")
+
+    count, _ = sign_batch(credentials, iter_batch_items(str(photos), "Roma", "meta"), 7, out)
+    records = _read_records(out)
+
+    assert count == 5
+    assert [r['nonce'] for r in records] == [7, 8, 9, 10, 11]
+    for record in records:
+        assert record['camera_id'] == camera_id
+        signer = recover_signer(record['photo_hash'], record['location'], record['metadata'],
+                                record['nonce'], record['signature'])
+        assert signer == account.address
+
+
+def test_parallel_batch_matches_serial(tmp_path, photos, keys_file, camera_account):
+    camera_id, _ = camera_account
+    credentials = load_credentials(keys_file, camera_id=camera_id)
+    serial, parallel = str(tmp_path / "serial.jsonl"), str(tmp_path / "parallel.jsonl")
+
+    sign_batch(credentials, iter_batch_items(str(photos), "Roma", "meta"), 0, serial)
+    sign_batch(credentials, iter_batch_items(str(photos), "Roma", "meta"), 0, parallel, workers=3)
+
+    assert _read_records(parallel) == _read_records(serial)
+
+
+def test_parallel_signer_keeps_nonce_order_across_chunks(camera_account):
+    _, account = camera_account
+    key = account.key.hex()
+    items = [("0x" + f"{i:064x}", "Roma", f"meta{i}") for i in range(1, 41)]
+
+    signed = list(sign_items_parallel(key, iter(items), 100, workers=3, chunk_size=3))
+
+    assert [record['nonce'] for record in signed] == list(range(100, 140))
+    assert signed == [sign_photo(key, h, loc, meta, 100 + i) for i, (h, loc, meta) in enumerate(items)]
+
+
+@pytest.mark.parametrize("size", [0, 1, mmap.ALLOCATIONGRANULARITY, 3 * mmap.ALLOCATIONGRANULARITY + 17])
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_hash_photo_file_matches_sha256(tmp_path, size, use_mmap):
+    photo = tmp_path / "photo.jpg"
+    data = bytes(i % 251 for i in range(size))
+    photo.write_bytes(data)
+
+    # Blocco non allineato alla granularità di mmap: le finestre vengono riallineate
+    result = hash_photo_file(str(photo), block_size=mmap.ALLOCATIONGRANULARITY + 5, use_mmap=use_mmap)
+    assert result == "0x" + hashlib.sha256(data).hexdigest()
+
+
+def test_hash_photo_file_rejects_invalid_block_size(tmp_path):
+    photo = tmp_path / "photo.jpg"
+    photo.write_bytes(b"x")
+    with pytest.raises(ValueError):
+        hash_photo_file(str(photo), block_size=0)
@@ -0,0 +1,82 @@
+import pytest
+
+from signing_core import (ZERO_ADDRESS, PhotoSigner, SignerCache, eth_signed_message_hash, photo_message_hash,
+                          recover_address, recover_signer)
+
+PHOTO_HASH = "0x" + "ab" * 32
+
+
+def _web3_sign(private_key, photo_hash, location, metadata, nonce):
+    """Firma con il percorso web3 usato prima di signing_core"""
+    web3 = pytest.importorskip("web3")
+    from eth_account import Account
+    from eth_account.messages import encode_defunct
+
+    message_hash = web3.Web3.solidity_keccak(
+        ['bytes32', 'string', 'string', 'uint256'],
+        [photo_hash, location, metadata, nonce]
+    )
+    return Account.from_key(private_key).sign_message(encode_defunct(hexstr=message_hash.hex()))
+
+
+@pytest.mark.parametrize("location, metadata, nonce", [
+    ("Building A - Entrance", "Motion detected", 0),
+    ("Città", "metadati è ü", 1),
+    ("", "", 2 ** 256 - 1),
+])
+def test_signature_and_signer_match_web3(camera_account, location, metadata, nonce):
+    _, account = camera_account
+    signed = PhotoSigner(account.key).sign(PHOTO_HASH, location, metadata, nonce)
+    legacy = _web3_sign(account.key, PHOTO_HASH, location, metadata, nonce)
+
+    assert bytes.fromhex(signed['signature']) == bytes(legacy.signature)
+    assert signed['camera_address'] == account.address
+    assert recover_signer(PHOTO_HASH, location, metadata, nonce, signed['signature']) == account.address
+
+
+def test_recover_address_mirrors_contract_requires():
+    digest = eth_signed_message_hash(photo_message_hash(PHOTO_HASH, "a", "b", 0))
+    with pytest.raises(ValueError, match="Lunghezza"):
+        recover_address(digest, "0x" + "00" * 64)
+    with pytest.raises(ValueError, match="v non valido"):
+        recover_address(digest, "0x" + "11" * 64 + "1d")
+    # r = s = 0: ecrecover fallisce e il contratto vede address(0)
+    assert recover_address(digest, "0x" + "00" * 64 + "1b") == ZERO_ADDRESS
+
+
+def test_pack_rejects_bad_hash_and_nonce():
+    with pytest.raises(ValueError):
+        photo_message_hash("0x1234", "a", "b", 0)
+    with pytest.raises(ValueError):
+        photo_message_hash(PHOTO_HASH, "a", "b", -1)
+
+
+def test_signer_cache_evicts_least_recently_used(make_entry):
+    cache = SignerCache(maxsize=2)
+    keys = {cid: make_entry()["privateKey"] for cid in ("0xaa", "0xbb", "0xcc")}
+
+    first = cache.get("0xaa", keys["0xaa"])
+    cache.get("0xbb", keys["0xbb"])
+    # Stesso camera_id con o senza 0x / maiuscole: hit, e 0xaa diventa il più recente
+    assert cache.get("AA", keys["0xaa"]) is first
+    cache.get("0xcc", keys["0xcc"])
+
+    assert cache.stats() == {'hits': 1, 'misses': 3, 'size': 2, 'maxsize': 2}
+    assert cache.get("0xaa", keys["0xaa"]) is first
+    cache.get("0xbb", keys["0xbb"])  # espulso da 0xcc: nuova derivazione
+    assert cache.stats()['misses'] == 4
+
+
+def test_signer_cache_rederives_when_the_key_changes(make_entry):
+    cache = SignerCache()
+    old_key, new_key = make_entry()["privateKey"], make_entry()["privateKey"]
+
+    old = cache.get("0xaa", old_key)
+    new = cache.get("0xaa", new_key)
+    assert new is not old
+    assert new.address == PhotoSigner(new_key).address
+
+    cache.clear()
+    assert cache.stats() == {'hits': 0, 'misses': 0, 'size': 0, 'maxsize': 1024}
+    with pytest.raises(ValueError):
+        SignerCache(maxsize=0)
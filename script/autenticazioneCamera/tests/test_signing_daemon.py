@@ -0,0 +1,84 @@
+import json
+import os
+import socket
+import stat
+import subprocess
+import sys
+import threading
+
+import pytest
+
+import signing_daemon
+
+
+@pytest.fixture
+def daemon(tmp_path, keys_file, umask_022):
+    service = signing_daemon.SigningService(keys_file, reload_interval=0)
+    socket_path = str(tmp_path / "signing.sock")
+    server = signing_daemon.UnixSigningServer(socket_path, signing_daemon.SigningRequestHandler)
+    server.service = service
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield socket_path
+    server.shutdown()
+    server.server_close()
+
+
+def test_socket_is_created_private(daemon):
+    assert stat.S_IMODE(os.stat(daemon).st_mode) == 0o600
+
+
+@pytest.mark.parametrize("request_line", [
+    b"[]",
+    b'"x"',
+    b"null",
+    b'{"id": 1, "camera_id": null, "photo_hash": "0x00"}',
+    b'{"id": 1, "camera_id": 5, "photo_hash": "0x00"}',
+    b'{"id": 1, "camera_id": "0xab", "photo_hash": ["x"]}',
+    b'{"id": 1, "camera_id": "0xab"}',
+    b'{"id": 1, "op": ["sign"]}',
+    b"\xff\xfe",
+    b"{not json",
+])
+def test_malformed_requests_get_an_error_and_keep_the_pipeline(daemon, camera_account, request_line):
+    camera_id, account = camera_account
+    valid = {"id": 2, "camera_id": camera_id, "photo_hash": "0x" + "11" * 32, "nonce": 0}
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(daemon)
+        # Richiesta malformata e richiesta valida in pipelining sulla stessa connessione
+        sock.sendall(request_line + b"\n" + json.dumps(valid).encode() + b"\n")
+        reader = sock.makefile("rb")
+        error = json.loads(reader.readline())
+        reply = json.loads(reader.readline())
+
+    assert error["ok"] is False and error["error"]
+    assert reply["id"] == 2 and reply["ok"] is True
+    assert reply["result"]["camera_id"] == camera_id
+
+
+def test_service_handle_never_raises(keys_file):
+    service = signing_daemon.SigningService(keys_file, reload_interval=0)
+    for request in ([], "x", None, 3, {"camera_id": None}, {"camera_id": "0xab", "photo_hash": None}):
+        assert service.handle(request)["ok"] is False
+
+
+def test_client_pipelines_requests_in_order(daemon, camera_account):
+    camera_id, account = camera_account
+    items = [(camera_id, "0x" + f"{i:064x}", "Roma", "meta", i) for i in range(1, 21)]
+
+    with signing_daemon.SigningClient(daemon) as client:
+        responses = list(client.sign_many(items))
+        stats = client.stats()
+
+    assert [r['result']['nonce'] for r in responses] == list(range(1, 21))
+    assert {r['result']['camera_address'] for r in responses} == {account.address}
+    assert stats['misses'] == 1 and stats['hits'] == 19
+
+
+def test_tcp_mode_is_not_available():
+    # Il protocollo non è autenticato: solo il socket Unix 0600 è accettato
+    result = subprocess.run([sys.executable, signing_daemon.__file__, "--port", "7000"],
+                            capture_output=True, text=True, timeout=30)
+    assert result.returncode == 2
+    assert "--port" in result.stderr
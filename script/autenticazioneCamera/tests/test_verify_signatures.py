@@ -0,0 +1,99 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+import verify_signatures
+from signing_core import PhotoSigner
+from verify_signatures import verify_record, verify_records
+
+
+@pytest.fixture
+def sign(camera_account):
+    """Firma un record della camera del keystore di test"""
+    camera_id, account = camera_account
+    signer = PhotoSigner(account.key)
+
+    def make(hash_byte, nonce):
+        return dict(signer.sign("0x" + hash_byte * 32, "Roma", "meta", nonce), camera_id=camera_id)
+    return make
+
+
+def test_repeated_photo_hash_in_batch_is_rejected(keys_file, sign):
+    records = [sign(h, n) for n, h in enumerate(("11", "22", "11"))]
+
+    results = verify_records(records, keys_file, workers=1)
+    assert results[:2] == [None, None]
+    assert "Foto gia registrata" in results[2]
+
+
+def test_records_after_a_rejection_must_be_resigned(keys_file, sign):
+    records = [sign(h, n) for n, h in enumerate(("11", "22", "33", "44"))]
+    records[1]['signature'] = records[1]['signature'][:-2] + "05"
+
+    results = verify_records(records, keys_file, workers=1, start_nonce=0)
+    assert results[0] is None
+    assert results[1] == "Valore v non valido"
+    # Il relay è ancora al nonce 1: i record con nonce 2 e 3 revertirebbero
+    assert results[2] == "Nonce 2 fuori sequenza (atteso 1): da ri-firmare"
+    assert results[3] == "Nonce 3 fuori sequenza (atteso 1): da ri-firmare"
+
+
+def test_resigned_record_continues_the_sequence(keys_file, sign):
+    # Il record 1 è un duplicato: il record successivo è stato ri-firmato con nonce 1
+    records = [sign("11", 0), sign("11", 1), sign("33", 1)]
+
+    results = verify_records(records, keys_file, workers=1, start_nonce=0)
+    assert results[0] is None and "Foto gia registrata" in results[1] and results[2] is None
+
+
+@pytest.mark.parametrize("change, reason", [
+    ({"photo_hash": None}, "Campo photo_hash non valido"),
+    ({"nonce": None}, "Campo nonce non valido"),
+    ({"nonce": "3"}, "Campo nonce non valido"),
+    ({"nonce": True}, "Campo nonce non valido"),
+    ({"location": 5}, "Campo location non valido"),
+    ({"metadata": ["x"]}, "Campo metadata non valido"),
+    ({"signature": 7}, "Campo signature non valido"),
+    ({"signature": "zz"}, "non-hexadecimal"),
+    ({"camera_id": 5}, "Telecamera non registrata"),
+])
+def test_malformed_fields_reject_only_their_record(keys_file, sign, change, reason):
+    records = [sign("11", 0), {**sign("22", 1), **change}, sign("33", 1)]
+
+    results = verify_records(records, keys_file, workers=1, start_nonce=0)
+    assert results[0] is None
+    assert reason in results[1]
+    assert results[2] is None
+
+
+def test_missing_fields_and_non_dict_records(keys_file, sign):
+    record = sign("11", 0)
+    del record['location']
+    assert verify_record(record, None) == "Campo mancante: location"
+
+    results = verify_records([[1, 2], "x", None, sign("22", 0)], keys_file, workers=1, start_nonce=0)
+    assert results[:3] == ["Record non valido: atteso un oggetto JSON"] * 3
+    assert results[3] is None
+
+
+def test_cli_writes_malformed_lines_to_rejected(tmp_path, keys_file, sign):
+    records = tmp_path / "signed.jsonl"
+    records.write_text("\n".join(json.dumps(r) for r in ([1], {**sign("11", 0), "photo_hash": None}, sign("22", 0))))
+    valid, rejected = tmp_path / "valid.jsonl", tmp_path / "rejected.jsonl"
+
+    result = subprocess.run(
+        [sys.executable, verify_signatures.__file__, str(records), "--credentials", keys_file,
+         "--valid", str(valid), "--rejected", str(rejected), "--workers", "1", "--start-nonce", "0"],
+        capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 2, result.stderr
+    assert len(valid.read_text().splitlines()) == 1
+    assert len(rejected.read_text().splitlines()) == 2
+
+
+def test_parallel_verification_matches_serial(keys_file, sign):
+    records = [sign(f"{i:02x}", i) for i in range(1, 9)] + [{"photo_hash": None}]
+    serial = verify_records(records, keys_file, workers=1, start_nonce=1)
+    assert verify_records(records, keys_file, workers=2, chunk_size=2, start_nonce=1) == serial
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Pre-validazione offline dei record firmati per SecurityCamera V3
+Replica i controlli di recordPhotoWithSignature (recoverSigner/recoverAddress)
+su un file JSONL di record firmati, in parallelo, e scarta quelli che il
+contratto rifiuterebbe prima di inviarli on-chain.
+
+Controlli:
+- photo_hash diverso da zero (require "Hash non valido")
+- firma da 65 byte e v valido (require del contratto)
+- firmatario recuperato = wallet della camera nel keystore locale
+- photo_hash non ripetuto nel batch (il contratto rifiuta il secondo record
+  con "Foto gia registrata")
+- nonce contigui a partire da --start-nonce (se indicato): il nonce del relay
+  avanza solo con i record accettati, quindi dopo un record scartato i
+  successivi vanno ri-firmati
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from sign_photo import load_all_credentials, _normalize_camera_id
+from signing_core import recover_signer, ZERO_ADDRESS
+
+ZERO_HASH = "0x" + "00" * 32
+
+# Campi di un record firmato e tipo atteso
+RECORD_FIELDS = (
+    ('photo_hash', str, "una stringa"),
+    ('location', str, "una stringa"),
+    ('metadata', str, "una stringa"),
+    ('nonce', int, "un intero"),
+    ('signature', str, "una stringa"),
+)
+
+
+def _record_shape_error(record):
+    """Motivo dello scarto se il record non ha la forma attesa (None se valida)"""
+    if not isinstance(record, dict):
+        return "Record non valido: atteso un oggetto JSON"
+    for field, field_type, description in RECORD_FIELDS:
+        if field not in record:
+            return f"Campo mancante: {field}"
+        value = record[field]
+        if not isinstance(value, field_type) or isinstance(value, bool):
+            return f"Campo {field} non valido: atteso {description}"
+    return None
+
+
+def verify_record(record, expected_address):
+    """
+    Verifica un record firmato come farebbe il contratto
+
+    Args:
+        record: Record firmato (output di sign_photo / batch)
+        expected_address: Address atteso della camera (None se camera sconosciuta)
+
+    Returns:
+        str: None se valido, altrimenti il motivo dello scarto
+    """
+    shape_error = _record_shape_error(record)
+    if shape_error is not None:
+        return shape_error
+
+    try:
+        photo_hash = record['photo_hash']
+        if not photo_hash.startswith('0x'):
+            photo_hash = '0x' + photo_hash
+        if photo_hash.lower() == ZERO_HASH:
+            return "Hash non valido"
+
+        signer = recover_signer(
+            photo_hash, record['location'], record['metadata'],
+            record['nonce'], record['signature']
+        )
+    except (ValueError, TypeError, AttributeError) as e:
+        return str(e)
+
+    if signer == ZERO_ADDRESS:
+        return "Firma non recuperabile"
+    if expected_address is None:
+        return "Telecamera non registrata nel keystore"
+    if signer.lower() != expected_address.lower():
+        return f"Firmatario {signer} diverso dal wallet atteso {expected_address}"
+    return None
+
+
+def _verify_chunk(chunk):
+    """Verifica un blocco di (record, expected_address) nel processo worker"""
+    return [verify_record(record, expected) for record, expected in chunk]
+
+
+def expected_address_for(record, by_camera_id, known_addresses):
+    """Address atteso: dal camera_id del record, altrimenti dal camera_address se noto"""
+    if not isinstance(record, dict):
+        return None
+    camera_id = record.get('camera_id')
+    if camera_id:
+        if not isinstance(camera_id, str):
+            return None
+        credentials = by_camera_id.get(_normalize_camera_id(camera_id))
+        return credentials['address'] if credentials else None
+    address = record.get('camera_address')
+    return known_addresses.get(address.lower()) if isinstance(address, str) else None
+
+
+def verify_records(records, credentials_file, workers=None, chunk_size=256, start_nonce=None):
+    """
+    Verifica una lista di record in parallelo
+
+    Args:
+        records: Lista di record firmati
+        credentials_file: Keystore con gli address attesi delle camere
+        workers: Processi (default: tutti i core)
+        chunk_size: Record per blocco inviato a un worker
+        start_nonce: Se indicato, i record accettati devono avere nonce contigui
+                     a partire da start_nonce (il nonce del relay non avanza sui
+                     record scartati)
+
+    Returns:
+        list: Motivo dello scarto per ogni record (None = valido), nello stesso ordine;
+              i record con un photo_hash già visto nel batch sono scartati come duplicati
+              e, dopo un record scartato, quelli con nonce non più valido sono da ri-firmare
+    """
+    by_camera_id = load_all_credentials(credentials_file)
+    known_addresses = {c['address'].lower(): c['address'] for c in by_camera_id.values()}
+
+    tasks = [(r, expected_address_for(r, by_camera_id, known_addresses)) for r in records]
+    chunks = [tasks[i:i + chunk_size] for i in range(0, len(tasks), chunk_size)]
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(chunks) <= 1:
+        results = [reason for chunk in chunks for reason in _verify_chunk(chunk)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = [reason for part in pool.map(_verify_chunk, chunks) for reason in part]
+
+    # Stesso hash più volte: solo il primo record valido verrebbe registrato
+    first_seen = {}
+    for idx, record in enumerate(records):
+        if results[idx] is not None:
+            continue
+        photo_hash = record['photo_hash'].lower()
+        if not photo_hash.startswith('0x'):
+            photo_hash = '0x' + photo_hash
+        if photo_hash in first_seen:
+            results[idx] = f"Foto gia registrata (stesso photo_hash del record {first_seen[photo_hash] + 1} del batch)"
+        else:
+            first_seen[photo_hash] = idx
+
+    if start_nonce is not None:
+        # Il relay consuma un nonce solo per i record accettati dal contratto
+        expected = start_nonce
+        for idx, record in enumerate(records):
+            if results[idx] is not None:
+                continue
+            if record['nonce'] != expected:
+                results[idx] = f"Nonce {record['nonce']} fuori sequenza (atteso {expected}): da ri-firmare"
+            else:
+                expected += 1
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pre-validazione offline dei record firmati')
+    parser.add_argument('input', help='File JSONL di record firmati (es. signed_photos.jsonl)')
+    parser.add_argument('--credentials', default='./camera_keys.json', help='File JSON con le credenziali')
+    parser.add_argument('--valid', default='valid_photos.jsonl', help='Output JSONL dei record validi')
+    parser.add_argument('--rejected', default='rejected_photos.jsonl', help='Output JSONL dei record scartati')
+    parser.add_argument('--workers', '-w', type=int, default=0, help='Processi di verifica (0 = tutti i core)')
+    parser.add_argument('--start-nonce', type=int, default=None, help='Verifica nonce contigui a partire da questo valore')
+    args = parser.parse_args()
+
+    print("🔎 SecurityCamera V3 - Pre-validazione firme")
+    print("=" * 80)
+
+    try:
+        with open(args.input, 'r') as f:
+            records = [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        print(f"❌ File {args.input} non trovato")
+        sys.exit(1)
+    except json.JSONDecodeError:
+        print(f"❌ Errore nel parsing del file JSONL")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    try:
+        results = verify_records(
+            records, args.credentials,
+            workers=args.workers or None,
+            start_nonce=args.start_nonce
+        )
+    except FileNotFoundError:
+        print(f"❌ File {args.credentials} non trovato")
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+
+    valid = 0
+    with open(args.valid, 'w') as ok_out, open(args.rejected, 'w') as ko_out:
+        for record, reason in zip(records, results):
+            if reason is None:
+                ok_out.write(json.dumps(record) + "\n")
+                valid += 1
+            elif isinstance(record, dict):
+                ko_out.write(json.dumps({**record, 'reject_reason': reason}) + "\n")
+                print(f"❌ {record.get('photo_hash', '?')} nonce={record.get('nonce')}: {reason}")
+            else:
+                ko_out.write(json.dumps({'record': record, 'reject_reason': reason}) + "\n")
+                print(f"❌ {record!r}: {reason}")
+
+    rate = len(records) / elapsed if elapsed > 0 else float('inf')
+    print(f"\n✅ Validi: {valid}   ❌ Scartati: {len(records) - valid}   ({rate:.1f} record/s)")
+    print(f"💾 Validi in: {args.valid}")
+    print(f"💾 Scartati in: {args.rejected}")
+
+    return 0 if valid == len(records) else 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())